@@ -0,0 +1,41 @@
+"""Timing for utils.clean_data against the previous row-by-row implementation.
+
+The old implementation is frozen in tests/legacy_clean_data.py, and
+tests/test_clean_data.py checks that both give identical frames. This
+times both on a frame replicated to `--rows` rows.
+
+Run from the repository root with `python -m benchmarks.clean_data [--rows N]`.
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from tests.legacy_clean_data import legacy_clean_data
+from utils import clean_data
+
+# Customer file replicated to --rows rows
+SOURCE = 'attached_assets/BMC.csv'
+
+
+def _time(fn, df):
+    start = time.perf_counter()
+    fn(df.copy())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=200_000)
+    args = parser.parse_args()
+
+    raw = pd.read_csv(SOURCE)
+    big = pd.concat([raw] * (args.rows // len(raw) + 1), ignore_index=True).iloc[:args.rows]
+    legacy = _time(legacy_clean_data, big)
+    current = _time(clean_data, big)
+    print(f"Timing on {len(big)} rows: legacy {legacy:.2f} s, vectorized {current:.2f} s "
+          f"({legacy / current:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
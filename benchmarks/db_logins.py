@@ -0,0 +1,109 @@
+"""Concurrent login benchmark for the user database.
+
+Simulates a whole team logging in at once: a burst of parallel
+verify_user calls mixed with a few registrations, against a scratch
+database. The pooled WAL implementation in database.py is compared with
+the previous connect-per-call version, reporting how many logins fail;
+tests/test_database.py checks that none fail with the pool.
+
+    python -m benchmarks.db_logins --logins 500 --threads 200
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import database
+
+
+def legacy_init_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            is_admin BOOLEAN DEFAULT 0
+        )
+    ''')
+    conn.commit()
+    conn.close()
+
+
+def legacy_register_user(username, password, path):
+    try:
+        conn = sqlite3.connect(path)
+        conn.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)',
+                     (username, database.hash_password(password), False))
+        conn.commit()
+        conn.close()
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+
+def legacy_verify_user(username, password, path):
+    # Every rerun of the old app ran init_db before the login form
+    legacy_init_db(path)
+    conn = sqlite3.connect(path)
+    user = conn.execute('SELECT * FROM users WHERE username = ? AND password = ?',
+                        (username, database.hash_password(password))).fetchone()
+    conn.close()
+    return {'id': user[0], 'username': user[1], 'is_admin': user[3]} if user else None
+
+
+def _email(i):
+    return f"rep{i}@buntingmagnetics.com"
+
+
+def _burst(verify, register, logins, threads, users):
+    """Run `logins` verifications plus one registration per 20 logins; return (seconds, failures)."""
+    def task(i):
+        if i % 20 == 19:
+            try:
+                return register(_email(users + i), 'pw')
+            except sqlite3.OperationalError:
+                return False
+        try:
+            return verify(_email(i % users), 'pw') is not None
+        except sqlite3.OperationalError:
+            return False
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(task, range(logins)))
+    return time.perf_counter() - start, results.count(False)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=500)
+    parser.add_argument('--threads', type=int, default=200)
+    parser.add_argument('--users', type=int, default=100)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = str(Path(tmp) / 'legacy.db')
+        pooled_path = str(Path(tmp) / 'pooled.db')
+        legacy_init_db(legacy_path)
+        for i in range(args.users):
+            legacy_register_user(_email(i), 'pw', legacy_path)
+            database.register_user(_email(i), 'pw', path=pooled_path)
+
+        legacy = _burst(lambda u, p: legacy_verify_user(u, p, legacy_path),
+                        lambda u, p: legacy_register_user(u, p, legacy_path),
+                        args.logins, args.threads, args.users)
+        pooled = _burst(lambda u, p: database.verify_user(u, p, path=pooled_path),
+                        lambda u, p: database.register_user(u, p, path=pooled_path),
+                        args.logins, args.threads, args.users)
+        database.get_pool(pooled_path).close()
+
+    print(f"{args.logins} logins on {args.threads} threads")
+    for label, (seconds, failures) in [('connect per call', legacy), ('pooled WAL', pooled)]:
+        print(f"{label:<18} {seconds * 1e3:9.1f} ms  {args.logins / seconds:8.0f} logins/s  {failures} failed")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""Cross-division de-duplication: blocked matching against all pairs.
+
+Two synthetic divisions share a known set of customers, with names and
+coordinates perturbed the way separate exports differ. Times blocked
+matching against comparing every cross-division pair of nearby rows;
+tests/test_divisions.py checks that it finds those duplicates.
+
+    python -m benchmarks.dedup --rows 5000
+"""
+import argparse
+import time
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import generate_customers
+from divisions import BLOCK_DECIMALS, NAME_SIMILARITY, duplicate_groups, merge_divisions, normalize_name
+from utils import clean_data
+
+SHARED_FRACTION = 0.1
+
+
+def _divisions(rows: int):
+    first = clean_data(generate_customers(rows, seed=1, messy_headers=False))
+    second = clean_data(generate_customers(rows, seed=2, messy_headers=False))
+    rng = np.random.default_rng(3)
+    shared = rng.choice(len(first), int(len(first) * SHARED_FRACTION), replace=False)
+    copies = first.iloc[shared].copy()
+    # Same customer as exported by another division: new ID, upper-cased name, re-geocoded
+    copies['Cust. ID'] = ['X' + c for c in copies['Cust. ID']]
+    copies['Name'] = copies['Name'].str.upper().str.replace(' Inc.', ' INC', regex=False)
+    copies['Latitude'] += rng.normal(0, 0.0005, len(copies))
+    copies['Longitude'] += rng.normal(0, 0.0005, len(copies))
+    second = second.iloc[:len(second) - len(copies)]
+    return {'A': first, 'B': pd.concat([copies, second], ignore_index=True)}
+
+
+def _all_pairs(df, max_deg=10.0 ** -BLOCK_DECIMALS):
+    """Duplicate pairs found by comparing every cross-division pair less than one block apart."""
+    names = [normalize_name(n) for n in df['Name']]
+    a = np.flatnonzero(df['Division'].to_numpy() == 'A')
+    b = np.flatnonzero(df['Division'].to_numpy() == 'B')
+    lat, lon = df['Latitude'].to_numpy(), df['Longitude'].to_numpy()
+    pairs = set()
+    for i in a:
+        near = b[(np.abs(lat[b] - lat[i]) < max_deg) & (np.abs(lon[b] - lon[i]) < max_deg)]
+        for j in near:
+            if SequenceMatcher(None, names[i], names[j]).ratio() >= NAME_SIMILARITY:
+                pairs.add((i, j))
+    return pairs
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=5000)
+    args = parser.parse_args()
+
+    frames = _divisions(args.rows)
+    combined = pd.concat([frame.assign(Division=name) for name, frame in frames.items()], ignore_index=True)
+
+    start = time.perf_counter()
+    groups = duplicate_groups(combined)
+    blocked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pairs = _all_pairs(combined)
+    brute = time.perf_counter() - start
+
+    found = {(i, j) for i, j in pairs if groups[i] == groups[j]}
+    merged = merge_divisions(frames)
+    expected = int(args.rows * SHARED_FRACTION)
+    print(f"{len(combined)} rows, {len(pairs)} duplicate pairs ({expected} planted), {len(found)} grouped")
+    print(f"blocked   {blocked * 1e3:9.1f} ms")
+    print(f"all pairs {brute * 1e3:9.1f} ms")
+    print(f"merged to {len(merged)} customers, {int((merged['Division'] == 'A/B').sum())} tagged A/B")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Micro-benchmark: vectorized distance API vs. the scalar haversine loop.
+
+tests/test_route_planner.py checks that both give the same distances.
+
+Run from the repository root with `python -m benchmarks.distance`.
+"""
+import time
+
+import numpy as np
+
+from route_planner import distance_matrix, distances_from, haversine_distance
+
+SIZES = [10, 1_000, 100_000]
+# Pairwise matrices grow quadratically, so they are only timed up to this size.
+MATRIX_MAX_POINTS = 1_000
+
+
+def _best_of(fn, repeat=3):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f"{'points':>8} {'mode':>13} {'scalar ms':>11} {'numpy ms':>10} {'speedup':>8}")
+    for n in SIZES:
+        lats = rng.uniform(25, 49, n)
+        lons = rng.uniform(-124, -67, n)
+        origin = (37.3043, -97.4395)
+        lat_list, lon_list = lats.tolist(), lons.tolist()
+
+        scalar_t, _ = _best_of(lambda: [haversine_distance(origin[0], origin[1], la, lo)
+                                        for la, lo in zip(lat_list, lon_list)])
+        vector_t, _ = _best_of(lambda: distances_from(origin, lats, lons))
+        print(f"{n:>8} {'one-to-many':>13} {scalar_t * 1e3:>11.2f} {vector_t * 1e3:>10.2f} "
+              f"{scalar_t / vector_t:>7.1f}x")
+
+        if n > MATRIX_MAX_POINTS:
+            continue
+        scalar_t, _ = _best_of(lambda: [[haversine_distance(a, b, c, d)
+                                         for c, d in zip(lat_list, lon_list)]
+                                        for a, b in zip(lat_list, lon_list)], repeat=1)
+        vector_t, _ = _best_of(lambda: distance_matrix(lats, lons))
+        print(f"{n:>8} {'pairwise':>13} {scalar_t * 1e3:>11.2f} {vector_t * 1e3:>10.2f} "
+              f"{scalar_t / vector_t:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
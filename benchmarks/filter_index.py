@@ -0,0 +1,49 @@
+"""Timing for filter_index.FilterIndex against the previous pandas mask cascade.
+
+Both cascades, in tests/filter_cascade.py, are timed over the same
+sequence of state/territory/sales-rep selections; tests/test_filter_index.py
+checks that they agree on every combination reachable from the sidebar.
+
+Run from the repository root with `python -m benchmarks.filter_index [--rows N]`.
+"""
+import argparse
+import itertools
+import time
+
+import pandas as pd
+
+from filter_index import FilterIndex
+from tests.filter_cascade import combinations, index_cascade, mask_cascade
+from utils import clean_data
+
+# Customer file replicated to --rows rows
+SOURCE = 'attached_assets/BMC.csv'
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=500_000)
+    args = parser.parse_args()
+
+    raw = pd.read_csv(SOURCE)
+    big = clean_data(pd.concat([raw] * (args.rows // len(raw) + 1), ignore_index=True).iloc[:args.rows])
+    start = time.perf_counter()
+    index = FilterIndex(big)
+    build = time.perf_counter() - start
+    cases = list(itertools.islice(combinations(big, index), 300))
+
+    start = time.perf_counter()
+    for case in cases:
+        mask_cascade(big, *case)
+    masks = time.perf_counter() - start
+    start = time.perf_counter()
+    for case in cases:
+        index_cascade(index, big, *case)
+    indexed = time.perf_counter() - start
+    print(f"Timing on {len(big)} rows, {len(cases)} reruns (index build {build * 1e3:.0f} ms):")
+    print(f"  mask cascade:  {masks / len(cases) * 1e3:8.2f} ms/rerun")
+    print(f"  index cascade: {indexed / len(cases) * 1e3:8.2f} ms/rerun")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Synthetic customer and prospect CSVs with the same schema as attached_assets.
+
+Rows are clustered around US metro areas and carry the same kinds of mess as
+the real exports: '$1,234 ' spend strings, '0'/blank/odd phone numbers and
+randomly cased headers for the columns clean_data normalizes.
+
+Run from the repository root, e.g.
+`python -m benchmarks.generate_data --sizes 10000 100000 1000000`.
+"""
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils import COLUMN_MAPPING
+
+DEFAULT_OUT = Path(__file__).parent / 'data'
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+CUSTOMER_COLUMNS = [
+    'Cust. ID', 'Name', '3-year Spend', '$2,024 ', '$2,023 ', '$2,022 ', 'Customer', 'Name.1',
+    'Address', 'City', 'State/Prov', 'Postal Code', 'Country', 'Sales Rep', 'Territory', 'Phone',
+    'Fax', 'E-Mail Address', 'Latitude', 'Longitude', 'Corrected_Address', 'prodcode',
+]
+
+# (city, state, lat, lon, relative weight, spread in degrees)
+METROS = [
+    ('New York', 'NY', 40.71, -74.01, 20, 0.6), ('Los Angeles', 'CA', 34.05, -118.24, 14, 0.7),
+    ('Chicago', 'IL', 41.88, -87.63, 12, 0.6), ('Houston', 'TX', 29.76, -95.37, 9, 0.6),
+    ('Dallas', 'TX', 32.78, -96.80, 8, 0.6), ('Atlanta', 'GA', 33.75, -84.39, 7, 0.6),
+    ('Philadelphia', 'PA', 39.95, -75.17, 7, 0.5), ('Detroit', 'MI', 42.33, -83.05, 7, 0.5),
+    ('Cleveland', 'OH', 41.50, -81.69, 5, 0.5), ('Charlotte', 'NC', 35.23, -80.84, 5, 0.5),
+    ('Minneapolis', 'MN', 44.98, -93.27, 5, 0.5), ('Denver', 'CO', 39.74, -104.99, 4, 0.5),
+    ('Seattle', 'WA', 47.61, -122.33, 4, 0.5), ('Phoenix', 'AZ', 33.45, -112.07, 4, 0.5),
+    ('Kansas City', 'MO', 39.10, -94.58, 4, 0.5), ('Wichita', 'KS', 37.69, -97.34, 3, 0.6),
+    ('St. Louis', 'MO', 38.63, -90.20, 4, 0.5), ('Milwaukee', 'WI', 43.04, -87.91, 3, 0.4),
+    ('Pittsburgh', 'PA', 40.44, -79.99, 3, 0.5), ('Nashville', 'TN', 36.16, -86.78, 3, 0.5),
+    ('Salt Lake City', 'UT', 40.76, -111.89, 2, 0.4), ('Boise', 'ID', 43.62, -116.20, 1, 0.4),
+    ('Tulsa', 'OK', 36.15, -95.99, 2, 0.5), ('Omaha', 'NE', 41.26, -95.93, 2, 0.5),
+]
+
+PRODCODES = ['GS', 'SP', 'PS', 'MDS', 'MH', 'MHMS', 'PMD', 'PP']
+NAME_WORDS = ['Magnetics', 'Machinery', 'Steel', 'Plastics', 'Recycling', 'Foods', 'Mining',
+              'Packaging', 'Industries', 'Fabrication', 'Systems', 'Controls', 'Castings']
+SUFFIXES = ['Inc.', 'LLC', 'Co.', 'Corp', 'Ltd']
+INDUSTRIES = [('Manufacturing', 'Food & Beverage'), ('Manufacturing', 'Plastic, Packaging & Containers'),
+              ('Manufacturing', 'Industrial Machinery & Equipment'), ('Energy, Utilities & Waste', 'Waste Treatment')]
+REVENUE_RANGES = ['$1 mil. - $5 mil.', '$10 mil. - $25 mil.', '$100 mil. - $250 mil.', 'Over $5 bil.', None]
+
+
+def _money(values: np.ndarray) -> np.ndarray:
+    """Format amounts the way the exports do: '$1,234 ', with ' $-   ' for zero."""
+    text = np.char.add(np.char.add('$', np.array([f"{v:,.0f}" for v in values])), ' ')
+    return np.where(values == 0, ' $-   ', text)
+
+
+def _phones(rng, n: int) -> np.ndarray:
+    area, mid, last = rng.integers(201, 990, n), rng.integers(200, 999, n), rng.integers(0, 9999, n)
+    dashed = np.array([f"{a}-{b}-{c:04d}" for a, b, c in zip(area, mid, last)], dtype=object)
+    kind = rng.random(n)
+    phones = dashed.copy()
+    phones[kind < 0.25] = '0'
+    phones[(kind >= 0.25) & (kind < 0.30)] = None
+    odd = (kind >= 0.30) & (kind < 0.35)
+    phones[odd] = [f"+1 ({p[:3]}) {p[4:7]}.{p[8:]} x{e}" for p, e in zip(dashed[odd], rng.integers(1, 99, odd.sum()))]
+    short = (kind >= 0.35) & (kind < 0.37)
+    phones[short] = [p[4:] for p in dashed[short]]
+    return phones
+
+
+def _locations(rng, n: int):
+    weights = np.array([m[4] for m in METROS], dtype=float)
+    metro = rng.choice(len(METROS), size=n, p=weights / weights.sum())
+    spread = np.array([m[5] for m in METROS])[metro]
+    lats = np.array([m[2] for m in METROS])[metro] + rng.normal(0, spread)
+    lons = np.array([m[3] for m in METROS])[metro] + rng.normal(0, spread * 1.3)
+    return metro, lats, lons
+
+
+def _names(rng, n: int) -> np.ndarray:
+    first = rng.choice(NAME_WORDS, n)
+    stem = np.array([f"{chr(65 + a)}{chr(97 + b)}{chr(97 + c)}" for a, b, c in rng.integers(0, 26, (n, 3))])
+    return np.char.add(np.char.add(np.char.add(stem, ' '), np.char.add(first, ' ')), rng.choice(SUFFIXES, n))
+
+
+def _mess_headers(rng, columns):
+    """Randomly re-case the headers clean_data is expected to normalize."""
+    styles = [str.lower, str.upper, str.title]
+    return [styles[rng.integers(0, 3)](c) if c.lower() in COLUMN_MAPPING else c for c in columns]
+
+
+def generate_customers(n: int, seed: int = 0, messy_headers: bool = True) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    metro, lats, lons = _locations(rng, n)
+    names = _names(rng, n)
+    yearly = np.round(rng.lognormal(9, 1.8, (3, n)) * (rng.random((3, n)) > 0.2))
+    street = np.array([f"{a} {w} St" for a, w in zip(rng.integers(1, 9999, n), rng.choice(NAME_WORDS, n))])
+    city = np.array([m[0] for m in METROS])[metro]
+    state = np.array([m[1] for m in METROS])[metro]
+    zips = rng.integers(10000, 99999, n).astype(str)
+    # Coordinates occasionally missing, as in the real exports
+    lat_col = lats.round(6).astype(object)
+    lat_col[rng.random(n) < 0.01] = None
+
+    df = pd.DataFrame({
+        'Cust. ID': np.char.add('SYN', np.char.zfill(np.arange(n).astype(str), 7)),
+        'Name': names,
+        '3-year Spend': _money(yearly.sum(axis=0)),
+        '$2,024 ': _money(yearly[0]),
+        '$2,023 ': _money(yearly[1]),
+        '$2,022 ': _money(yearly[2]),
+        'Customer': np.arange(n),
+        'Name.1': names,
+        'Address': street,
+        'City': city,
+        'State/Prov': state,
+        'Postal Code': zips,
+        'Country': 'USA',
+        'Sales Rep': np.char.add('S', rng.integers(100, 130, n).astype(str)),
+        'Territory': np.char.add('TR', np.char.zfill((metro % 20 + 1).astype(str), 2)),
+        'Phone': _phones(rng, n),
+        'Fax': '0',
+        'E-Mail Address': '0',
+        'Latitude': lat_col,
+        'Longitude': lons.round(6),
+        'Corrected_Address': np.char.add(np.char.add(np.char.add(street, ', '), np.char.add(city, ', ')),
+                                         np.char.add(np.char.add(state, ' '), np.char.add(zips, ', USA'))),
+        'prodcode': rng.choice(PRODCODES, n),
+    }, columns=CUSTOMER_COLUMNS)
+    if messy_headers:
+        df.columns = _mess_headers(rng, df.columns)
+    return df
+
+
+def generate_prospects(n: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + 1)
+    metro, lats, lons = _locations(rng, n)
+    industry = rng.integers(0, len(INDUSTRIES), n)
+    city = np.array([m[0] for m in METROS])[metro]
+    return pd.DataFrame({
+        'Company Name': _names(rng, n),
+        'Website': np.char.add(np.char.add('www.example', np.arange(n).astype(str)), '.com'),
+        'Revenue Range (in USD)': rng.choice(np.array(REVENUE_RANGES, dtype=object), n),
+        'Primary Industry': [INDUSTRIES[i][0] for i in industry],
+        'Primary Sub-Industry': [INDUSTRIES[i][1] for i in industry],
+        'address': np.char.add(np.char.add(rng.integers(1, 9999, n).astype(str), ' Main St, '), city),
+        'latitude': lats.round(6),
+        'longitude': lons.round(6),
+    })
+
+
+def customer_csv(out: Path, n: int) -> Path:
+    return Path(out) / f"customers_{n}.csv"
+
+
+def prospect_csv(out: Path, n: int) -> Path:
+    return Path(out) / f"prospects_{n}.csv"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--out', type=Path, default=DEFAULT_OUT)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    args.out.mkdir(parents=True, exist_ok=True)
+    for n in args.sizes:
+        generate_customers(n, args.seed).to_csv(customer_csv(args.out, n), index=False)
+        # The real prospect list is a fraction of the customer base
+        generate_prospects(max(n // 10, 25), args.seed).to_csv(prospect_csv(args.out, n), index=False)
+        print(f"wrote {customer_csv(args.out, n)} and {prospect_csv(args.out, n)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""Memory footprint of the customer data per session, before and after compaction.
+
+Before: st.cache_data gave every session its own deserialized copy of the
+full cleaned frame, and filtering copied it again. After: one compact frame
+is shared through st.cache_resource and each session only holds its
+filtered rows. tests/test_utils.py checks that the compact frame gives
+the same filter options and marker payload as the full one.
+
+    python -m benchmarks.memory --sessions 50
+    python -m benchmarks.memory --csv benchmarks/data/customers_100000.csv
+"""
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from filter_index import FilterIndex
+from utils import clean_data, compact_customers
+
+DATASETS = [Path('attached_assets') / f"{name}.csv" for name in ('BMC', 'BME', 'MAI')]
+
+
+def _mib(nbytes):
+    return nbytes / 2**20
+
+
+def _deep_bytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def report(path: Path, sessions: int):
+    full = clean_data(pd.read_csv(path))
+    compact = compact_customers(full)
+
+    # A typical session filters to its busiest state
+    state = full['State/Prov'].value_counts().index[0]
+    before_view = full[full['State/Prov'] == state].copy()
+    after_view = compact.iloc[FilterIndex(compact).rows({'State/Prov': [state]})]
+
+    full_bytes, compact_bytes = _deep_bytes(full), _deep_bytes(compact)
+    before_session = full_bytes + _deep_bytes(before_view)
+    after_session = _deep_bytes(after_view)
+    print(f"{path} ({len(full)} rows, {sessions} sessions)")
+    print(f"  frame                {_mib(full_bytes):8.2f} MiB full    {_mib(compact_bytes):8.2f} MiB compact")
+    print(f"  per session          {_mib(before_session):8.2f} MiB before  {_mib(after_session):8.2f} MiB after")
+    print(f"  all sessions         {_mib(before_session * sessions):8.2f} MiB before  "
+          f"{_mib(compact_bytes + after_session * sessions):8.2f} MiB after")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', type=Path, nargs='+', default=[p for p in DATASETS if p.exists()])
+    parser.add_argument('--sessions', type=int, default=50)
+    args = parser.parse_args()
+    for path in args.csv:
+        report(path, args.sessions)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Nearest-accounts query: index build time and query latency.
+
+tests/test_nearby.py checks the results against a brute-force scan.
+
+    python -m benchmarks.nearest --sizes 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import DEFAULT_OUT, customer_csv, generate_customers, generate_prospects
+from nearby import nearest_accounts
+from spatial_index import SpatialIndex
+from utils import clean_data, clean_prospects, compact_customers
+
+
+def _load(size: int) -> pd.DataFrame:
+    path = customer_csv(DEFAULT_OUT, size)
+    if not path.exists():
+        DEFAULT_OUT.mkdir(parents=True, exist_ok=True)
+        generate_customers(size).to_csv(path, index=False)
+    return compact_customers(clean_data(pd.read_csv(path)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--k', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        customers = _load(size)
+        prospects = clean_prospects(generate_prospects(max(size // 10, 25)))
+        start = time.perf_counter()
+        customer_index = SpatialIndex(customers['Latitude'], customers['Longitude'])
+        prospect_index = SpatialIndex(prospects['latitude'], prospects['longitude'])
+        build = time.perf_counter() - start
+
+        # Positions near real customers, as a rep in the field would be
+        origins = customers.sample(args.queries, random_state=0)[['Latitude', 'Longitude']].to_numpy(dtype=float)
+        origins += rng.normal(0, 0.05, origins.shape)
+        times = []
+        for lat, lon in origins:
+            start = time.perf_counter()
+            nearest_accounts(lat, lon, args.k, customers, customer_index, prospects, prospect_index)
+            times.append(time.perf_counter() - start)
+
+        times = np.array(times) * 1e3
+        print(f"{len(customers):>9} customers  index build {build * 1e3:7.1f} ms  "
+              f"k={args.k} query p50 {np.percentile(times, 50):6.2f} ms  p99 {np.percentile(times, 99):6.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""Customer map HTML size and build time: per-marker popups vs. map_layers.CustomerLayer.
+
+Builds the full customer map for BMC.csv and a synthetic dataset both ways:
+one folium CircleMarker with an HTML Popup per customer (as the app used
+to), and one CustomerLayer whose markers only carry their row number,
+with popups put together in the browser from the layer's lookup table.
+Reports HTML size, bytes per customer (marker columns / popup details)
+and build time; tests/test_map_layers.py checks the table decodes back to
+every customer's details.
+
+    python -m benchmarks.popups --size 100000
+"""
+import argparse
+import json
+import time
+from pathlib import Path
+
+import folium
+import pandas as pd
+
+from benchmarks.generate_data import DEFAULT_OUT, customer_csv, generate_customers
+from map_cache import render_map
+from map_layers import SPEND_TIER_RADIUS, CustomerLayer
+from utils import clean_data, compact_customers, format_currency
+
+BMC_CSV = Path(__file__).parent.parent / 'attached_assets' / 'BMC.csv'
+
+# Payload columns drawn on the map; the rest only feed popups
+MARKER_COLUMNS = ['lat', 'lon', 'radius', 'tier', 'selected', 'name']
+
+
+def _load(path: Path) -> pd.DataFrame:
+    return compact_customers(clean_data(pd.read_csv(path)))
+
+
+def _map(df: pd.DataFrame) -> folium.Map:
+    return folium.Map(location=[float(df['Latitude'].mean()), float(df['Longitude'].mean())], zoom_start=4)
+
+
+def per_marker_html(df: pd.DataFrame) -> str:
+    m = _map(df)
+    for row in df[df['Latitude'].notna() & df['Longitude'].notna()].to_dict('records'):
+        popup = f"""
+        <div style='min-width: 200px'>
+            <h4>{row['Name']}</h4>
+            <b>Territory:</b> {row['Territory']}<br>
+            <b>Sales Rep:</b> {row['Sales Rep']}<br>
+            <b>3-year Spend:</b> {format_currency(row['3-year Spend'])}<br>
+            <b>2024:</b> {format_currency(row['$2,024 '])}<br>
+            <b>2023:</b> {format_currency(row['$2,023 '])}<br>
+            <b>2022:</b> {format_currency(row['$2,022 '])}<br>
+            <b>Phone:</b> {row['Phone'] if pd.notna(row['Phone']) else 'N/A'}<br>
+            <b>Address:</b> {row['Corrected_Address']}<br>
+        </div>
+        """
+        folium.CircleMarker(
+            location=[row['Latitude'], row['Longitude']],
+            popup=folium.Popup(popup, max_width=300),
+            tooltip=row['Name'],
+            radius=int(SPEND_TIER_RADIUS[row['Spend Tier']]),
+            color='blue', weight=1.5, fill=True, fill_color='#3186cc', fill_opacity=0.4, opacity=1.0
+        ).add_to(m)
+    return render_map(m)[0]
+
+
+def layer_html(df: pd.DataFrame) -> str:
+    m = _map(df)
+    CustomerLayer(df).add_to(m)
+    return render_map(m)[0]
+
+
+def _timed(fn, df: pd.DataFrame, repeats: int):
+    best = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        html = fn(df)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return html, best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=100_000, help="rows in the synthetic dataset")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--per-marker-max', type=int, default=10_000,
+                        help="skip the per-marker build for larger datasets")
+    args = parser.parse_args()
+
+    path = customer_csv(DEFAULT_OUT, args.size)
+    if not path.exists():
+        DEFAULT_OUT.mkdir(parents=True, exist_ok=True)
+        generate_customers(args.size).to_csv(path, index=False)
+
+    for label, source in (('BMC.csv', BMC_CSV), (path.name, path)):
+        df = _load(source)
+        d = json.loads(CustomerLayer(df).payload)
+        marker_bytes = sum(len(json.dumps(d[k], separators=(',', ':'))) for k in MARKER_COLUMNS)
+        detail_bytes = sum(len(json.dumps(v, separators=(',', ':'))) for k, v in d.items() if k not in MARKER_COLUMNS)
+
+        html, seconds = _timed(layer_html, df, args.repeats)
+        print(f"{label} ({len(df)} customers)")
+        print(f"  layer:      {len(html.encode()) / 2**20:7.2f} MiB  {seconds * 1e3:8.0f} ms  per customer "
+              f"{marker_bytes / len(df):5.1f} B markers + {detail_bytes / len(df):5.1f} B popup details")
+        if len(df) <= args.per_marker_max:
+            html, seconds = _timed(per_marker_html, df, 1)
+            print(f"  per-marker: {len(html.encode()) / 2**20:7.2f} MiB  {seconds * 1e3:8.0f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Road-network distances (road_network.RoadDistances) on a seeded synthetic road graph.
+
+The graph is a jittered grid with a lake cut out of its middle and a few
+one-way streets. Reports contraction time, cold versus cached matrix
+times and how a round trip planned on the roads compares with one planned
+on straight lines. tests/test_road_network.py checks the distances.
+
+    python -m benchmarks.road_distances --side 120 --stops 60
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from road_network import RoadDistances, save_graph
+from route_planner import calculate_optimal_route, haversine
+
+# Grid spacing in degrees (about 5.5 km of latitude)
+SPACING = 0.05
+
+
+def _graph(side: int, seed: int):
+    rng = np.random.default_rng(seed)
+    rows, cols = np.divmod(np.arange(side * side), side)
+    # Junctions sit on rounded coordinates, so stops placed on them snap exactly
+    lat = np.round(40 + rows * SPACING + rng.normal(0, SPACING / 5, side * side), 4)
+    lon = np.round(-95 + cols * SPACING + rng.normal(0, SPACING / 5, side * side), 4)
+    # A round lake in the middle that roads go around
+    centre = (side - 1) / 2
+    dry = np.hypot(rows - centre, cols - centre) > side / 4
+    src, dst = [], []
+    for a in np.flatnonzero(dry):
+        r, c = divmod(a, side)
+        for b in ([a + 1] if c + 1 < side else []) + ([a + side] if r + 1 < side else []):
+            if dry[b]:
+                src.append(a)
+                dst.append(b)
+    src, dst = np.array(src), np.array(dst)
+    rlat, rlon = np.radians(lat), np.radians(lon)
+    # Winding roads are longer than the straight line between junctions
+    km = haversine(rlat[src], rlon[src], rlat[dst], rlon[dst]) * rng.uniform(1.0, 1.4, len(src))
+    oneway = rng.random(len(src)) < 0.05
+    return lat, lon, dry, src, dst, km, oneway
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--side', type=int, default=120, help="grid nodes per side")
+    parser.add_argument('--stops', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    lat, lon, dry, src, dst, km, oneway = _graph(args.side, args.seed)
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        graph_path = Path(tmp) / 'roads.npz'
+        save_graph(graph_path, lat, lon, src, dst, km, oneway)
+
+        start = time.perf_counter()
+        roads = RoadDistances(graph_path, Path(tmp) / 'cache')
+        contract_s = time.perf_counter() - start
+        start = time.perf_counter()
+        RoadDistances(graph_path, Path(tmp) / 'cache')
+        reload_s = time.perf_counter() - start
+
+        # Stops placed exactly on junctions
+        nodes = rng.choice(np.flatnonzero(dry), args.stops, replace=False)
+        s_lat, s_lon = lat[nodes], lon[nodes]
+        start = time.perf_counter()
+        roads.matrix(s_lat, s_lon)
+        cold_s = time.perf_counter() - start
+        start = time.perf_counter()
+        roads.matrix(s_lat, s_lon)
+        warm_s = time.perf_counter() - start
+
+        stops = [{'name': str(i), 'lat': a, 'lon': b} for i, (a, b) in enumerate(zip(s_lat[:12], s_lon[:12]))]
+        by_road = calculate_optimal_route(stops, round_trip=True, distances=roads)
+        by_line = calculate_optimal_route(stops, round_trip=True)
+        legs = roads.matrix([s['lat'] for s in stops], [s['lon'] for s in stops])
+
+        def road_km(route):
+            return sum(legs[int(a['name']), int(b['name'])] for a, b in zip(route, route[1:]))
+
+        print(f"{len(lat)} nodes, {len(src)} roads: contraction {contract_s:6.2f} s, reload {reload_s * 1e3:6.1f} ms")
+        print(f"{args.stops}x{args.stops} matrix: cold {cold_s * 1e3:7.1f} ms, cached {warm_s * 1e3:7.1f} ms")
+        print(f"12-stop round trip by road: {road_km(by_road):7.1f} km planned on roads, "
+              f"{road_km(by_line):7.1f} km planned on straight lines")
+
+
+if __name__ == '__main__':
+    main()
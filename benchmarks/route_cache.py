@@ -0,0 +1,45 @@
+"""Route-result cache (route_cache.RouteCache): cold solve versus repeat and reordered plans.
+
+Times a fresh solve, a repeat and a plan with the stops after the start
+reordered; tests/test_route_cache.py checks that hits return the solved
+route.
+
+    python -m benchmarks.route_cache --stops 12 60
+"""
+import argparse
+import time
+
+import numpy as np
+
+from route_cache import RouteCache
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stops', type=int, nargs='+', default=[12, 60])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    for n in args.stops:
+        lats, lons = rng.uniform(35, 45, n), rng.uniform(-100, -80, n)
+        stops = [{'name': f"stop {i}", 'lat': lat, 'lon': lon} for i, (lat, lon) in enumerate(zip(lats, lons))]
+        cache = RouteCache()
+
+        start = time.perf_counter()
+        cache.solve(stops)
+        cold_s = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.solve(stops)
+        again_s = time.perf_counter() - start
+        shuffled = [stops[0]] + [stops[i] for i in rng.permutation(np.arange(1, n))]
+        start = time.perf_counter()
+        cache.solve(shuffled)
+        reordered_s = time.perf_counter() - start
+
+        print(f"{n:>4} stops: solve {cold_s * 1e3:8.2f} ms, repeat {again_s * 1e3:6.3f} ms, "
+              f"reordered {reordered_s * 1e3:6.3f} ms")
+
+
+if __name__ == '__main__':
+    main()
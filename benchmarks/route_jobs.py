@@ -0,0 +1,64 @@
+"""Background route solves (route_jobs.RouteJobs): progress, cancellation and reuse.
+
+Submits a large route and polls it the way main.py does, timing the
+first best-so-far route, the whole solve, how quickly changing the stops
+cancels the running job and how quickly the same stops replan from the
+cache. tests/test_route_jobs.py checks the results.
+
+    python -m benchmarks.route_jobs --stops 400
+"""
+import argparse
+import time
+
+import numpy as np
+
+from route_cache import RouteCache
+from route_jobs import RouteJobs
+
+POLL_SECONDS = 0.01
+
+
+def _wait(job, timeout: float = 600):
+    first_best = None
+    start = time.perf_counter()
+    while not job.finished:
+        if first_best is None and job.best is not None:
+            first_best = time.perf_counter() - start
+        if time.perf_counter() - start > timeout:
+            raise RuntimeError(f"job still {job.status} after {timeout} s")
+        time.sleep(POLL_SECONDS)
+    return time.perf_counter() - start, first_best
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--stops', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    stops = [{'name': f"stop {i}", 'lat': lat, 'lon': lon}
+             for i, (lat, lon) in enumerate(zip(rng.uniform(35, 45, args.stops), rng.uniform(-100, -80, args.stops)))]
+    jobs = RouteJobs(RouteCache())
+    try:
+        job = jobs.submit('rep', stops)
+        solve_s, first_best_s = _wait(job)
+
+        # Changing the selection cancels the running solve
+        other = jobs.submit('rep', stops[:-1])
+        while other.status != 'running':
+            time.sleep(POLL_SECONDS)
+        jobs.current('rep', stops)
+        cancel_s, _ = _wait(other)
+
+        again = jobs.submit('rep', [stops[0]] + stops[:0:-1])
+        cached_s, _ = _wait(again)
+
+        print(f"{args.stops} stops: solve {solve_s:6.2f} s, first route after {first_best_s:6.2f} s, "
+              f"cancelled in {cancel_s * 1e3:6.1f} ms, replanned from cache in {cached_s * 1e3:6.1f} ms")
+    finally:
+        jobs.shutdown()
+
+
+if __name__ == '__main__':
+    main()
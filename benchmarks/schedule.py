@@ -0,0 +1,97 @@
+"""Multi-day, multi-rep scheduling (plan_schedule) on seeded synthetic territories.
+
+Times the solve serially and in the process pool, and compares the total
+distance with a simple nearest-base, fill-the-days baseline. Feasibility
+and determinism are covered by tests/test_schedule.py.
+
+    python -m benchmarks.schedule --territories 4 --stops 100
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.generate_data import generate_customers
+from route_planner import calculate_optimal_route, distances_from, plan_schedule
+from utils import clean_data
+
+# The Bunting facilities that serve as home bases when there is one territory
+FACILITIES = [
+    {'name': 'Bunting-Newton', 'lat': 37.3043, 'lon': -97.4395},
+    {'name': 'Bunting Elk Grove', 'lat': 42.0361, 'lon': -87.9303},
+    {'name': 'Bunting-Magnet Applications', 'lat': 41.1201, 'lon': -78.8391},
+]
+
+
+def _problem(territories: int, stops_per_territory: int, reps_per_territory: int, seed: int):
+    df = clean_data(generate_customers(20_000, seed=seed, messy_headers=False))
+    chosen = df['Territory'].value_counts().index[:territories]
+    rng = np.random.default_rng(seed)
+    stops, reps = [], []
+    for territory in chosen:
+        rows = df[df['Territory'] == territory]
+        picked = rows.iloc[rng.choice(len(rows), min(stops_per_territory, len(rows)), replace=False)]
+        stops += [{'name': n, 'lat': lat, 'lon': lon, 'territory': territory}
+                  for n, lat, lon in zip(picked['Name'], picked['Latitude'], picked['Longitude'])]
+        homes = rows.iloc[rng.choice(len(rows), reps_per_territory, replace=False)]
+        reps += [{'name': f"{territory}-rep{i + 1}", 'lat': lat, 'lon': lon, 'territory': territory}
+                 for i, (lat, lon) in enumerate(zip(homes['Latitude'], homes['Longitude']))]
+    return stops, reps
+
+
+def _baseline(stops, reps, days, max_stops):
+    """Each stop to its nearest base, then days filled in nearest-neighbour order."""
+    total = 0.0
+    for rep in reps:
+        mine = [s for s in stops if s.get('territory') == rep.get('territory')
+                and min(reps, key=lambda r: (r.get('territory') != s.get('territory'),
+                                             distances_from((s['lat'], s['lon']), [r['lat']], [r['lon']])[0])) is rep]
+        tour = calculate_optimal_route([rep] + mine)[1:]
+        for day in range(days):
+            chunk = tour[day * max_stops:(day + 1) * max_stops]
+            if chunk:
+                route = calculate_optimal_route([rep] + chunk, round_trip=True)
+                total += sum(distances_from((a['lat'], a['lon']), [b['lat']], [b['lon']])[0]
+                             for a, b in zip(route, route[1:]))
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--territories', type=int, default=4)
+    parser.add_argument('--stops', type=int, default=100, help="stops per territory")
+    parser.add_argument('--reps', type=int, default=3, help="reps per territory")
+    parser.add_argument('--days', type=int, default=5)
+    parser.add_argument('--max-stops', type=int, default=8)
+    parser.add_argument('--max-km', type=float, default=600)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    stops, reps = _problem(args.territories, args.stops, args.reps, args.seed)
+    options = dict(days=args.days, max_stops_per_day=args.max_stops, max_day_km=args.max_km, seed=args.seed)
+
+    start = time.perf_counter()
+    serial = plan_schedule(stops, reps, workers=1, **options)
+    serial_s = time.perf_counter() - start
+    start = time.perf_counter()
+    plan_schedule(stops, reps, **options)
+    pooled_s = time.perf_counter() - start
+
+    # One territory served from the Bunting facilities
+    single = [dict(stop, territory=None) for stop in stops[:args.stops]]
+    facilities = plan_schedule(single, FACILITIES, **dict(options, max_day_km=None))
+
+    capacity = args.days * args.max_stops * args.reps
+    print(f"{len(stops)} stops in {args.territories} territories, {len(reps)} reps, capacity {capacity}/territory")
+    print(f"serial {serial_s:6.2f} s   process pool {pooled_s:6.2f} s")
+    print(f"total {serial['total_km']:9.0f} km, {len(serial['unassigned'])} unassigned")
+    assigned = [s for s in stops if s not in serial['unassigned']]
+    if not serial['unassigned']:
+        print(f"baseline {_baseline(assigned, reps, args.days, args.max_stops):9.0f} km "
+              f"(nearest base, days filled in tour order, no distance limit)")
+    print(f"facilities: {facilities['total_km']:.0f} km over "
+          f"{sum(1 for r in facilities['routes'] if r['stops'])} rep-days, {len(facilities['unassigned'])} unassigned")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Customer search index: build time and query latency.
+
+Prints the top results of a few queries; tests/test_search_index.py
+checks exact lookups, prefix ranking and restricted searches.
+
+    python -m benchmarks.search --sizes 100000 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import DEFAULT_OUT, customer_csv, generate_customers
+from search_index import SearchIndex
+from utils import clean_data, compact_customers
+
+QUERIES = ['magnetics', 'Aba Mag', 'abc steel co', 'recycling houston', 'SYN00012', 'machinry', 'wichita']
+
+
+def _load(size: int) -> pd.DataFrame:
+    path = customer_csv(DEFAULT_OUT, size)
+    if not path.exists():
+        DEFAULT_OUT.mkdir(parents=True, exist_ok=True)
+        generate_customers(size).to_csv(path, index=False)
+    return compact_customers(clean_data(pd.read_csv(path)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100_000])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        df = _load(size)
+        start = time.perf_counter()
+        index = SearchIndex(df)
+        build = time.perf_counter() - start
+
+        times = []
+        for _ in range(args.repeat):
+            for query in QUERIES:
+                start = time.perf_counter()
+                index.search(query)
+                times.append(time.perf_counter() - start)
+        times = np.array(times) * 1e3
+        postings = (index._trigrams.rows.nbytes + index._name_trigrams.rows.nbytes) / 2**20
+        print(f"{len(df):>9} rows  build {build:6.2f} s  postings {postings:6.1f} MiB  "
+              f"query p50 {np.percentile(times, 50):6.1f} ms  p99 {np.percentile(times, 99):6.1f} ms")
+        for query in QUERIES[:3]:
+            print(f"          {query!r}: {index.names(index.search(query, limit=5))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+"""Cost of validating a session token on a rerun, against a password check.
+
+Forgery, expiry and revocation are covered by tests/test_sessions.py.
+
+    python -m benchmarks.sessions
+"""
+import tempfile
+import time
+from pathlib import Path
+
+import database
+import sessions
+
+
+def _per_call_us(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n * 1e6
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / 'users.db')
+        username = 'rep@buntingmagnetics.com'
+        database.register_user(username, 'pw', path=path)
+        user = database.verify_user(username, 'pw', path=path)
+
+        token = sessions.create_session(user, path=path)
+        print(f"password check   {_per_call_us(lambda: database.verify_user(username, 'pw', path=path), 2000):8.2f} us")
+        print(f"cached token     {_per_call_us(lambda: sessions.validate(token, path=path), 200000):8.2f} us")
+        sessions._cache.clear()
+        print(f"uncached token   {_per_call_us(lambda: sessions._cache.clear() or sessions.validate(token, path=path), 2000):8.2f} us")
+        database.get_pool(path).close()
+
+
+if __name__ == '__main__':
+    main()
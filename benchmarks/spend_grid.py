@@ -0,0 +1,71 @@
+"""Spend grid (spend_grid.SpendGrid): build time, rollup latency and cells per view.
+
+Pans a 1200x610 map over the dataset and reports how many cells a
+zoomed-out view renders and how long the rollup and the grid-backed
+clustering of viewport.viewport_markers take. tests/test_spend_grid.py
+checks the totals.
+
+    python -m benchmarks.spend_grid --size 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import DEFAULT_OUT, customer_csv, generate_customers
+from spatial_index import SpatialIndex
+from spend_grid import SpendGrid
+from utils import clean_data, compact_customers
+from viewport import bounds_around, viewport_markers
+
+WIDTH, HEIGHT = 1200, 610
+
+
+def _load(size: int) -> pd.DataFrame:
+    path = customer_csv(DEFAULT_OUT, size)
+    if not path.exists():
+        DEFAULT_OUT.mkdir(parents=True, exist_ok=True)
+        generate_customers(size).to_csv(path, index=False)
+    return compact_customers(clean_data(pd.read_csv(path)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--zooms', type=int, nargs='+', default=[3, 4, 6, 8])
+    parser.add_argument('--views', type=int, default=20, help="map positions per zoom")
+    args = parser.parse_args()
+
+    df = _load(args.size)
+    start = time.perf_counter()
+    grid = SpendGrid(df)
+    build_s = time.perf_counter() - start
+    print(f"{len(df)} customers: grid build {build_s:5.2f} s")
+
+    located = df[df['Latitude'].notna() & df['Longitude'].notna()]
+    index = SpatialIndex(df['Latitude'], df['Longitude'])
+    spend = df['3-year Spend'].to_numpy()
+    rng = np.random.default_rng(0)
+    centres = located[['Latitude', 'Longitude']].to_numpy(dtype=float)[rng.choice(len(located), args.views)]
+    for zoom in args.zooms:
+        cells_shown, rollup_ms, grid_ms, points_ms = [], [], [], []
+        for lat, lon in centres:
+            bounds = bounds_around(lat, lon, zoom, WIDTH, HEIGHT)
+            start = time.perf_counter()
+            cells = grid.rollup(SpendGrid.level_for_zoom(zoom), bounds)
+            rollup_ms.append((time.perf_counter() - start) * 1e3)
+            cells_shown.append(len(cells))
+            start = time.perf_counter()
+            viewport_markers(index, bounds, zoom, weights=spend, grid=grid)
+            grid_ms.append((time.perf_counter() - start) * 1e3)
+            start = time.perf_counter()
+            viewport_markers(index, bounds, zoom, weights=spend)
+            points_ms.append((time.perf_counter() - start) * 1e3)
+        print(f"zoom {zoom}: cells p50 {np.percentile(cells_shown, 50):5.0f} max {max(cells_shown):5d}  "
+              f"rollup p50 {np.percentile(rollup_ms, 50):6.2f} ms  viewport markers p50 "
+              f"{np.percentile(grid_ms, 50):6.2f} ms with grid, {np.percentile(points_ms, 50):6.2f} ms without")
+
+
+if __name__ == '__main__':
+    main()
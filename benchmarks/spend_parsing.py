@@ -0,0 +1,70 @@
+"""Benchmark: per-row spend handling before and after parsing in clean_data.
+
+Before, every render formatted the raw spend strings with a regex per cell and
+re-parsed '3-year Spend' to pick a marker radius. Now clean_data parses the
+columns once and rendering only formats floats.
+
+Run from the repository root with `python -m benchmarks.spend_parsing`.
+"""
+import re
+import time
+
+import pandas as pd
+
+from utils import SPEND_COLUMNS, SPEND_TIER_THRESHOLDS, clean_data, format_currency, parse_currency, spend_tier
+
+SOURCE = 'attached_assets/BMC.csv'
+
+
+def _legacy_render(df):
+    """What the marker loop did for every row on every rerun."""
+    for row in df[SPEND_COLUMNS].itertuples(index=False):
+        for value in row:
+            format_currency(value)
+        spend_str = str(row[0]).replace('$', '').replace(',', '').strip()
+        try:
+            spend = float(re.sub(r'[^\d.-]', '', spend_str)) if spend_str else 0
+            sum(spend > limit for limit in SPEND_TIER_THRESHOLDS)
+        except ValueError:
+            pass
+
+
+def _parse(df):
+    """The one-off vectorized parse now done in clean_data."""
+    parsed = {col: parse_currency(df[col]) for col in SPEND_COLUMNS}
+    spend_tier(parsed['3-year Spend'])
+    return pd.DataFrame(parsed)
+
+
+def _render(df):
+    """What rendering costs once the columns are numeric."""
+    for row in df[SPEND_COLUMNS].itertuples(index=False):
+        for value in row:
+            format_currency(value)
+
+
+def _time(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    raw = pd.read_csv(SOURCE)
+    rows = len(raw)
+    parsed = clean_data(raw.copy())
+
+    legacy = _time(_legacy_render, raw)
+    parse = _time(_parse, raw)
+    render = _time(_render, parsed)
+    print(f"{SOURCE}: {rows} rows")
+    print(f"  before, per rerun:     {legacy / rows * 1e6:8.2f} us/row")
+    print(f"  after, once at load:   {parse / rows * 1e6:8.2f} us/row")
+    print(f"  after, per rerun:      {render / rows * 1e6:8.2f} us/row")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""Cold start: imports on the login path, login page render and the first rerun after logging in.
+
+Import cost comes from `python -X importtime` in a fresh interpreter, for
+the modules main.py imports before the login form and for everything it
+imports once logged in. Page timings come from Streamlit's AppTest
+harness, each scenario in a fresh process against a throwaway user
+database:
+
+- warm: the login page, then the background warm-up it starts, then the
+  first authenticated rerun.
+- cold: an authenticated rerun in a process that never showed the login
+  page, which loads everything itself; the worst case the warm-up avoids.
+
+    python -m benchmarks.startup
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+REPO = Path(__file__).parent.parent
+MAIN = REPO / 'main.py'
+USERNAME, PASSWORD = 'benchmark@buntingmagnetics.com', 'benchmark'
+
+# What main.py imports before the login form, and what it needs past it
+LOGIN_IMPORTS = ['streamlit', 'streamlit.components.v1', 'profiling', 'database', 'sessions']
+APP_IMPORTS = LOGIN_IMPORTS + ['pandas', 'folium', 'streamlit_folium', 'loaders',
+                               'map_layers', 'nearby', 'route_planner', 'viewport']
+
+
+def _top_level_imports(code: str):
+    """[(module, seconds)] of the top-level imports `python -X importtime -c code` reports."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=REPO, capture_output=True, text=True, check=True)
+    top = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented under the module that triggered them
+        if cumulative.strip().isdigit() and not name.startswith('  '):
+            top.append((name.strip(), int(cumulative) / 1e6))
+    return top
+
+
+def import_times(modules):
+    """(total seconds, [(module, seconds)] heaviest first) for importing `modules` in a fresh interpreter.
+
+    Modules the interpreter imports at startup (site, encodings, ...) are left out.
+    """
+    startup = {name for name, _ in _top_level_imports('pass')}
+    top = [(name, seconds) for name, seconds in _top_level_imports('import ' + ', '.join(modules))
+           if name not in startup]
+    top.sort(key=lambda item: -item[1])
+    return sum(seconds for _, seconds in top), top
+
+
+def _session_token() -> str:
+    import database
+    import sessions
+    database.register_user(USERNAME, PASSWORD)
+    return sessions.create_session(database.verify_user(USERNAME, PASSWORD))
+
+
+def _timed_run(app):
+    start = time.perf_counter()
+    app.run()
+    seconds = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(f"main.py raised: {app.exception}")
+    return seconds
+
+
+def _logged_in_run(token: str) -> float:
+    from streamlit.testing.v1 import AppTest
+    app = AppTest.from_file(str(MAIN), default_timeout=300)
+    app.session_state['session_token'] = token
+    seconds = _timed_run(app)
+    if app.error or [r.label for r in app.radio][:1] != ['Select Data Source']:
+        raise RuntimeError(f"not logged in: {[e.value for e in app.error]}")
+    return seconds
+
+
+def run_scenario(name: str) -> dict:
+    """One scenario in this (fresh) process; see the module docstring."""
+    from streamlit.testing.v1 import AppTest
+    token = _session_token()
+    if name == 'cold':
+        return {'first_run_s': _logged_in_run(token)}
+
+    app = AppTest.from_file(str(MAIN), default_timeout=300)
+    login_s = _timed_run(app)
+    warm_up = [t for t in threading.enumerate() if t.name == 'warm-up']
+    if len(warm_up) != 1:
+        raise RuntimeError(f"expected one warm-up thread after the login page, found {len(warm_up)}")
+    start = time.perf_counter()
+    warm_up[0].join()
+    warm_up_s = time.perf_counter() - start
+    return {'login_s': login_s, 'warm_up_s': warm_up_s, 'first_run_s': _logged_in_run(token)}
+
+
+def _scenario_in_subprocess(name: str, env: dict) -> dict:
+    result = subprocess.run([sys.executable, '-m', 'benchmarks.startup', '--scenario', name],
+                            cwd=REPO, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"scenario {name} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scenario', choices=['warm', 'cold'], help=argparse.SUPPRESS)
+    parser.add_argument('--repeats', type=int, default=3, help="fresh processes per measurement")
+    args = parser.parse_args()
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario)))
+        return
+
+    for label, modules in (('login path', LOGIN_IMPORTS), ('full app', APP_IMPORTS)):
+        totals = [import_times(modules) for _ in range(args.repeats)]
+        total, top = min(totals, key=lambda t: t[0])
+        heaviest = ', '.join(f"{name} {seconds * 1e3:.0f} ms" for name, seconds in top[:4])
+        print(f"imports, {label:<10}: {total * 1e3:6.0f} ms  ({heaviest})")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, CUSTOMERMAP_DB=os.path.join(tmp, 'users.db'),
+                   CUSTOMERMAP_PROFILE_LOG=os.path.join(tmp, 'profile.jsonl'), STREAMLIT_LOGGER_LEVEL='error')
+        for name in ('warm', 'cold'):
+            runs = [_scenario_in_subprocess(name, env) for _ in range(args.repeats)]
+            best = {key: min(run[key] for run in runs) for key in runs[0]}
+            print(f"{name}: " + '  '.join(f"{key[:-2].replace('_', ' ')} {seconds * 1e3:6.0f} ms"
+                                          for key, seconds in best.items()))
+
+
+if __name__ == '__main__':
+    main()
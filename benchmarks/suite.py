@@ -0,0 +1,171 @@
+"""End-to-end benchmark of the data pipeline on synthetic datasets.
+
+For each dataset size this times every pipeline stage the app runs (CSV
+load, clean_data, filter index build and cascade, map build/serialization,
+route solving) and records each stage's peak traced memory. Results are
+written as JSON so runs on different commits can be compared:
+
+    python -m benchmarks.suite --sizes 10000 100000
+    python -m benchmarks.suite --compare benchmarks/results/<older>.json
+
+Missing synthetic CSVs are generated first (see benchmarks.generate_data).
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+import folium
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import DEFAULT_OUT, customer_csv, generate_customers
+from filter_index import FilterIndex
+from map_cache import render_map
+from map_layers import CustomerLayer
+from route_planner import calculate_optimal_route
+from utils import clean_data
+
+RESULTS_DIR = Path(__file__).parent / 'results'
+ROUTE_SIZES = [12, 60]
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def _measure(fn, memory: bool):
+    """(result, seconds, peak traced bytes) for one call of `fn`.
+
+    Timing and memory come from separate calls, since tracing slows
+    allocation-heavy code down.
+    """
+    start = time.perf_counter()
+    result = fn()
+    seconds = time.perf_counter() - start
+    peak = None
+    if memory:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result, seconds, peak
+
+
+def _stages(path: Path):
+    """Yield (stage, fn) pairs; each fn may use the results of earlier stages."""
+    state = {}
+
+    def load():
+        state['raw'] = pd.read_csv(path)
+        return {'rows': len(state['raw'])}
+
+    def clean():
+        state['df'] = clean_data(state['raw'].copy())
+        return {'rows': len(state['df'])}
+
+    def filter_build():
+        state['index'] = FilterIndex(state['df'])
+        return {}
+
+    def filter_cascade():
+        index = state['index']
+        # The busiest state and its busiest territory, as a rep would pick them
+        top_state = state['df']['State/Prov'].value_counts().index[0]
+        selections = {'State/Prov': [top_state]}
+        territory = state['df'].loc[state['df']['State/Prov'] == top_state, 'Territory'].mode()[0]
+        index.options('Territory', selections)
+        selections['Territory'] = territory
+        index.options('Sales Rep', selections)
+        selections['Sales Rep'] = 'All'
+        state['filtered'] = state['df'].iloc[index.rows(selections)]
+        return {'rows': len(state['filtered'])}
+
+    def map_build():
+        filtered = state['filtered']
+        m = folium.Map(location=[filtered['Latitude'].mean(), filtered['Longitude'].mean()], zoom_start=4)
+        CustomerLayer(filtered).add_to(m)
+        html, _ = render_map(m)
+        return {'markers': len(filtered), 'html_bytes': len(html.encode())}
+
+    def route(n):
+        def solve():
+            sample = state['df'].sample(n, random_state=0)
+            stops = [{'name': name, 'lat': lat, 'lon': lon}
+                     for name, lat, lon in zip(sample['Name'], sample['Latitude'], sample['Longitude'])]
+            calculate_optimal_route(stops)
+            return {'stops': n}
+        return solve
+
+    yield 'load', load
+    yield 'clean', clean
+    yield 'filter_build', filter_build
+    yield 'filter_cascade', filter_cascade
+    yield 'map_build', map_build
+    for n in ROUTE_SIZES:
+        yield f'route_{n}', route(n)
+
+
+def run(sizes, data_dir: Path, memory: bool):
+    results = []
+    for size in sizes:
+        path = customer_csv(data_dir, size)
+        if not path.exists():
+            data_dir.mkdir(parents=True, exist_ok=True)
+            generate_customers(size).to_csv(path, index=False)
+        for stage, fn in _stages(path):
+            info, seconds, peak = _measure(fn, memory)
+            results.append({'size': size, 'stage': stage, 'seconds': seconds,
+                            'peak_bytes': peak, **info})
+            mem = f"{peak / 2**20:9.1f} MiB" if peak is not None else ''
+            print(f"{size:>9} {stage:<15} {seconds * 1e3:10.1f} ms {mem}")
+    return results
+
+
+def compare(current, baseline_path: Path):
+    baseline = {(r['size'], r['stage']): r for r in json.loads(baseline_path.read_text())['results']}
+    print(f"\nCompared with {baseline_path}:")
+    for r in current:
+        old = baseline.get((r['size'], r['stage']))
+        if old:
+            print(f"{r['size']:>9} {r['stage']:<15} {r['seconds'] / old['seconds']:6.2f}x time")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--data', type=Path, default=DEFAULT_OUT)
+    parser.add_argument('--report', type=Path)
+    parser.add_argument('--compare', type=Path)
+    parser.add_argument('--no-memory', action='store_true', help="skip the tracemalloc pass")
+    args = parser.parse_args()
+
+    commit = _git_commit()
+    results = run(args.sizes, args.data, memory=not args.no_memory)
+    report = {
+        'commit': commit,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    path = args.report or RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(report, indent=2))
+    print(f"\nReport written to {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
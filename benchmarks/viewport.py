@@ -0,0 +1,70 @@
+"""Viewport-driven markers (viewport.viewport_markers): features and payload per render.
+
+Pans a 1200x610 map across the continental US at several zoom levels and
+reports, per zoom, how many features a render sends, the size of the map
+layer payload and the query time. tests/test_viewport.py checks that the
+markers account for every customer in view.
+
+    python -m benchmarks.viewport --size 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generate_data import DEFAULT_OUT, customer_csv, generate_customers
+from map_layers import ClusterLayer, CustomerLayer
+from spatial_index import SpatialIndex
+from utils import clean_data, compact_customers
+from viewport import bounds_around, viewport_markers
+
+WIDTH, HEIGHT = 1200, 610
+
+
+def _load(size: int) -> pd.DataFrame:
+    path = customer_csv(DEFAULT_OUT, size)
+    if not path.exists():
+        DEFAULT_OUT.mkdir(parents=True, exist_ok=True)
+        generate_customers(size).to_csv(path, index=False)
+    return compact_customers(clean_data(pd.read_csv(path)))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--size', type=int, default=1_000_000)
+    parser.add_argument('--zooms', type=int, nargs='+', default=[4, 6, 8, 10, 12])
+    parser.add_argument('--views', type=int, default=20, help="map positions per zoom")
+    args = parser.parse_args()
+
+    df = _load(args.size)
+    index = SpatialIndex(df['Latitude'], df['Longitude'])
+    spend = df['3-year Spend'].to_numpy()
+    rng = np.random.default_rng(0)
+    # Views centred on real customers, as a rep panning around a territory would see
+    centres = df[['Latitude', 'Longitude']].to_numpy(dtype=float)[rng.choice(len(df), args.views)]
+    print(f"{len(df)} customers")
+    for zoom in args.zooms:
+        times, features, payload = [], [], []
+        for lat, lon in centres:
+            bounds = bounds_around(lat, lon, zoom, WIDTH, HEIGHT)
+            start = time.perf_counter()
+            ids, clusters = viewport_markers(index, bounds, zoom, weights=spend)
+            times.append(time.perf_counter() - start)
+
+            if clusters is None:
+                layer = CustomerLayer(df.iloc[ids])
+                features.append(len(ids))
+            else:
+                layer = ClusterLayer(clusters)
+                features.append(len(clusters))
+            payload.append(len(layer.payload))
+
+        times = np.array(times) * 1e3
+        print(f"zoom {zoom:>2}: features p50 {np.percentile(features, 50):6.0f} max {max(features):6d}  "
+              f"payload max {max(payload) / 1024:7.1f} KiB  query p50 {np.percentile(times, 50):6.1f} ms "
+              f"p99 {np.percentile(times, 99):6.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+import profiling
+
+# Cleaned frames are stored here as Parquet, next to a small JSON manifest
+CACHE_DIR = Path(os.environ.get('CUSTOMERMAP_CACHE_DIR', Path(__file__).parent / '.cache' / 'datasets'))
+
+# Bump when a cleaning function changes its output, so stale entries are rebuilt
+CACHE_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 of a file's contents, read in 1 MiB chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _entry_name(path: Path, clean: Callable) -> str:
+    key = f"{path.resolve()}|{clean.__module__}.{clean.__qualname__}|v{CACHE_VERSION}"
+    return hashlib.sha256(key.encode()).hexdigest()[:24]
+
+
+def _read_manifest(manifest: Path) -> dict:
+    try:
+        return json.loads(manifest.read_text())
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_atomic(target: Path, write: Callable[[Path], None]):
+    """Write through a temp file and rename, so readers never see partial files."""
+    tmp = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    try:
+        write(tmp)
+        os.replace(tmp, target)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+
+def _read_frame(parquet: Path) -> pd.DataFrame:
+    df = pd.read_parquet(parquet)
+    # Parquet hands missing strings back as None; restore NaN like read_csv gives
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].fillna(np.nan)
+    return df
+
+
+def load_cleaned(path, clean: Callable[[pd.DataFrame], pd.DataFrame]) -> pd.DataFrame:
+    """Return `clean(pd.read_csv(path))`, reusing a Parquet copy on disk when possible.
+
+    An entry is reused when the CSV's size and mtime match the manifest, or,
+    if only the mtime changed, when its SHA-256 still matches. Anything else
+    re-reads and re-cleans the CSV and rewrites the entry.
+    """
+    path = Path(path)
+    stat = path.stat()
+    name = _entry_name(path, clean)
+    manifest_path = CACHE_DIR / f"{name}.json"
+    parquet_path = CACHE_DIR / f"{name}.parquet"
+    manifest = _read_manifest(manifest_path)
+
+    if parquet_path.exists() and manifest.get('size') == stat.st_size:
+        if manifest.get('mtime_ns') == stat.st_mtime_ns:
+            return _read_frame(parquet_path)
+        digest = file_digest(path)
+        if manifest.get('sha256') == digest:
+            manifest['mtime_ns'] = stat.st_mtime_ns
+            _write_atomic(manifest_path, lambda tmp: tmp.write_text(json.dumps(manifest)))
+            return _read_frame(parquet_path)
+    else:
+        digest = None
+
+    with profiling.stage('csv_read'):
+        raw = pd.read_csv(path)
+    with profiling.stage('clean_data'):
+        df = clean(raw)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        _write_atomic(parquet_path, lambda tmp: df.to_parquet(tmp))
+        manifest = {
+            'source': str(path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': digest or file_digest(path),
+        }
+        _write_atomic(manifest_path, lambda tmp: tmp.write_text(json.dumps(manifest)))
+    except (OSError, ValueError, TypeError) as e:
+        # Columns Arrow cannot store (mixed types) or a read-only disk just mean no cache
+        logger.warning("Could not cache cleaned %s: %s", path, e)
+    return df
@@ -1,21 +1,117 @@
-
 import sqlite3
 import hashlib
+import os
+import queue
+import threading
+from contextlib import contextmanager
 from typing import Optional
 
-def init_db():
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            is_admin BOOLEAN DEFAULT 0
-        )
-    ''')
-    conn.commit()
-    conn.close()
+DB_PATH = os.environ.get('CUSTOMERMAP_DB', 'users.db')
+
+# Connections kept open per database; Streamlit runs each rerun on a fresh
+# thread, so connections are pooled rather than tied to threads
+POOL_SIZE = 8
+BUSY_TIMEOUT_MS = 5000
+
+# Schema migrations, applied in order; PRAGMA user_version records how many have run
+MIGRATIONS = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT UNIQUE NOT NULL,
+        password TEXT NOT NULL,
+        is_admin BOOLEAN DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        token_id TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        revoked BOOLEAN DEFAULT 0
+    )
+    ''',
+    'CREATE INDEX IF NOT EXISTS sessions_user ON sessions(user_id)',
+    'CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)',
+]
+
+_pools = {}
+_migrated = set()
+_lock = threading.Lock()
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                           cached_statements=64)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute(f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}')
+    return conn
+
+
+class ConnectionPool:
+    """A bounded set of reusable connections to one SQLite database.
+
+    Connections are handed out to one thread at a time and returned after
+    use; each keeps its own prepared-statement cache.
+    """
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self):
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = _connect(self.path)
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+def get_pool(path: Optional[str] = None) -> ConnectionPool:
+    path = path or DB_PATH
+    with _lock:
+        if path not in _pools:
+            _pools[path] = ConnectionPool(path)
+        return _pools[path]
+
+
+def init_db(path: Optional[str] = None):
+    """Bring the schema up to date; runs once per database per process."""
+    path = path or DB_PATH
+    with _lock:
+        if path in _migrated:
+            return
+        conn = _connect(path)
+        try:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            for i, statement in enumerate(MIGRATIONS[version:], start=version + 1):
+                with conn:
+                    conn.execute(statement)
+                    conn.execute(f'PRAGMA user_version={i}')
+        finally:
+            conn.close()
+        _migrated.add(path)
 
 def hash_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
@@ -23,28 +119,24 @@ def hash_password(password: str) -> str:
 def validate_bunting_email(email: str) -> bool:
     return email.endswith('@buntingmagnetics.com')
 
-def register_user(username: str, password: str, is_admin: bool = False) -> bool:
+def register_user(username: str, password: str, is_admin: bool = False, path: Optional[str] = None) -> bool:
     if not validate_bunting_email(username):
         return False
+    init_db(path)
     try:
-        conn = sqlite3.connect('users.db')
-        c = conn.cursor()
-        c.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)',
-                 (username, hash_password(password), is_admin))
-        conn.commit()
-        conn.close()
+        with get_pool(path).connection() as conn, conn:
+            conn.execute('INSERT INTO users (username, password, is_admin) VALUES (?, ?, ?)',
+                         (username, hash_password(password), is_admin))
         return True
     except sqlite3.IntegrityError:
         return False
 
-def verify_user(username: str, password: str) -> Optional[dict]:
-    conn = sqlite3.connect('users.db')
-    c = conn.cursor()
-    c.execute('SELECT * FROM users WHERE username = ? AND password = ?',
-             (username, hash_password(password)))
-    user = c.fetchone()
-    conn.close()
-    
+def verify_user(username: str, password: str, path: Optional[str] = None) -> Optional[dict]:
+    init_db(path)
+    with get_pool(path).connection() as conn:
+        user = conn.execute('SELECT id, username, is_admin FROM users WHERE username = ? AND password = ?',
+                            (username, hash_password(password))).fetchone()
+
     if user:
-        return {'id': user[0], 'username': user[1], 'is_admin': user[3]}
+        return {'id': user[0], 'username': user[1], 'is_admin': user[2]}
     return None
@@ -0,0 +1,127 @@
+import re
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+from route_planner import distance_matrix
+from utils import SPEND_COLUMNS, spend_tier
+
+# Coordinates are rounded to this many decimals to form blocks (~1 km);
+# only rows in the same or an adjacent block are compared by name
+BLOCK_DECIMALS = 2
+
+# Minimum similarity of normalized names for two nearby rows to be one customer
+NAME_SIMILARITY = 0.85
+
+_LEGAL_SUFFIXES = re.compile(r'\b(inc|llc|co|corp|corporation|company|ltd|limited|lp|plc)\b')
+_NON_ALNUM = re.compile(r'[^a-z0-9 ]+')
+
+
+def normalize_name(name) -> str:
+    """Lower-cased name without punctuation or legal suffixes, for matching."""
+    text = _NON_ALNUM.sub(' ', str(name).lower().replace('&', ' and '))
+    return ' '.join(_LEGAL_SUFFIXES.sub(' ', text).split())
+
+
+class _Groups:
+    """Union-find over row positions, where a group holds at most one row per division."""
+
+    def __init__(self, divisions: np.ndarray):
+        self.parent = np.arange(len(divisions))
+        self.divisions = [frozenset([d]) for d in divisions.tolist()]
+
+    def find(self, i: int) -> int:
+        while self.parent[i] != i:
+            self.parent[i] = self.parent[self.parent[i]]
+            i = self.parent[i]
+        return i
+
+    def union(self, i: int, j: int) -> bool:
+        """Join the groups of rows i and j unless they share a division; True if joined."""
+        a, b = self.find(i), self.find(j)
+        if a == b or self.divisions[a] & self.divisions[b]:
+            return False
+        root, child = min(a, b), max(a, b)
+        self.parent[child] = root
+        self.divisions[root] = self.divisions[a] | self.divisions[b]
+        return True
+
+
+def duplicate_groups(df: pd.DataFrame) -> np.ndarray:
+    """Group label per row; rows from different divisions describing one customer share a label.
+
+    Rows match on equal 'Cust. ID' with equal normalized names, or on
+    similar normalized names within adjacent coordinate blocks. A group
+    never holds two rows of the same division, so a division's separate
+    locations are never summed into one customer.
+    """
+    n = len(df)
+    divisions = df['Division'].to_numpy()
+    groups = _Groups(divisions)
+    names = [normalize_name(name) for name in df['Name']]
+    lats = df['Latitude'].to_numpy(dtype=np.float64)
+    lons = df['Longitude'].to_numpy(dtype=np.float64)
+
+    if 'Cust. ID' in df.columns:
+        keys = df['Cust. ID'].astype(str).str.strip().str.upper() + '|' + pd.Series(names, index=df.index)
+        keys = keys[df['Cust. ID'].notna().to_numpy()].reset_index(drop=True)
+        positions = np.flatnonzero(df['Cust. ID'].notna().to_numpy())
+        for rows in keys.groupby(keys.to_numpy()).indices.values():
+            rows = positions[rows]
+            if len(set(divisions[rows].tolist())) < 2:
+                continue
+            # A division's own rows sharing a key are separate ship-to locations:
+            # rows of different divisions are paired nearest first, and a group
+            # takes at most one row of each division
+            dist = distance_matrix(lats[rows], lons[rows])
+            for a, b in zip(*np.unravel_index(np.argsort(dist, axis=None, kind='stable'), dist.shape)):
+                if a < b and divisions[rows[a]] != divisions[rows[b]]:
+                    groups.union(rows[a], rows[b])
+
+    scale = 10 ** BLOCK_DECIMALS
+    cell_lat = np.floor(lats * scale).astype(np.int64)
+    cell_lon = np.floor(lons * scale).astype(np.int64)
+    blocks: Dict[tuple, List[int]] = defaultdict(list)
+    for i, cell in enumerate(zip(cell_lat.tolist(), cell_lon.tolist())):
+        blocks[cell].append(i)
+
+    for (lat, lon), rows in blocks.items():
+        # Each pair of adjacent blocks is visited once, from its lower-left member
+        neighbours = [rows] + [blocks.get((lat + dlat, lon + dlon), []) for dlat, dlon in
+                               ((0, 1), (1, -1), (1, 0), (1, 1))]
+        for k, others in enumerate(neighbours):
+            for a_pos, i in enumerate(rows):
+                for j in (rows[a_pos + 1:] if k == 0 else others):
+                    if divisions[i] == divisions[j] or groups.find(i) == groups.find(j):
+                        continue
+                    if SequenceMatcher(None, names[i], names[j]).ratio() >= NAME_SIMILARITY:
+                        groups.union(i, j)
+    return np.array([groups.find(i) for i in range(n)])
+
+
+def merge_divisions(frames: Dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Concatenate cleaned customer frames from several divisions and merge duplicates.
+
+    `frames` maps a division name to its cleaned frame. Each merged customer
+    keeps the first division's details, spend summed over its divisions and a
+    'Division' tag such as 'BMC/MAI'.
+    """
+    df = pd.concat([frame.assign(Division=name) for name, frame in frames.items()], ignore_index=True)
+    if df.empty:
+        return df
+    group = duplicate_groups(df)
+    first = ~pd.Series(group).duplicated().to_numpy()
+
+    merged = df[first].reset_index(drop=True)
+    by_group = df.groupby(group, sort=False)
+    divisions = by_group['Division'].agg(lambda d: '/'.join(dict.fromkeys(d)))
+    merged['Division'] = divisions.to_numpy()
+    for col in SPEND_COLUMNS:
+        if col in df.columns:
+            merged[col] = by_group[col].sum(min_count=1).to_numpy()
+    if '3-year Spend' in merged.columns:
+        merged['Spend Tier'] = spend_tier(merged['3-year Spend'])
+    return merged
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Sidebar filter columns, in cascade order
+FILTER_COLUMNS = ['State/Prov', 'Territory', 'Sales Rep']
+
+# Option lists memoized per index; the index is shared by every session
+OPTIONS_CACHE_SIZE = 1024
+
+
+class FilterIndex:
+    """Inverted indexes for the State -> Territory -> Sales Rep filter cascade.
+
+    Each filter column is stored as a categorical; for every category the
+    sorted row positions holding it are kept as one slice of a single array.
+    Filtering intersects those position arrays instead of masking and copying
+    the frame, and the option lists shown by each widget are memoized per
+    combination of upstream selections (in an LRU of OPTIONS_CACHE_SIZE
+    entries, safe to share between sessions).
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str] = FILTER_COLUMNS):
+        self.n_rows = len(df)
+        self.all_rows = np.arange(self.n_rows)
+        self.codes: Dict[str, np.ndarray] = {}
+        self.categories: Dict[str, List[str]] = {}
+        self._positions: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lookup: Dict[str, Dict[str, int]] = {}
+        self._options: "OrderedDict[tuple, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+        for col in columns:
+            cat = pd.Categorical(df[col])
+            codes = cat.codes.astype(np.int64)
+            # Rows grouped by category code; category i owns order[bounds[i]:bounds[i + 1]].
+            # Missing values (code -1) sort first and are left out of every group.
+            order = np.argsort(codes, kind='stable')
+            counts = np.bincount(codes[codes >= 0], minlength=len(cat.categories))
+            start = int((codes < 0).sum())
+            bounds = start + np.concatenate([[0], np.cumsum(counts)])
+            self.codes[col] = codes
+            self.categories[col] = cat.categories.tolist()
+            self._positions[col] = (order, bounds)
+            self._lookup[col] = {value: i for i, value in enumerate(self.categories[col])}
+
+    def rows_for(self, column: str, values: Iterable[str]) -> np.ndarray:
+        """Sorted row positions where `column` equals any of `values`."""
+        order, bounds = self._positions[column]
+        groups = [order[bounds[i]:bounds[i + 1]]
+                  for i in (self._lookup[column].get(v) for v in values) if i is not None]
+        if not groups:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate(groups))
+
+    def rows(self, selections: Optional[Dict[str, object]] = None) -> np.ndarray:
+        """Sorted row positions matching every selection.
+
+        `selections` maps a column to a single value, a list of values, or
+        "All"/None/[] for no filter on that column.
+        """
+        rows = self.all_rows
+        for col, selected in (selections or {}).items():
+            values = _as_values(selected)
+            if not values:
+                continue
+            matched = self.rows_for(col, values)
+            rows = matched if rows is self.all_rows else np.intersect1d(rows, matched, assume_unique=True)
+        return rows
+
+    def options(self, column: str, selections: Optional[Dict[str, object]] = None) -> List[str]:
+        """Sorted distinct values of `column` among rows matching `selections`."""
+        # The same selection made in another order, or an "All", shares an entry
+        selected = {col: _as_values(v) for col, v in (selections or {}).items()}
+        key = (column,) + tuple(sorted((col, tuple(sorted(values))) for col, values in selected.items() if values))
+        with self._lock:
+            options = self._options.get(key)
+            if options is not None:
+                self._options.move_to_end(key)
+                return options
+        codes = self.codes[column][self.rows(selections)]
+        present = np.unique(codes[codes >= 0])
+        categories = self.categories[column]
+        options = [categories[i] for i in present]
+        with self._lock:
+            self._options[key] = options
+            while len(self._options) > OPTIONS_CACHE_SIZE:
+                self._options.popitem(last=False)
+        return options
+
+
+def _as_values(selected) -> List[str]:
+    if selected is None or selected == "All":
+        return []
+    if isinstance(selected, str):
+        return [selected]
+    return list(selected)
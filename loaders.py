@@ -0,0 +1,107 @@
+import atexit
+import os
+
+import streamlit as st
+
+from data_cache import load_cleaned
+from divisions import merge_divisions
+from filter_index import FilterIndex
+from map_cache import MapHtmlCache
+from road_network import ROAD_GRAPH_PATH, open_road_distances
+from route_cache import RouteCache
+from route_jobs import RouteJobs
+from search_index import SearchIndex
+from spatial_index import SpatialIndex
+from spend_grid import SpendGrid
+from utils import clean_data, clean_prospects, compact_customers
+
+DATA_SOURCES = {
+    "BMC": "attached_assets/BMC.csv",
+    "BME": "attached_assets/BME.csv",
+    "MAI": "attached_assets/MAI.csv",
+}
+ALL_DIVISIONS = "All divisions"
+PROSPECTS_PATH = "attached_assets/prospectlist.csv"
+
+# Sources whose CSV is present; missing ones are left out of the choices
+AVAILABLE_SOURCES = [name for name, path in DATA_SOURCES.items() if os.path.exists(path)]
+
+
+@st.cache_resource
+def load_data(data_source):
+    # One compact frame shared by every session; treat it as read-only
+    if data_source == ALL_DIVISIONS:
+        frames = {name: load_cleaned(DATA_SOURCES[name], clean_data) for name in AVAILABLE_SOURCES}
+        return compact_customers(merge_divisions(frames))
+    return compact_customers(load_cleaned(DATA_SOURCES[data_source], clean_data))
+
+# Load and prepare prospects data
+@st.cache_data
+def load_prospects():
+    return load_cleaned(PROSPECTS_PATH, clean_prospects)
+
+# Spatial index over the prospects, built once per process
+@st.cache_resource
+def load_prospect_index():
+    df_prospects = load_prospects()
+    return SpatialIndex(df_prospects['latitude'], df_prospects['longitude'])
+
+# Spatial index over the selected data source, built once per process
+@st.cache_resource
+def load_customer_index(data_source):
+    df_customers = load_data(data_source)
+    return SpatialIndex(df_customers['Latitude'], df_customers['Longitude'])
+
+# Filter indexes over the selected data source, built once per process
+@st.cache_resource
+def load_filter_index(data_source):
+    return FilterIndex(load_data(data_source))
+
+# Spend per grid cell and territory at every zoom level, built once per process
+@st.cache_resource
+def load_spend_grid(data_source):
+    return SpendGrid(load_data(data_source))
+
+# Customer search index over the selected data source, built once per process
+@st.cache_resource
+def load_search_index(data_source):
+    return SearchIndex(load_data(data_source))
+
+# Road distances over the graph at ROAD_GRAPH_PATH, contracted once per process
+@st.cache_resource
+def load_road_distances():
+    return open_road_distances(ROAD_GRAPH_PATH)
+
+# Rendered base maps, shared by all sessions
+@st.cache_resource
+def get_map_cache():
+    return MapHtmlCache()
+
+# Solved routes, shared by all sessions
+@st.cache_resource
+def get_route_cache():
+    return RouteCache()
+
+# Route solves running off the script thread, one current job per session
+@st.cache_resource
+def get_route_jobs():
+    jobs = RouteJobs(get_route_cache())
+    # Stop the solver processes and their manager when the server exits
+    atexit.register(jobs.shutdown)
+    return jobs
+
+# Everything the first rerun after logging in loads for the default data source,
+# and the route solver processes. Runs once per process; the loaders it calls are nested in it, so they show no
+# spinner when it runs off a script thread.
+@st.cache_resource(show_spinner=False)
+def warm_caches():
+    if AVAILABLE_SOURCES:
+        source = AVAILABLE_SOURCES[0]
+        load_data(source)
+        load_filter_index(source)
+        load_search_index(source)
+        load_spend_grid(source)
+        load_customer_index(source)
+    load_prospects()
+    load_prospect_index()
+    get_route_jobs().start()
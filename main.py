@@ -1,8 +1,9 @@
+import importlib
+import json
+import threading
 import streamlit as st
-import pandas as pd
-import folium
-from streamlit_folium import folium_static
-from utils import clean_data, format_currency
+import streamlit.components.v1 as components
+import profiling
 
 # Page configuration
 st.set_page_config(
@@ -32,15 +33,57 @@ st.title("Bunting-Newton")
 st.markdown("### Customer Location Viewer")
 
 from database import init_db, register_user, verify_user
+import sessions
+
+
+def _warm_up():
+    for module in ('folium', 'streamlit_folium', 'map_layers'):
+        importlib.import_module(module)
+    importlib.import_module('loaders').warm_caches()
+
+# Import the map and data modules and load the default data source in the
+# background, once per process, while the first visitor is logging in
+@st.cache_resource(show_spinner=False)
+def start_warm_up():
+    thread = threading.Thread(target=_warm_up, name='warm-up', daemon=True)
+    thread.start()
+    return thread
+
+def _write_session_cookie(token, max_age):
+    # Streamlit gives the script no response headers, so the cookie is set by
+    # the page; SameSite=Strict keeps it off requests from other sites
+    value = f"{sessions.SESSION_COOKIE}={token}; Max-Age={max_age}; Path=/; SameSite=Strict"
+    components.html(f"""<script>
+        window.parent.document.cookie = {json.dumps(value)} +
+            (window.parent.location.protocol === 'https:' ? '; Secure' : '');
+    </script>""", height=0)
 
 # Initialize database
 init_db()
 
-# Session state initialization
-if 'authenticated' not in st.session_state:
-    st.session_state.authenticated = False
-if 'user' not in st.session_state:
-    st.session_state.user = None
+# Session state initialization: the session token decides who the user is on
+# every rerun. It is kept in this browser session's state and in a cookie, so a
+# page reload stays logged in without the token ever appearing in the URL.
+cookie_token = st.context.cookies.get(sessions.SESSION_COOKIE)
+token = st.session_state.get('session_token') or cookie_token
+user = sessions.validate(token)
+# Links from when tokens were passed in the URL may still carry one; never keep it there
+st.query_params.pop('session', None)
+st.session_state.session_token = token if user else None
+st.session_state.authenticated = user is not None
+st.session_state.user = user
+
+# The cookie the browser sent is read once per connection, so remember what was
+# written since and only write when the browser's copy is out of date
+if user is not None and cookie_token != token and st.session_state.get('cookie_token') != token:
+    _write_session_cookie(token, sessions.SESSION_TTL_SECONDS)
+    st.session_state.cookie_token = token
+elif user is None and cookie_token and st.session_state.get('cookie_token') != '':
+    _write_session_cookie('', 0)
+    st.session_state.cookie_token = ''
+
+# Record per-stage timings for this rerun
+profiling.begin_run(user=st.session_state.user['username'] if st.session_state.user else None)
 
 # Authentication UI
 if not st.session_state.authenticated:
@@ -52,8 +95,8 @@ if not st.session_state.authenticated:
         if st.button("Login"):
             user = verify_user(username, password)
             if user:
-                st.session_state.authenticated = True
-                st.session_state.user = user
+                token = sessions.create_session(user)
+                st.session_state.session_token = token
                 st.rerun()
             else:
                 st.error("Invalid credentials")
@@ -72,73 +115,122 @@ if not st.session_state.authenticated:
             else:
                 st.error("Username already exists or is invalid")
 
+    # Started after the form is drawn so the background imports don't hold it up
+    start_warm_up()
     st.stop()  # Stop execution here if not authenticated
 
-# Load and clean data
-@st.cache_data
-def load_data(data_source):
-    if data_source == "BMC":
-        df = pd.read_csv("attached_assets/BMC.csv")
-    elif data_source == "BME":
-        df = pd.read_csv("attached_assets/BME.csv")
-    else:  # MAI
-        df = pd.read_csv("attached_assets/MAI.csv")
-    return clean_data(df)
+with st.sidebar:
+    st.caption(f"Logged in as {st.session_state.user['username']}")
+    if st.button("Log out"):
+        sessions.revoke(st.session_state.session_token)
+        st.session_state.session_token = None
+        st.rerun()
+
+# The map and data modules are only needed past the login page
+import os
+import pandas as pd
+import numpy as np
+import folium
+from utils import SPEND_COLUMNS, format_currency
+from loaders import (ALL_DIVISIONS, AVAILABLE_SOURCES, get_map_cache, get_route_cache, get_route_jobs,
+                     load_customer_index, load_data, load_filter_index, load_prospect_index, load_prospects,
+                     load_road_distances, load_search_index, load_spend_grid)
+from map_layers import ClusterLayer, CustomerLayer, OverlayLayer, ProspectLayer, SpendGridLayer
+from spend_grid import SpendGrid
+from nearby import nearest_accounts, within
+from road_network import ROAD_GRAPH_PATH
+from route_planner import STRAIGHT_LINE, create_route_cards, clear_route_cards, get_active_route, update_route_card
+from map_cache import render_map, with_overlays
+from streamlit_folium import st_folium
+from viewport import bounds_around, parse_bounds, point_cap, same_view, viewport_markers
 
 # Select data source
 data_source = st.radio(
     "Select Data Source",
-    ["BMC", "BME", "MAI"],
+    AVAILABLE_SOURCES + [ALL_DIVISIONS],
     horizontal=True
 )
 
-# Load and prepare prospects data
-@st.cache_data
-def load_prospects():
-    df_prospects = pd.read_csv("attached_assets/prospectlist.csv")
-    df_prospects = df_prospects[df_prospects['latitude'].notna() & df_prospects['longitude'].notna()]
-    df_prospects['Revenue Range (in USD)'] = df_prospects['Revenue Range (in USD)'].fillna('Unknown')
-    return df_prospects
+# Map size in pixels, and the data size from which the map loads only the visible area by default
+MAP_WIDTH, MAP_HEIGHT = 1200, 610
+VIEWPORT_MODE_ROWS = 100_000
+
+# Seconds between progress updates while this session's route is being solved
+ROUTE_POLL_SECONDS = 0.5
+
+# Names listed in the customer selectbox while the search box is empty
+BROWSE_NAMES = 1000
 
 try:
-    df = load_data(data_source)
-    prospects_df = load_prospects()
+    map_cache = get_map_cache()
+    with profiling.stage('load_data'):
+        df = load_data(data_source)
+        filter_index = load_filter_index(data_source)
+        search_index = load_search_index(data_source)
+        spend_grid = load_spend_grid(data_source)
+        customer_index = load_customer_index(data_source)
+    with profiling.stage('load_prospects'):
+        prospects_df = load_prospects()
+        prospect_index = load_prospect_index()
 
     # Sidebar filters
     with st.sidebar:
         st.header("Filters")
 
         # Get initial unique values
-        states = sorted(df['State/Prov'].unique().tolist())
+        with profiling.stage('filter_cascade'):
+            states = filter_index.options('State/Prov')
 
         # State filter with multi-select (up to 4)
         selected_states = st.multiselect("Select States/Provinces (max 4)", states, max_selections=4)
 
-        # Filter dataframe based on selected states
-        filtered_df = df.copy()
-        if selected_states:
-            filtered_df = filtered_df[filtered_df['State/Prov'].isin(selected_states)]
-
-        # Get territories based on filtered data
-        territories = sorted(filtered_df['Territory'].unique().tolist())
+        # Get territories based on the selected states
+        selections = {'State/Prov': selected_states}
+        with profiling.stage('filter_cascade'):
+            territories = filter_index.options('Territory', selections)
         selected_territory = st.selectbox("Select Territory", ["All"] + territories)
 
-        # Further filter based on territory
-        if selected_territory != "All":
-            filtered_df = filtered_df[filtered_df['Territory'] == selected_territory]
-
-        # Get sales reps based on filtered data
-        sales_reps = sorted(filtered_df['Sales Rep'].unique().tolist())
+        # Get sales reps based on states and territory
+        selections['Territory'] = selected_territory
+        with profiling.stage('filter_cascade'):
+            sales_reps = filter_index.options('Sales Rep', selections)
         selected_sales_rep = st.selectbox("Select Sales Rep", ["All"] + sales_reps)
 
-        # Further filter based on sales rep
-        if selected_sales_rep != "All":
-            filtered_df = filtered_df[filtered_df['Sales Rep'] == selected_sales_rep]
+        # Apply all filters as one index intersection
+        selections['Sales Rep'] = selected_sales_rep
+        with profiling.stage('filter_cascade'):
+            filter_rows = filter_index.rows(selections)
+            filtered_df = df.iloc[filter_rows]
 
-        # Get customer names based on all applied filters
-        customer_names = sorted(filtered_df['Name'].unique().tolist())
+        # Customer names matching the search box among the filtered rows
         st.subheader("Customer Search")
-        search_term = st.selectbox("Select customer:", ["All"] + customer_names)
+        search_query = st.text_input("Search name, address, city or ID:")
+        with profiling.stage('customer_search'):
+            if search_query:
+                customer_names = search_index.names(search_index.search(search_query, filter_rows))
+            else:
+                customer_names = search_index.browse(filter_rows, limit=BROWSE_NAMES + 1)
+        search_term = st.selectbox("Select customer:", ["All"] + customer_names[:BROWSE_NAMES])
+        if not search_query and len(customer_names) > BROWSE_NAMES:
+            st.caption(f"Showing the first {BROWSE_NAMES:,} names alphabetically; type to search for others.")
+
+        st.subheader("Nearby Prospects")
+        prospect_radius = st.slider("Show prospects within (km)", 5, 250, 50, step=5)
+
+        # Road distances are offered once a road graph has been placed on disk
+        distances = STRAIGHT_LINE
+        if os.path.exists(ROAD_GRAPH_PATH):
+            distance_mode = st.radio("Distances", [STRAIGHT_LINE.name, "Road network"], horizontal=True)
+            if distance_mode != STRAIGHT_LINE.name:
+                with profiling.stage('road_graph_load'):
+                    distances = load_road_distances()
+
+        st.subheader("Map")
+        interactive_map = st.checkbox(
+            "Load markers for the visible area only", value=len(df) >= VIEWPORT_MODE_ROWS,
+            help="Markers are fetched as you pan and zoom, and grouped into clusters when zoomed out."
+        )
+        show_heatmap = st.checkbox("Spend heatmap", help="Shade the map by 3-year spend per area.")
 
     # Initial locations
     initial_locations = [
@@ -147,143 +239,105 @@ try:
         {"name": "Bunting-Magnet Applications", "lat": 41.1201, "lon": -78.8391, "address": "12 Industrial Dr, DuBois, PA 15801"}
     ]
 
-    # Create base map
+    # Look up the searched customer and the prospects near it; a name that no
+    # longer matches the filters (e.g. kept across a filter change) is ignored
+    customer_data = None
+    nearby_prospects = None
     if search_term != "All":
-        # Show only selected customer
-        customer_data = filtered_df[filtered_df['Name'] == search_term]
-        if not customer_data.empty:
-            center_lat = customer_data['Latitude'].iloc[0]
-            center_lon = customer_data['Longitude'].iloc[0]
-            m = folium.Map(location=[center_lat, center_lon], zoom_start=12)
-
-            # Add marker for selected customer
+        matches = df.iloc[search_index.rows_for_name(search_term, filter_rows)]
+        if not matches.empty:
+            customer_data = matches
             row = customer_data.iloc[0]
-            popup_content = f"""
-            <div style='min-width: 200px'>
-                <h4>{row['Name']}</h4>
-                <b>Territory:</b> {row['Territory']}<br>
-                <b>Sales Rep:</b> {row['Sales Rep']}<br>
-                <b>3-year Spend:</b> {format_currency(row['3-year Spend'])}<br>
-                <b>2024:</b> {format_currency(row['$2,024 '])}<br>
-                <b>2023:</b> {format_currency(row['$2,023 '])}<br>
-                <b>2022:</b> {format_currency(row['$2,022 '])}<br>
-                <b>Phone:</b> {row['Phone'] if pd.notna(row['Phone']) else 'N/A'}<br>
-                <b>Address:</b> {row['Corrected_Address']}<br>
-            </div>
-            """
-            folium.Marker(
-                location=[row['Latitude'], row['Longitude']],
-                popup=folium.Popup(popup_content, max_width=300),
-                tooltip=row['Name'],
-                icon=folium.Icon(color='blue', icon='info-sign')
-            ).add_to(m)
-    elif not selected_states and selected_territory == "All" and selected_sales_rep == "All":
-        # Show only initial locations if no filters are applied
-        center_lat = sum(loc["lat"] for loc in initial_locations) / len(initial_locations)
-        center_lon = sum(loc["lon"] for loc in initial_locations) / len(initial_locations)
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
-
-        # Add markers for initial locations
-        for loc in initial_locations:
-            popup_content = f"""
-            <div style='min-width: 200px'>
-                <h4>{loc['name']}</h4>
-                <b>Address:</b> {loc['address']}<br>
-            </div>
-            """
-            folium.Marker(
-                location=[loc['lat'], loc['lon']],
-                popup=folium.Popup(popup_content, max_width=300),
-                tooltip=loc['name'],
-                icon=folium.Icon(color='red', icon='info-sign')
-            ).add_to(m)
-    else:
-        # Use filtered data when filters are applied
-        center_lat = filtered_df['Latitude'].mean()
-        center_lon = filtered_df['Longitude'].mean()
-        m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
-
-        # Add markers for each customer
-        for idx, row in filtered_df.iterrows():
-            if pd.notna(row['Latitude']) and pd.notna(row['Longitude']):
-                # Create popup content with selection button
-                popup_content = f"""
-                <div style='min-width: 200px'>
-                    <h4>{row['Name']}</h4>
-                    <label class="route-toggle">
-                        <input type="checkbox" onclick='selectCustomer("{row['Name']}", {row['Latitude']}, {row['Longitude']})'>
-                        <span class="toggle-slider"></span>
-                        <span class="toggle-label">Add to Route</span>
-                    </label><br><br>
-                    <b>Territory:</b> {row['Territory']}<br>
-                    <b>Sales Rep:</b> {row['Sales Rep']}<br>
-                    <b>3-year Spend:</b> {format_currency(row['3-year Spend'])}<br>
-                    <b>2024:</b> {format_currency(row['$2,024 '])}<br>
-                    <b>2023:</b> {format_currency(row['$2,023 '])}<br>
-                    <b>2022:</b> {format_currency(row['$2,022 '])}<br>
-                    <b>Phone:</b> {row['Phone'] if pd.notna(row['Phone']) else 'N/A'}<br>
-                    <b>Address:</b> {row['Corrected_Address']}<br>
-                </div>
-                """
-
-                # Calculate marker size based on 3-year spend thresholds
-                spend_str = str(row['3-year Spend']).replace('$', '').replace(',', '').strip()
-                try:
-                    spend = float(re.sub(r'[^\d.-]', '', spend_str)) if spend_str else 0
-                    # Set radius based on spend categories
-                    if spend > 500000:
-                        radius = 30  # Largest size
-                    elif spend > 100000:
-                        radius = 22  # Second largest
-                    elif spend > 50000:
-                        radius = 15  # Medium size
-                    else:
-                        radius = 8   # Smallest size
-                except:
-                    radius = 8  # Default size for parsing errors
-
-                # Check if customer is in selected route
-                is_selected = any(c.get('name') == row['Name'] for c in st.session_state.get('selected_customers', []))
-
-                folium.CircleMarker(
-                    location=[row['Latitude'], row['Longitude']],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    tooltip=row['Name'],
-                    radius=radius,
-                    color='blue',
-                    weight=1.5,
-                    fill=True,
-                    fill_color='blue' if is_selected else '#3186cc',
-                    fill_opacity=0.7 if is_selected else 0.4,
-                    opacity=1.0
-                ).add_to(m)
-
-        # Add prospect markers
-        for index, row in prospects_df.iterrows():
-            if pd.notna(row['latitude']) and pd.notna(row['longitude']):
-                popup_content = f"""
+            ids, dists = within(prospect_index, row['Latitude'], row['Longitude'], prospect_radius, distances)
+            nearby_prospects = prospects_df.iloc[ids].assign(**{'Distance (km)': dists.round(1)})
+
+    # Create base map, reusing the cached HTML when nothing it shows has changed
+    selected_names = [c.get('name') for c in st.session_state.get('selected_customers', [])]
+    map_key = (data_source, tuple(selected_states), selected_territory, selected_sales_rep,
+               search_term, prospect_radius, distances.name, show_heatmap, tuple(selected_names))
+    # Spend grid rollups read the precomputed cells unless filters narrow the rows
+    grid_rows = filter_rows if len(filter_rows) < len(df) else None
+    # In viewport mode the browser reports its bounds and only the markers inside them are sent
+    viewport_mode = interactive_map and customer_data is None
+    base_map = None
+    map_entry = None if viewport_mode else map_cache.get(map_key)
+    if viewport_mode:
+        view = st.session_state.get('map_view')
+        if view is None:
+            if len(filtered_df):
+                center = (float(filtered_df['Latitude'].mean()), float(filtered_df['Longitude'].mean()))
+            else:
+                center = (sum(loc["lat"] for loc in initial_locations) / len(initial_locations),
+                          sum(loc["lon"] for loc in initial_locations) / len(initial_locations))
+            view = {'center': center, 'zoom': 4, 'bounds': bounds_around(*center, 4, MAP_WIDTH, MAP_HEIGHT)}
+        with profiling.stage('viewport_query'):
+            ids, clusters = viewport_markers(customer_index, view['bounds'], view['zoom'],
+                                             filter_rows, df['3-year Spend'].to_numpy(), spend_grid)
+        with profiling.stage('map_build'):
+            base_map = folium.Map(location=list(view['center']), zoom_start=view['zoom'])
+            if show_heatmap:
+                SpendGridLayer(spend_grid.rollup(SpendGrid.level_for_zoom(view['zoom']), view['bounds'],
+                                                 rows=grid_rows)).add_to(base_map)
+            if clusters is None:
+                shown = df.iloc[ids]
+                CustomerLayer(shown, selected_names).add_to(base_map)
+                near = prospect_index.within_any(shown['Latitude'], shown['Longitude'], prospect_radius)
+                in_view = np.intersect1d(near, prospect_index.in_box(*view['bounds']), assume_unique=True)
+                ProspectLayer(prospects_df.iloc[in_view[:point_cap(view['zoom'])]]).add_to(base_map)
+            else:
+                ClusterLayer(clusters).add_to(base_map)
+    elif map_entry is None:
+        with profiling.stage('map_build'):
+            if customer_data is not None:
+                # Show only selected customer
+                center_lat = customer_data['Latitude'].iloc[0]
+                center_lon = customer_data['Longitude'].iloc[0]
+                m = folium.Map(location=[center_lat, center_lon], zoom_start=12)
+
+                # Add marker for selected customer
+                CustomerLayer(customer_data.iloc[:1], selected_names, pin=True).add_to(m)
+
+                # Add prospects near the selected customer
+                ProspectLayer(nearby_prospects).add_to(m)
+            elif not selected_states and selected_territory == "All" and selected_sales_rep == "All":
+                # Show only initial locations if no filters are applied
+                center_lat = sum(loc["lat"] for loc in initial_locations) / len(initial_locations)
+                center_lon = sum(loc["lon"] for loc in initial_locations) / len(initial_locations)
+                m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
+                if show_heatmap:
+                    SpendGridLayer(spend_grid.rollup(SpendGrid.level_for_zoom(4))).add_to(m)
+
+                # Add markers for initial locations
+                for loc in initial_locations:
+                    popup_content = f"""
                     <div style='min-width: 200px'>
-                        <h4>Prospect: {row['Company Name']}</h4>
-                        <b>Industry:</b> {row['Primary Industry']}<br>
-                        <b>Sub-Industry:</b> {row['Primary Sub-Industry']}<br>
-                        <b>Address:</b> {row.get('address', 'N/A')}<br>
-                        <b>Revenue Range:</b> {row['Revenue Range (in USD)']}<br>
-                        <b>Website:</b> <a href='{row['Website']}' target='_blank'>{row['Website']}</a><br>
-                        <label class="toggle-switch">
-                            <input type="checkbox" onclick='selectCustomer("{row['Company Name']}", {row['latitude']}, {row['longitude']})' 
-                                   data-name="{row['Company Name']}">
-                            <span class="toggle-slider"></span>
-                            <span class="toggle-label">Add to Route</span>
-                        </label>
+                        <h4>{loc['name']}</h4>
+                        <b>Address:</b> {loc['address']}<br>
                     </div>
-                """
-                folium.Marker(
-                    location=[float(row['latitude']), float(row['longitude'])],
-                    popup=folium.Popup(popup_content, max_width=300),
-                    tooltip=row['Company Name'],
-                    icon=folium.Icon(color='green', icon='flag', prefix='fa')
-                ).add_to(m)
-
+                    """
+                    folium.Marker(
+                        location=[loc['lat'], loc['lon']],
+                        popup=folium.Popup(popup_content, max_width=300),
+                        tooltip=loc['name'],
+                        icon=folium.Icon(color='red', icon='info-sign')
+                    ).add_to(m)
+            else:
+                # Use filtered data when filters are applied
+                center_lat = filtered_df['Latitude'].mean()
+                center_lon = filtered_df['Longitude'].mean()
+                m = folium.Map(location=[center_lat, center_lon], zoom_start=4)
+                if show_heatmap:
+                    SpendGridLayer(spend_grid.rollup(SpendGrid.level_for_zoom(4), rows=grid_rows)).add_to(m)
+
+                # Add customers, and the prospects near any of them, as two client-rendered layers
+                CustomerLayer(filtered_df, selected_names).add_to(m)
+                ids = prospect_index.within_any(filtered_df['Latitude'], filtered_df['Longitude'], prospect_radius)
+                ProspectLayer(prospects_df.iloc[ids]).add_to(m)
+
+            map_entry = render_map(m)
+            map_cache.put(map_key, *map_entry)
+    if map_entry is not None:
+        base_html, map_name = map_entry
 
     # Store the selected customer and widget clicked state
     if 'selected_customer' not in st.session_state:
@@ -348,10 +402,6 @@ try:
                 if (selectedCustomers.has(name)) {
                     selectedCustomers.delete(name);
                 } else {
-                    if (selectedCustomers.size >= 8) {
-                        alert('Maximum 8 locations can be selected for routing');
-                        return;
-                    }
                     selectedCustomers.set(name, customer);
                 }
 
@@ -540,71 +590,126 @@ try:
         except Exception as e:
             st.error(f"Error handling selection: {str(e)}")
 
-    # Add user location marker if available
-    if st.session_state.user_location:
-        folium.Marker(
-            location=[st.session_state.user_location['lat'], st.session_state.user_location['lon']],
-            popup='Your Location',
-            icon=folium.Icon(color='green', icon='user', prefix='fa'),
-            tooltip='Your Location'
-        ).add_to(m)
-
-    from route_planner import create_route_cards, calculate_optimal_route, clear_route_cards, get_active_route
+    # Accounts nearest to the user's position, ringed on the map and ready to seed a route
+    nearest_highlights = None
+    user_location = st.session_state.user_location
+    if user_location:
+        st.markdown("### Nearest to Me")
+        col1, col2 = st.columns(2)
+        with col1:
+            nearest_k = st.slider("Number of accounts", 5, 50, 20, step=5)
+        with col2:
+            nearest_rank = st.radio("Rank by", ["Distance", "3-year Spend"], horizontal=True)
+        with profiling.stage('nearest'):
+            nearest = nearest_accounts(
+                user_location['lat'], user_location['lon'], nearest_k,
+                df, customer_index, prospects_df, prospect_index,
+                by='spend' if nearest_rank == "3-year Spend" else 'distance', distances=distances
+            )
+        st.dataframe(
+            nearest.drop(columns=['lat', 'lon']).assign(**{
+                '3-year Spend': nearest['3-year Spend'].map(lambda v: '' if pd.isna(v) else format_currency(v))
+            }),
+            hide_index=True
+        )
+        nearest_highlights = [{'name': r['Name'], 'lat': r['lat'], 'lon': r['lon']}
+                              for r in nearest.to_dict('records')]
+        if st.button("Start a route here with these accounts"):
+            clear_route_cards()
+            update_route_card({'name': 'My Location', 'lat': user_location['lat'], 'lon': user_location['lon']})
+            for stop in nearest_highlights:
+                update_route_card(stop)
+            st.rerun()
 
     # Display route planning cards
     st.markdown("### Route Planning")
     create_route_cards()
 
-    # Add Plan Trip button
+    # Add Plan Trip button; the solve runs in the background, with its progress shown below
+    route_jobs = get_route_jobs()
+    session_key = st.session_state.session_token
     if st.button("Plan Trip"):
         route = get_active_route()
         if len(route) >= 2:
-            optimal_route = calculate_optimal_route(route)
-
-            # Draw optimal route on map
-            coordinates = [(loc['lat'], loc['lon']) for loc in optimal_route]
-            folium.PolyLine(
-                coordinates,
-                weight=2,
-                color='red',
-                opacity=0.8
-            ).add_to(m)
-
-            # Display route summary
-            total_distance = 0
-            st.markdown("### Route Summary")
-            for i in range(len(optimal_route)):
-                st.write(f"{i+1}. {optimal_route[i]['name']}")
-                if i < len(optimal_route) - 1:
-                    dist = haversine_distance(
-                        optimal_route[i]['lat'], optimal_route[i]['lon'],
-                        optimal_route[i+1]['lat'], optimal_route[i+1]['lon']
-                    )
-                    total_distance += dist
-            st.write(f"\nTotal distance: {total_distance:.1f} km")
+            with profiling.stage('route_submit'):
+                route_jobs.submit(session_key, route, distances=distances)
         else:
             st.warning("Please select at least 2 locations for route planning")
 
+    # This session's solve, cancelled and dropped once the selected stops change
+    route_overlay = None
+    route_job = route_jobs.current(session_key, get_active_route(), distances=distances)
+    if route_job is not None and route_job.status == 'done':
+        optimal_route = route_job.result['route']
+
+        # Draw optimal route on map
+        route_overlay = optimal_route
+
+        # Display route summary
+        st.markdown("### Route Summary")
+        for i in range(len(optimal_route)):
+            st.write(f"{i+1}. {optimal_route[i]['name']}")
+        st.write(f"\nTotal distance: {route_job.result['total_km']:.1f} km ({distances.name.lower()})")
+    elif route_job is not None and route_job.status == 'failed':
+        st.error(f"Route planning failed: {route_job.error}")
+    elif route_job is not None and not route_job.finished:
+        # Only the progress bar is redrawn while the solve runs; the whole page
+        # reruns once, when it finishes, to draw the route on the map
+        @st.fragment(run_every=ROUTE_POLL_SECONDS)
+        def route_progress(job):
+            if job.finished:
+                st.rerun()
+            if job.status == 'queued':
+                st.progress(0.0, text="Waiting for a free route solver...")
+            elif job.fraction is None:
+                st.progress(1.0, text="Improving the route...")
+            else:
+                st.progress(job.fraction, text=f"Solving the route... {job.fraction:.0%}")
+
+        route_progress(route_job)
+
     # Clear route button
     if st.button("Clear Route"):
+        route_jobs.cancel(session_key)
         clear_route_cards()
         st.rerun()
 
-    # Display the map
-    folium_static(m, width=1200, height=600)
-
-    if st.session_state.selected_customer:
-        selected_data = filtered_df[filtered_df['Name'] == st.session_state.selected_customer]
-        if not selected_data.empty:
-            lat = selected_data['Latitude'].iloc[0]
-            lon = selected_data['Longitude'].iloc[0]
-
-            # Add selected customer marker
-            folium.Marker(
-                location=[lat, lon],
-                popup=selected_data['Name'].iloc[0],
-                icon=folium.Icon(color='red', icon='info-sign')
-            ).add_to(m)
+    # Display the map with this session's route line and location marker on top
+    with profiling.stage('map_render'):
+        if base_map is not None:
+            OverlayLayer(route_overlay, st.session_state.user_location, nearest_highlights).add_to(base_map)
+            map_state = st_folium(base_map, key='viewport_map', width=MAP_WIDTH, height=MAP_HEIGHT,
+                                  returned_objects=['bounds', 'zoom', 'center'])
+        else:
+            components.html(
+                with_overlays(base_html, map_name, route_overlay, st.session_state.user_location, nearest_highlights),
+                width=MAP_WIDTH,
+                height=MAP_HEIGHT
+            )
+
+    # Spend per territory in view, from the same grid cells as the heatmap
+    if base_map is not None and show_heatmap:
+        with profiling.stage('spend_rollup'):
+            in_view = spend_grid.rollup(SpendGrid.level_for_zoom(view['zoom']), view['bounds'],
+                                        rows=grid_rows, by_territory=True)
+            totals = (in_view.groupby('Territory', dropna=False)[['count'] + SPEND_COLUMNS].sum()
+                      .sort_values('3-year Spend', ascending=False).reset_index())
+        st.markdown("### Spend by Territory in View")
+        st.dataframe(
+            totals.rename(columns={'count': 'Customers'}).assign(
+                **{col: totals[col].map(format_currency) for col in SPEND_COLUMNS}),
+            hide_index=True
+        )
+
+    # A pan or zoom reported by the browser reloads the markers for the new view
+    if base_map is not None:
+        bounds = parse_bounds(map_state)
+        if bounds is not None and map_state.get('center') and map_state.get('zoom') is not None:
+            reported = {'center': (map_state['center']['lat'], map_state['center']['lng']),
+                        'zoom': int(map_state['zoom']), 'bounds': bounds}
+            if not same_view(reported, view):
+                st.session_state.map_view = reported
+                st.rerun()
 
     # Handle customer selection
     if st.session_state.widget_clicked:
@@ -620,7 +725,7 @@ try:
         selected_customer = st.selectbox("Select customer to view details:", selected_names)
 
         if selected_customer:
-            customer_data = filtered_df[filtered_df['Name'] == selected_customer]
+            customer_data = df.iloc[search_index.rows_for_name(selected_customer, filter_rows)]
             if not customer_data.empty:
                 row = customer_data.iloc[0]
                 with details_placeholder.container():
@@ -629,6 +734,8 @@ try:
                         st.markdown(f"### {row['Name']}")
                         st.write(f"**Territory:** {row['Territory']}")
                         st.write(f"**Sales Rep:** {row['Sales Rep']}")
+                        if 'Division' in row:
+                            st.write(f"**Division:** {row['Division']}")
                         st.write(f"**3-year Spend:** {format_currency(row['3-year Spend'])}")
                         st.write(f"**Phone:** {row['Phone'] if pd.notna(row['Phone']) else 'N/A'}")
                         st.write(f"**Address:** {row['Corrected_Address']}")
@@ -643,16 +750,48 @@ try:
         details_placeholder.info("Select customers on the map to view their details here.")
 
     if search_term and search_term != "All":
-        search_results = filtered_df[filtered_df['Name'] == search_term]
+        search_results = df.iloc[search_index.rows_for_name(search_term, filter_rows)]
 
         for _, row in search_results.iterrows():
             with st.expander(row['Name']):
                 st.write(f"**Territory:** {row['Territory']}")
                 st.write(f"**Sales Rep:** {row['Sales Rep']}")
+                if 'Division' in row:
+                    st.write(f"**Division:** {row['Division']}")
                 st.write(f"**3-year Spend:** {format_currency(row['3-year Spend'])}")
                 st.write(f"**Phone:** {row['Phone'] if pd.notna(row['Phone']) else 'N/A'}")
                 st.write(f"**Address:** {row['Corrected_Address']}")
 
+                if nearby_prospects is not None and not nearby_prospects.empty:
+                    st.write(f"**Prospects within {prospect_radius} km:**")
+                    st.dataframe(
+                        nearby_prospects[['Company Name', 'Distance (km)', 'Primary Industry',
+                                          'Revenue Range (in USD)', 'address']],
+                        hide_index=True
+                    )
+                else:
+                    st.write(f"No prospects within {prospect_radius} km.")
+
 except Exception as e:
     st.error(f"An error occurred while loading the data: {str(e)}")
-    st.write("Please check if the data file is in the correct location and format.")
\ No newline at end of file
+    st.write("Please check if the data file is in the correct location and format.")
+
+# Profiling panel for admins, covering the recent reruns of this server process
+if st.session_state.user.get('is_admin'):
+    with st.expander("Profiling"):
+        # Tracing is process-wide: the box shows its current state and only a click changes it
+        st.session_state.trace_memory = profiling.memory_tracing()
+        st.checkbox("Trace memory (slows every rerun)", key="trace_memory",
+                    on_change=lambda: profiling.set_memory_tracing(st.session_state.trace_memory))
+        st.dataframe(profiling.summary(), hide_index=True)
+        route_cache = get_route_cache()
+        st.caption(f"Route cache: {len(route_cache)} routes, {route_cache.hits} hits, {route_cache.misses} misses")
+
+    with st.expander("Sessions"):
+        st.dataframe(pd.DataFrame(sessions.active_sessions()), hide_index=True)
+        revoke_username = st.text_input("Revoke all sessions of:", key="revoke_username")
+        if st.button("Revoke") and revoke_username:
+            count = sessions.revoke_user(revoke_username)
+            st.success(f"Revoked {count} session(s) of {revoke_username}")
+
+profiling.end_run()
@@ -0,0 +1,101 @@
+import json
+import threading
+from collections import OrderedDict
+from html import escape
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import folium
+
+# Default memory budget for cached map HTML, shared by all sessions
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class MapHtmlCache:
+    """Thread-safe LRU cache of rendered map HTML with a total size cap.
+
+    Entries are (html, map_name) pairs; `map_name` is the Leaflet variable
+    of the map inside `html`, which overlays need to attach to it.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Optional[Tuple[str, str]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, html: str, map_name: str):
+        with self._lock:
+            if key in self._entries:
+                self.size -= len(self._entries.pop(key)[0])
+            # A single map larger than the whole budget is not worth keeping
+            if len(html) > self.max_bytes:
+                return
+            self._entries[key] = (html, map_name)
+            self.size += len(html)
+            while self.size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def render_map(m: folium.Map) -> Tuple[str, str]:
+    """Render a map to standalone HTML the same way folium_static does."""
+    figure = folium.Figure().add_child(m)
+    return figure.render(), m.get_name()
+
+
+def overlay_script(map_name: str, route: Optional[List[Dict]] = None,
+                   user_location: Optional[Dict] = None, highlights: Optional[List[Dict]] = None) -> str:
+    """JavaScript drawing the per-session overlays onto an already rendered map.
+
+    `highlights` are ranked locations ({'name', 'lat', 'lon'}) ringed in orange
+    and labelled with their rank.
+    """
+    lines = []
+    if highlights:
+        points = json.dumps([[float(h['lat']), float(h['lon']), f"{i}. {escape(str(h['name']))}"]
+                             for i, h in enumerate(highlights, start=1)])
+        lines.append(
+            f"{points}.forEach(function(p) {{ L.circleMarker([p[0], p[1]], "
+            f"{{radius: 14, color: 'orange', weight: 3, fill: false}}).bindTooltip(p[2]).addTo({map_name}); }});"
+        )
+    if route:
+        coords = json.dumps([[loc['lat'], loc['lon']] for loc in route])
+        lines.append(f"L.polyline({coords}, {{weight: 2, color: 'red', opacity: 0.8}}).addTo({map_name});")
+    if user_location:
+        lines.append(
+            f"L.marker([{float(user_location['lat'])}, {float(user_location['lon'])}], "
+            f"{{icon: L.AwesomeMarkers.icon({{icon: 'user', prefix: 'fa', markerColor: 'green', iconColor: 'white'}})}})"
+            f".bindPopup('Your Location').bindTooltip('Your Location').addTo({map_name});"
+        )
+    return "\n".join(lines)
+
+
+def with_overlays(html: str, map_name: str, route: Optional[List[Dict]] = None,
+                  user_location: Optional[Dict] = None, highlights: Optional[List[Dict]] = None) -> str:
+    """Cached map HTML with the overlay script appended after the map's own scripts."""
+    script = overlay_script(map_name, route, user_location, highlights)
+    if not script:
+        return html
+    tag = f"<script>\n{script}\n</script>\n"
+    end = html.rfind("</html>")
+    return html + tag if end == -1 else html[:end] + tag + html[end:]
@@ -0,0 +1,360 @@
+import json
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from branca.element import Element, MacroElement
+from jinja2 import Template
+
+from map_cache import overlay_script
+
+# Marker radius for each 'Spend Tier' produced by utils.clean_data
+SPEND_TIER_RADIUS = np.array([8, 15, 22, 30])
+
+
+def _column(df: pd.DataFrame, col: str, default: str = '') -> list:
+    """A column as a JSON-ready list of strings, with missing values replaced."""
+    if col not in df.columns:
+        return [default] * len(df)
+    values = df[col]
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return values.fillna(default).astype(str).tolist()
+
+
+def _lookup(df: pd.DataFrame, col: str, default: str = '') -> dict:
+    """A repetitive column as {'values': distinct strings, 'codes': index into values per row}.
+
+    Territories, reps and industries repeat across thousands of rows, so the
+    page carries each distinct value once and a small integer per row.
+    """
+    if col not in df.columns:
+        return {'values': [default], 'codes': [0] * len(df)}
+    codes, uniques = pd.factorize(df[col])
+    values = pd.Series(uniques, dtype=object).astype(str).tolist() + [default]
+    return {'values': values, 'codes': np.where(codes < 0, len(values) - 1, codes).tolist()}
+
+
+def _coordinates(values: pd.Series) -> list:
+    """Coordinates as a JSON-ready list, rounded to 5 decimals (about 1 m, the float32 precision)."""
+    return np.round(values.to_numpy(dtype=np.float64), 5).tolist()
+
+
+def _money(values: pd.Series) -> list:
+    """Amounts as a JSON-ready list to the cent, whole dollars as integers and NaN as null."""
+    amounts = np.round(values.to_numpy(dtype=np.float64), 2)
+    out = amounts.astype(object)
+    whole = amounts == np.floor(amounts)
+    out[whole] = amounts[whole].astype(np.int64).tolist()
+    out[np.isnan(amounts)] = None
+    return out.tolist()
+
+
+class _Script(Element):
+    """Already rendered JavaScript, emitted as is.
+
+    A plain Element compiles its text as a Jinja template, which for a
+    layer's script means lexing the whole payload a second time (and
+    treating any '{{' inside a customer name as template syntax).
+    """
+
+    def __init__(self, script: str):
+        super().__init__()
+        self.script = script
+
+    def render(self, **kwargs) -> str:
+        return self.script
+
+
+class _ColumnarLayer(MacroElement):
+    """Folium layer that ships its rows as one columnar JSON payload.
+
+    Markers and popups are built in the browser from the payload, so the map
+    HTML carries each value once instead of one marker/popup block per row.
+    A marker is bound to its row number only; its popup is put together from
+    the payload columns when it is first opened.
+    """
+
+    _template = Template("")
+
+    def __init__(self, columns: dict):
+        super().__init__()
+        payload = json.dumps(columns, separators=(',', ':'), allow_nan=False)
+        # Keep a '</script>' inside a value from closing the surrounding script tag
+        self.payload = payload.replace('</', '<\\/')
+
+    def render(self, **kwargs):
+        script = self._template.module.__dict__['script'](self, kwargs)
+        self.get_root().script.add_child(_Script(script), name=self.get_name())
+
+
+# Shared client-side helpers: HTML escaping, currency formatting, reading a
+# _lookup column and the "Add to Route" toggle.
+_JS_HELPERS = """
+    function esc(v) {
+        return String(v).replace(/[&<>"']/g, function(c) {
+            return {'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}[c];
+        });
+    }
+    function money(v) {
+        if (v === null) { return '$0'; }
+        return '$' + v.toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2});
+    }
+    function at(c, i) { return c.values[c.codes[i]]; }
+    function routeToggle(div, name, lat, lon) {
+        var input = div.querySelector('input');
+        input.setAttribute('data-name', name);
+        input.onclick = function() {
+            if (typeof selectCustomer === 'function') { selectCustomer(name, lat, lon); }
+        };
+    }
+"""
+
+
+class CustomerLayer(_ColumnarLayer):
+    """Circle markers for every customer in `df`, sized by 3-year spend.
+
+    With `pin` the customers get pin markers instead, as for the one
+    customer picked in the search box.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            """ + _JS_HELPERS + """
+            var d = {{ this.payload }};
+            var map = {{ this._parent.get_name() }};
+            var renderer = L.canvas();
+            var selected = {};
+            d.selected.forEach(function(i) { selected[i] = true; });
+            function popup(i) {
+                var div = document.createElement('div');
+                div.style.minWidth = '200px';
+                div.innerHTML =
+                    '<h4>' + esc(d.name[i]) + '</h4>' +
+                    '<label class="route-toggle"><input type="checkbox">' +
+                    '<span class="toggle-slider"></span><span class="toggle-label">Add to Route</span>' +
+                    '</label><br><br>' +
+                    '<b>Territory:</b> ' + esc(at(d.territory, i)) + '<br>' +
+                    '<b>Sales Rep:</b> ' + esc(at(d.rep, i)) + '<br>' +
+                    '<b>3-year Spend:</b> ' + money(d.spend[i]) + '<br>' +
+                    '<b>2024:</b> ' + money(d.y2024[i]) + '<br>' +
+                    '<b>2023:</b> ' + money(d.y2023[i]) + '<br>' +
+                    '<b>2022:</b> ' + money(d.y2022[i]) + '<br>' +
+                    '<b>Phone:</b> ' + esc(d.phone[i]) + '<br>' +
+                    '<b>Address:</b> ' + esc(d.address[i]) + '<br>';
+                routeToggle(div, d.name[i], d.lat[i], d.lon[i]);
+                return div;
+            }
+            for (var i = 0; i < d.lat.length; i++) {
+                var marker = {{ this.pin|tojson }}
+                    ? L.marker([d.lat[i], d.lon[i]], {
+                        icon: L.AwesomeMarkers.icon({icon: 'info-sign', prefix: 'glyphicon', markerColor: 'blue'})
+                    })
+                    : L.circleMarker([d.lat[i], d.lon[i]], {
+                        renderer: renderer,
+                        radius: d.radius[d.tier[i]],
+                        color: 'blue',
+                        weight: 1.5,
+                        fill: true,
+                        fillColor: selected[i] ? 'blue' : '#3186cc',
+                        fillOpacity: selected[i] ? 0.7 : 0.4,
+                        opacity: 1.0
+                    });
+                marker.bindTooltip(esc(d.name[i]))
+                    .bindPopup(popup.bind(null, i), {maxWidth: 300})
+                    .addTo(map);
+            }
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, df: pd.DataFrame, selected_names: Optional[Iterable[str]] = None, pin: bool = False):
+        df = df[df['Latitude'].notna() & df['Longitude'].notna()]
+        selected = df['Name'].isin(list(selected_names or []))
+        self.pin = pin
+        super().__init__({
+            'lat': _coordinates(df['Latitude']),
+            'lon': _coordinates(df['Longitude']),
+            'radius': SPEND_TIER_RADIUS.tolist(),
+            'tier': df['Spend Tier'].astype(int).tolist(),
+            # Positions of the customers already on the route; usually few or none
+            'selected': np.flatnonzero(selected.to_numpy()).tolist(),
+            'name': _column(df, 'Name'),
+            'territory': _lookup(df, 'Territory'),
+            'rep': _lookup(df, 'Sales Rep'),
+            'spend': _money(df['3-year Spend']),
+            'y2024': _money(df['$2,024 ']),
+            'y2023': _money(df['$2,023 ']),
+            'y2022': _money(df['$2,022 ']),
+            'phone': _column(df, 'Phone', 'N/A'),
+            'address': _column(df, 'Corrected_Address'),
+        })
+
+
+class ProspectLayer(_ColumnarLayer):
+    """Green flag markers for every prospect in `df`."""
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            """ + _JS_HELPERS + """
+            var d = {{ this.payload }};
+            var map = {{ this._parent.get_name() }};
+            var icon = L.AwesomeMarkers.icon({icon: 'flag', prefix: 'fa', markerColor: 'green'});
+            function popup(i) {
+                var div = document.createElement('div');
+                div.style.minWidth = '200px';
+                div.innerHTML =
+                    '<h4>Prospect: ' + esc(d.name[i]) + '</h4>' +
+                    '<b>Industry:</b> ' + esc(at(d.industry, i)) + '<br>' +
+                    '<b>Sub-Industry:</b> ' + esc(at(d.sub_industry, i)) + '<br>' +
+                    '<b>Address:</b> ' + esc(d.address[i]) + '<br>' +
+                    '<b>Revenue Range:</b> ' + esc(at(d.revenue, i)) + '<br>' +
+                    '<b>Website:</b> <a href="' + esc(d.website[i]) + '" target="_blank">' +
+                    esc(d.website[i]) + '</a><br>' +
+                    '<label class="toggle-switch"><input type="checkbox">' +
+                    '<span class="toggle-slider"></span><span class="toggle-label">Add to Route</span>' +
+                    '</label>';
+                routeToggle(div, d.name[i], d.lat[i], d.lon[i]);
+                return div;
+            }
+            for (var i = 0; i < d.lat.length; i++) {
+                L.marker([d.lat[i], d.lon[i]], {icon: icon})
+                    .bindTooltip(esc(d.name[i]))
+                    .bindPopup(popup.bind(null, i), {maxWidth: 300})
+                    .addTo(map);
+            }
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, df: pd.DataFrame):
+        df = df[df['latitude'].notna() & df['longitude'].notna()]
+        super().__init__({
+            'lat': _coordinates(df['latitude']),
+            'lon': _coordinates(df['longitude']),
+            'name': _column(df, 'Company Name'),
+            'industry': _lookup(df, 'Primary Industry', 'N/A'),
+            'sub_industry': _lookup(df, 'Primary Sub-Industry', 'N/A'),
+            'address': _column(df, 'address', 'N/A'),
+            'revenue': _lookup(df, 'Revenue Range (in USD)'),
+            'website': _column(df, 'Website', 'N/A'),
+        })
+
+
+class ClusterLayer(_ColumnarLayer):
+    """Aggregated markers, one per cluster from viewport.cluster, labelled with their count.
+
+    Clicking a cluster zooms in on it.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            """ + _JS_HELPERS + """
+            var d = {{ this.payload }};
+            var map = {{ this._parent.get_name() }};
+            for (var i = 0; i < d.lat.length; i++) {
+                var size = Math.round(24 + 8 * Math.log10(d.count[i]));
+                var icon = L.divIcon({
+                    className: '',
+                    iconSize: [size, size],
+                    html: '<div style="width:' + size + 'px;height:' + size + 'px;line-height:' + size + 'px;' +
+                          'border-radius:50%;text-align:center;font-size:11px;font-weight:bold;color:white;' +
+                          'background:{{ this.color }};opacity:0.8;border:2px solid white">' +
+                          d.count[i].toLocaleString('en-US') + '</div>'
+                });
+                var tip = d.count[i].toLocaleString('en-US') + ' {{ this.label }}' +
+                          (d.weight[i] > 0 ? ', ' + money(d.weight[i]) + ' 3-year spend' : '');
+                L.marker([d.lat[i], d.lon[i]], {icon: icon})
+                    .bindTooltip(esc(tip))
+                    .on('click', function(e) { map.setView(e.latlng, map.getZoom() + 2); })
+                    .addTo(map);
+            }
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, clusters: pd.DataFrame, label: str = 'customers', color: str = '#3186cc'):
+        self.label = label
+        self.color = color
+        super().__init__({
+            'lat': _coordinates(clusters['lat']),
+            'lon': _coordinates(clusters['lon']),
+            'count': clusters['count'].astype(int).tolist(),
+            'weight': _money(clusters['weight']),
+        })
+
+
+class SpendGridLayer(_ColumnarLayer):
+    """Spend heatmap: one shaded rectangle per spend_grid cell.
+
+    Colour runs from pale yellow to red on a log scale of the cell's
+    3-year spend, relative to the largest cell shown.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        (function() {
+            """ + _JS_HELPERS + """
+            var d = {{ this.payload }};
+            var map = {{ this._parent.get_name() }};
+            var renderer = L.canvas();
+            var top = Math.log1p(Math.max.apply(null, d.spend.concat([1])));
+            for (var i = 0; i < d.south.length; i++) {
+                var t = Math.log1p(Math.max(d.spend[i], 0)) / top;
+                L.rectangle([[d.south[i], d.west[i]], [d.north[i], d.east[i]]], {
+                    renderer: renderer,
+                    stroke: false,
+                    fillColor: 'hsl(' + Math.round(60 * (1 - t)) + ', 100%, 50%)',
+                    fillOpacity: 0.15 + 0.5 * t,
+                    interactive: true
+                })
+                .bindTooltip(
+                    '<b>' + d.count[i].toLocaleString('en-US') + ' customers</b><br>' +
+                    '3-year Spend: ' + money(d.spend[i]) + '<br>' +
+                    '2024: ' + money(d.y2024[i]) + '<br>' +
+                    '2023: ' + money(d.y2023[i]) + '<br>' +
+                    '2022: ' + money(d.y2022[i]), {sticky: true})
+                .addTo(map);
+            }
+        })();
+        {% endmacro %}
+    """)
+
+    def __init__(self, cells: pd.DataFrame):
+        super().__init__({
+            'south': _coordinates(cells['south']),
+            'west': _coordinates(cells['west']),
+            'north': _coordinates(cells['north']),
+            'east': _coordinates(cells['east']),
+            'count': cells['count'].astype(int).tolist(),
+            'spend': _money(cells['3-year Spend']),
+            'y2024': _money(cells['$2,024 ']),
+            'y2023': _money(cells['$2,023 ']),
+            'y2022': _money(cells['$2,022 ']),
+        })
+
+
+class OverlayLayer(MacroElement):
+    """The per-session overlays of map_cache.overlay_script as a map element.
+
+    For maps rendered by streamlit-folium, where the cached-HTML route of
+    map_cache.with_overlays does not apply.
+    """
+
+    _template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this.script(this._parent.get_name()) }}
+        {% endmacro %}
+    """)
+
+    def __init__(self, route=None, user_location=None, highlights=None):
+        super().__init__()
+        self.route = route
+        self.user_location = user_location
+        self.highlights = highlights
+
+    def script(self, map_name: str) -> str:
+        return overlay_script(map_name, self.route, self.user_location, self.highlights)
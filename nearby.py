@@ -0,0 +1,86 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+from route_planner import STRAIGHT_LINE
+from spatial_index import SpatialIndex
+
+# Columns of the nearest-accounts table, plus the coordinates used for the map
+NEAREST_COLUMNS = ['Type', 'Name', 'Distance (km)', '3-year Spend', 'Address', 'lat', 'lon']
+
+
+def _nearest(index: SpatialIndex, lat: float, lon: float, k: int, distances) -> Tuple[np.ndarray, np.ndarray]:
+    """(positions, km) of the `k` points nearest by `distances`, nearest first.
+
+    A backend's distance is never below the straight line, so once the k-th
+    best among the straight-line candidates is no farther than the farthest
+    candidate's straight line, no point outside the candidates can beat it.
+    """
+    if distances is STRAIGHT_LINE:
+        return index.nearest(lat, lon, k)
+    wanted = 2 * k
+    while True:
+        ids, straight = index.nearest(lat, lon, wanted)
+        km = distances.from_point((lat, lon), index.lats[ids], index.lons[ids])
+        ranked = np.argsort(km, kind='stable')[:k]
+        if len(ids) < wanted or len(ranked) == 0 or km[ranked[-1]] <= straight[-1]:
+            return ids[ranked], km[ranked]
+        wanted *= 4
+
+
+def within(index: SpatialIndex, lat: float, lon: float, radius_km: float,
+           distances=STRAIGHT_LINE) -> Tuple[np.ndarray, np.ndarray]:
+    """(positions, km) of the points within `radius_km` by `distances`, nearest first."""
+    ids, km = index.within(lat, lon, radius_km)
+    if distances is STRAIGHT_LINE:
+        return ids, km
+    # Points beyond the radius in a straight line are beyond it by road too
+    km = distances.from_point((lat, lon), index.lats[ids], index.lons[ids])
+    keep = km <= radius_km
+    ids, km = ids[keep], km[keep]
+    ranked = np.argsort(km, kind='stable')
+    return ids[ranked], km[ranked]
+
+
+def nearest_accounts(lat: float, lon: float, k: int,
+                     customers: pd.DataFrame, customer_index: SpatialIndex,
+                     prospects: pd.DataFrame, prospect_index: SpatialIndex,
+                     by: str = 'distance', distances=STRAIGHT_LINE) -> pd.DataFrame:
+    """The `k` customers and prospects nearest to (lat, lon), ranked.
+
+    `by='distance'` ranks nearest first; `by='spend'` ranks the same `k`
+    accounts by 3-year spend, highest first (prospects have none and come
+    last, nearest first). Distances come from the `distances` backend. Each
+    index must have been built over its frame.
+    """
+    ids, dists = _nearest(customer_index, lat, lon, k, distances)
+    rows = customers.iloc[ids]
+    found = pd.DataFrame({
+        'Type': 'Customer',
+        'Name': rows['Name'].to_numpy(),
+        'Distance (km)': dists,
+        '3-year Spend': rows['3-year Spend'].to_numpy(),
+        'Address': rows['Corrected_Address'].to_numpy(),
+        'lat': rows['Latitude'].to_numpy(dtype=float),
+        'lon': rows['Longitude'].to_numpy(dtype=float),
+    })
+    ids, dists = _nearest(prospect_index, lat, lon, k, distances)
+    rows = prospects.iloc[ids]
+    found = pd.concat([found, pd.DataFrame({
+        'Type': 'Prospect',
+        'Name': rows['Company Name'].to_numpy(),
+        'Distance (km)': dists,
+        '3-year Spend': float('nan'),
+        'Address': rows['address'].to_numpy(),
+        'lat': rows['latitude'].to_numpy(dtype=float),
+        'lon': rows['longitude'].to_numpy(dtype=float),
+    })], ignore_index=True)
+
+    # Keep the k nearest accounts of either type
+    found = found.sort_values('Distance (km)', kind='stable').head(k)
+    if by == 'spend':
+        found = found.sort_values(['3-year Spend', 'Distance (km)'], ascending=[False, True],
+                                  na_position='last', kind='stable')
+    found['Distance (km)'] = found['Distance (km)'].round(1)
+    return found.reset_index(drop=True)[NEAREST_COLUMNS]
@@ -0,0 +1,133 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Each finished rerun is appended here as one JSON object per line
+LOG_PATH = Path(os.environ.get('CUSTOMERMAP_PROFILE_LOG', Path(__file__).parent / '.cache' / 'profile.jsonl'))
+
+# Once the log reaches this size it is moved to LOG_PATH + '.1' (replacing the
+# previous one) and a new log is started, so at most twice this is kept
+LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Number of recent reruns kept in memory for the admin percentiles
+RECENT_RUNS = 500
+
+_recent = deque(maxlen=RECENT_RUNS)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def memory_tracing() -> bool:
+    return tracemalloc.is_tracing()
+
+
+def set_memory_tracing(enabled: bool):
+    """Turn tracemalloc on or off for the whole process."""
+    if enabled and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    elif not enabled and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def begin_run(**context):
+    """Start recording stages for the current script run on this thread."""
+    _local.run = {'started': time.time(), 'start': time.perf_counter(), 'context': context, 'stages': {}}
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block (and its peak traced memory, if tracing) as part of the current run.
+
+    Outside a run, e.g. when modules are used from scripts, this does nothing.
+    Repeated stages within one run are summed.
+    """
+    run = getattr(_local, 'run', None)
+    if run is None:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Note: resetting the peak means an enclosing stage only sees its own tail
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record = run['stages'].setdefault(name, {'ms': 0.0})
+        record['ms'] += (time.perf_counter() - start) * 1e3
+        if tracing and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1] - base
+            record['peak_kb'] = max(record.get('peak_kb', 0), round(peak / 1024, 1))
+
+
+def timed(name: str):
+    """Decorator form of `stage`."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def end_run() -> Optional[dict]:
+    """Finish the current run, log it as a JSON line (rotating the log at LOG_MAX_BYTES) and keep it for summaries."""
+    run = getattr(_local, 'run', None)
+    if run is None:
+        return None
+    _local.run = None
+    entry = {
+        'ts': run['started'],
+        **run['context'],
+        'total_ms': round((time.perf_counter() - run['start']) * 1e3, 2),
+        'stages': {name: {k: round(v, 2) for k, v in rec.items()} for name, rec in run['stages'].items()},
+    }
+    with _lock:
+        _recent.append(entry)
+        try:
+            LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            if LOG_PATH.exists() and LOG_PATH.stat().st_size >= LOG_MAX_BYTES:
+                os.replace(LOG_PATH, f"{LOG_PATH}.1")
+            with open(LOG_PATH, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+        except OSError:
+            pass
+    return entry
+
+
+def summary() -> 'pd.DataFrame':
+    """Per-stage latency percentiles (ms) over the recent runs of this process."""
+    # Imported here: profiling runs from the login page on, pandas only past it
+    import pandas as pd
+
+    with _lock:
+        runs = list(_recent)
+    rows = [{'stage': name, 'ms': rec['ms'], 'peak_kb': rec.get('peak_kb')}
+            for run in runs for name, rec in run['stages'].items()]
+    rows += [{'stage': 'total', 'ms': run['total_ms'], 'peak_kb': None} for run in runs]
+    if not rows:
+        return pd.DataFrame(columns=['stage', 'runs', 'p50_ms', 'p90_ms', 'p99_ms', 'max_ms', 'max_peak_kb'])
+    df = pd.DataFrame(rows)
+    grouped = df.groupby('stage', sort=False)
+    result = pd.DataFrame({
+        'runs': grouped['ms'].count(),
+        'p50_ms': grouped['ms'].quantile(0.5),
+        'p90_ms': grouped['ms'].quantile(0.9),
+        'p99_ms': grouped['ms'].quantile(0.99),
+        'max_ms': grouped['ms'].max(),
+        'max_peak_kb': grouped['peak_kb'].max(),
+    })
+    return result.round(2).reset_index()
+
@@ -0,0 +1,371 @@
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from data_cache import file_digest
+from database import get_pool
+from route_planner import distance_matrix, distances_from, haversine, leg_distances
+from spatial_index import SpatialIndex
+
+# Road graph used by the app when present; see save_graph for the file format
+ROAD_GRAPH_PATH = os.environ.get('CUSTOMERMAP_ROAD_GRAPH', 'attached_assets/roads.npz')
+
+# Contracted graphs and computed stop-to-stop distances are stored here
+CACHE_DIR = Path(os.environ.get('CUSTOMERMAP_ROAD_CACHE_DIR', Path(__file__).parent / '.cache' / 'roads'))
+
+# Bump when contraction changes its output, so stale hierarchies are rebuilt
+CH_VERSION = 1
+
+# Cached distances are keyed by coordinates rounded to this many decimals (~11 m)
+COORD_DECIMALS = 4
+
+# Witness searches give up after settling this many nodes and add the shortcut
+WITNESS_SETTLE_LIMIT = 60
+
+# SQLite allows at most 999 bound parameters per statement
+_QUERY_CHUNK = 900
+
+logger = logging.getLogger(__name__)
+
+
+def save_graph(path, lat, lon, src, dst, km, oneway=None):
+    """Write a road graph file: node coordinates plus edges src -> dst of `km`.
+
+    Edges are two-way unless `oneway` marks them. A preprocessed OSM extract
+    is turned into this format once, offline; the app never needs a network.
+    """
+    arrays = {
+        'lat': np.asarray(lat, dtype=np.float64),
+        'lon': np.asarray(lon, dtype=np.float64),
+        'src': np.asarray(src, dtype=np.int64),
+        'dst': np.asarray(dst, dtype=np.int64),
+        'km': np.asarray(km, dtype=np.float64),
+        'oneway': np.zeros(len(src), dtype=bool) if oneway is None else np.asarray(oneway, dtype=bool),
+    }
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+
+def _largest_component(n: int, src: np.ndarray, dst: np.ndarray) -> np.ndarray:
+    """Mask of the nodes in the largest weakly connected component."""
+    parent = list(range(n))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in zip(src.tolist(), dst.tolist()):
+        ra, rb = find(a), find(b)
+        if ra != rb:
+            parent[ra] = rb
+    roots = np.array([find(x) for x in range(n)])
+    return roots == np.bincount(roots).argmax()
+
+
+def _witness(source: int, skip: int, limit: float, out: List[Dict[int, float]]) -> Dict[int, float]:
+    """Bounded Dijkstra from `source` avoiding `skip`; distances found so far."""
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    while heap:
+        d, x = heapq.heappop(heap)
+        if d > dist[x]:
+            continue
+        settled += 1
+        if d > limit or settled > WITNESS_SETTLE_LIMIT:
+            break
+        for y, w in out[x].items():
+            nd = d + w
+            if y != skip and nd < dist.get(y, float('inf')):
+                dist[y] = nd
+                heapq.heappush(heap, (nd, y))
+    return dist
+
+
+def _shortcuts(v: int, out: List[Dict[int, float]], inn: List[Dict[int, float]]) -> List[Tuple[int, int, float]]:
+    """Shortcuts needed to keep distances exact once `v` is removed."""
+    needed = []
+    for u, du in inn[v].items():
+        targets = {w: du + dw for w, dw in out[v].items() if w != u}
+        if not targets:
+            continue
+        dist = _witness(u, v, max(targets.values()), out)
+        needed.extend((u, w, length) for w, length in targets.items()
+                      if dist.get(w, float('inf')) > length)
+    return needed
+
+
+def _csr(adjacency: List[Dict[int, float]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ptr = np.zeros(len(adjacency) + 1, dtype=np.int64)
+    ptr[1:] = np.cumsum([len(a) for a in adjacency])
+    to = np.fromiter((w for a in adjacency for w in a), dtype=np.int64, count=ptr[-1])
+    km = np.fromiter((d for a in adjacency for d in a.values()), dtype=np.float64, count=ptr[-1])
+    return ptr, to, km
+
+
+def contract(lat, lon, src, dst, km, oneway) -> Dict[str, np.ndarray]:
+    """Build a contraction hierarchy over a road graph.
+
+    Nodes are contracted in order of edge difference plus contracted
+    neighbours (re-checked lazily), adding a shortcut whenever a bounded
+    witness search finds no path as short around the removed node. The
+    result keeps, per node, only the edges to higher-ranked nodes: `up_*`
+    for forward searches and `down_*` for backward ones, as CSR arrays.
+    """
+    lat, lon = np.asarray(lat, dtype=np.float64), np.asarray(lon, dtype=np.float64)
+    src, dst = np.asarray(src, dtype=np.int64), np.asarray(dst, dtype=np.int64)
+    oneway = np.asarray(oneway, dtype=bool)
+    n = len(lat)
+    # No road is shorter than the straight line; distances rely on that bound
+    rlat, rlon = np.radians(lat), np.radians(lon)
+    km = np.maximum(np.asarray(km, dtype=np.float64), haversine(rlat[src], rlon[src], rlat[dst], rlon[dst]))
+
+    out: List[Dict[int, float]] = [{} for _ in range(n)]
+    inn: List[Dict[int, float]] = [{} for _ in range(n)]
+
+    def add(u, w, d):
+        if u != w and d < out[u].get(w, float('inf')):
+            out[u][w] = d
+            inn[w][u] = d
+
+    for u, w, d, one in zip(src.tolist(), dst.tolist(), km.tolist(), oneway.tolist()):
+        add(u, w, d)
+        if not one:
+            add(w, u, d)
+
+    deleted = [0] * n
+    up: List[Dict[int, float]] = [{} for _ in range(n)]
+    down: List[Dict[int, float]] = [{} for _ in range(n)]
+    heap = [(len(_shortcuts(v, out, inn)) - len(out[v]) - len(inn[v]), v) for v in range(n)]
+    heapq.heapify(heap)
+    added = 0
+    while heap:
+        _, v = heapq.heappop(heap)
+        needed = _shortcuts(v, out, inn)
+        priority = len(needed) - len(out[v]) - len(inn[v]) + deleted[v]
+        if heap and priority > heap[0][0]:
+            heapq.heappush(heap, (priority, v))
+            continue
+        # Every remaining neighbour is contracted later, so ranks higher
+        up[v], down[v] = out[v], inn[v]
+        out[v], inn[v] = {}, {}
+        for w in up[v]:
+            del inn[w][v]
+            deleted[w] += 1
+        for u in down[v]:
+            del out[u][v]
+            deleted[u] += 1
+        for u, w, d in needed:
+            add(u, w, d)
+        added += len(needed)
+
+    up_ptr, up_to, up_km = _csr(up)
+    down_ptr, down_to, down_km = _csr(down)
+    logger.info("Contracted %d nodes with %d shortcuts", n, added)
+    return {
+        'lat': lat, 'lon': lon, 'snap': _largest_component(n, src, dst),
+        'up_ptr': up_ptr, 'up_to': up_to, 'up_km': up_km,
+        'down_ptr': down_ptr, 'down_to': down_to, 'down_km': down_km,
+    }
+
+
+def _load_hierarchy(graph_path: Path, digest: str, cache_dir: Path) -> Dict[str, np.ndarray]:
+    """The graph's contraction hierarchy, contracted once and kept on disk."""
+    cached = cache_dir / f"{digest[:24]}.ch{CH_VERSION}.npz"
+    if cached.exists():
+        with np.load(cached) as f:
+            return dict(f)
+    with np.load(graph_path) as f:
+        graph = dict(f)
+    start = time.perf_counter()
+    hierarchy = contract(graph['lat'], graph['lon'], graph['src'], graph['dst'], graph['km'],
+                         graph.get('oneway', np.zeros(len(graph['src']), dtype=bool)))
+    logger.info("Contracted %s in %.1f s", graph_path, time.perf_counter() - start)
+    try:
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp = cached.with_name(f"{cached.name}.{os.getpid()}.tmp")
+        try:
+            with open(tmp, 'wb') as f:
+                np.savez(f, **hierarchy)
+            os.replace(tmp, cached)
+        finally:
+            tmp.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning("Could not cache the contracted road graph: %s", e)
+    return hierarchy
+
+
+def _upward(node: int, ptr: List[int], to: List[int], km: List[float]) -> Dict[int, float]:
+    """Distances to every node reachable from `node` over higher-ranked nodes only."""
+    dist = {node: 0.0}
+    done = {}
+    heap = [(0.0, node)]
+    while heap:
+        d, x = heapq.heappop(heap)
+        if x in done:
+            continue
+        done[x] = d
+        for i in range(ptr[x], ptr[x + 1]):
+            y, nd = to[i], d + km[i]
+            if nd < dist.get(y, float('inf')):
+                dist[y] = nd
+                heapq.heappush(heap, (nd, y))
+    return done
+
+
+def _coord_keys(lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """One integer per coordinate pair rounded to COORD_DECIMALS."""
+    scale = 10 ** COORD_DECIMALS
+    rows = np.round(lats * scale).astype(np.int64) + 90 * scale
+    cols = np.round(lons * scale).astype(np.int64) + 180 * scale
+    return rows * (360 * scale + 1) + cols
+
+
+def _key_coords(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scale = 10 ** COORD_DECIMALS
+    rows, cols = np.divmod(keys, 360 * scale + 1)
+    return (rows - 90 * scale) / scale, (cols - 180 * scale) / scale
+
+
+class RoadDistances:
+    """Shortest road distances over a contraction hierarchy, cached on disk.
+
+    Points are snapped to the nearest node of the graph's largest connected
+    component, and the snapping distance is added to each end. Many-to-many
+    queries run one upward search per distinct point and meet in per-node
+    buckets. Results are stored in SQLite keyed by rounded coordinates, so
+    later matrices over the same stops are lookups. Pairs the roads do not
+    connect (one-way traps) fall back to the straight-line distance.
+    """
+
+    name = 'Road network'
+
+    def __init__(self, graph_path=ROAD_GRAPH_PATH, cache_dir=CACHE_DIR):
+        self.graph_path = Path(graph_path)
+        self.cache_dir = Path(cache_dir)
+        digest = file_digest(self.graph_path)
+        h = _load_hierarchy(self.graph_path, digest, self.cache_dir)
+        self._up = (h['up_ptr'].tolist(), h['up_to'].tolist(), h['up_km'].tolist())
+        self._down = (h['down_ptr'].tolist(), h['down_to'].tolist(), h['down_km'].tolist())
+        self._nodes = np.flatnonzero(h['snap'])
+        self._node_lat, self._node_lon = h['lat'], h['lon']
+        self._index = SpatialIndex(h['lat'][self._nodes], h['lon'][self._nodes])
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._pool = get_pool(str(self.cache_dir / f"{digest[:24]}.distances.sqlite"))
+        with self._pool.connection() as conn, conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS road_km (a INTEGER NOT NULL, b INTEGER NOT NULL, '
+                         'km REAL NOT NULL, PRIMARY KEY (a, b)) WITHOUT ROWID')
+        self._lock = threading.Lock()
+
+    def __reduce__(self):
+        # Worker processes reopen the graph and cache instead of copying them
+        return open_road_distances, (str(self.graph_path), str(self.cache_dir))
+
+    def _snap(self, lats: np.ndarray, lons: np.ndarray) -> Tuple[List[int], np.ndarray]:
+        """(graph node, km to it) for each point."""
+        nodes, offsets = [], np.empty(len(lats))
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            ids, dists = self._index.nearest(lat, lon, 1)
+            nodes.append(int(self._nodes[ids[0]]))
+            offsets[i] = dists[0]
+        return nodes, offsets
+
+    def _route(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Road km between rounded-coordinate keys, computed on the hierarchy."""
+        s_lat, s_lon = _key_coords(sources)
+        t_lat, t_lon = _key_coords(targets)
+        s_nodes, s_off = self._snap(s_lat, s_lon)
+        t_nodes, t_off = self._snap(t_lat, t_lon)
+
+        buckets = defaultdict(list)
+        for j, node in enumerate(t_nodes):
+            for v, d in _upward(node, *self._down).items():
+                buckets[v].append((j, d))
+        graph = np.full((len(sources), len(targets)), np.inf)
+        searched = {}
+        for i, node in enumerate(s_nodes):
+            if node in searched:
+                graph[i] = graph[searched[node]]
+                continue
+            searched[node] = i
+            row = graph[i]
+            for v, d in _upward(node, *self._up).items():
+                for j, dt in buckets.get(v, ()):
+                    if d + dt < row[j]:
+                        row[j] = d + dt
+
+        km = s_off[:, None] + graph + t_off[None, :]
+        straight = haversine(np.radians(s_lat)[:, None], np.radians(s_lon)[:, None],
+                             np.radians(t_lat)[None, :], np.radians(t_lon)[None, :])
+        km = np.where(np.isinf(km), straight, km)
+        km[sources[:, None] == targets[None, :]] = 0.0
+        return km
+
+    def _between(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        """Road km between distinct rounded-coordinate keys, through the disk cache."""
+        km = np.full((len(sources), len(targets)), np.nan)
+        col = {key: j for j, key in enumerate(targets.tolist())}
+        with self._pool.connection() as conn:
+            for i, a in enumerate(sources.tolist()):
+                for start in range(0, len(targets), _QUERY_CHUNK):
+                    chunk = targets[start:start + _QUERY_CHUNK].tolist()
+                    rows = conn.execute(f"SELECT b, km FROM road_km WHERE a = ? AND b IN "
+                                        f"({','.join('?' * len(chunk))})", [a] + chunk)
+                    for b, d in rows:
+                        km[i, col[b]] = d
+
+        missing = np.isnan(km)
+        if missing.any():
+            rows = np.flatnonzero(missing.any(axis=1))
+            cols = np.flatnonzero(missing[rows].any(axis=0))
+            with self._lock:
+                found = self._route(sources[rows], targets[cols])
+            km[np.ix_(rows, cols)] = found
+            pairs = [(a, b, d) for a, found_row in zip(sources[rows].tolist(), found.tolist())
+                     for b, d in zip(targets[cols].tolist(), found_row)]
+            with self._pool.connection() as conn, conn:
+                conn.executemany('INSERT OR IGNORE INTO road_km (a, b, km) VALUES (?, ?, ?)', pairs)
+        return km
+
+    def matrix(self, lats, lons) -> np.ndarray:
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        keys, inverse = np.unique(_coord_keys(lats, lons), return_inverse=True)
+        km = self._between(keys, keys)[np.ix_(inverse, inverse)]
+        # Rounding may move a point a few metres; never go below the straight line
+        return np.maximum(km, distance_matrix(lats, lons))
+
+    def from_point(self, point: Tuple[float, float], lats, lons) -> np.ndarray:
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if len(lats) == 0:
+            return np.empty(0)
+        source = _coord_keys(np.array([point[0]]), np.array([point[1]]))
+        keys, inverse = np.unique(_coord_keys(lats, lons), return_inverse=True)
+        km = self._between(source, keys)[0, inverse]
+        return np.maximum(km, distances_from(point, lats, lons))
+
+    def legs(self, lats, lons) -> np.ndarray:
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        keys = _coord_keys(lats, lons)
+        # One lookup per leg rather than a matrix over every pair of stops
+        km = np.array([self._between(keys[i:i + 1], keys[i + 1:i + 2])[0, 0] for i in range(len(keys) - 1)])
+        return np.maximum(km, leg_distances(lats, lons))
+
+
+@lru_cache(maxsize=None)
+def open_road_distances(graph_path: str = ROAD_GRAPH_PATH, cache_dir: str = str(CACHE_DIR)) -> RoadDistances:
+    """One RoadDistances per graph file and cache directory in this process."""
+    return RoadDistances(graph_path, cache_dir)
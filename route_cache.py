@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, List, Tuple
+
+from route_planner import STRAIGHT_LINE, calculate_optimal_route
+
+# Default number of solved routes kept, shared by all sessions
+DEFAULT_MAX_ENTRIES = 256
+
+# Stops are identified by their coordinates rounded to this many decimals (~0.1 m)
+COORD_DECIMALS = 6
+
+
+def _point(location: Dict) -> Tuple[float, float]:
+    return round(float(location['lat']), COORD_DECIMALS), round(float(location['lon']), COORD_DECIMALS)
+
+
+class RouteCache:
+    """Thread-safe LRU cache of solved routes, keyed by start and stop set.
+
+    The key is the first location, the fixed end if any, and the sorted
+    coordinates of the other stops, so adding the same stops in another
+    order finds the same entry. Entries hold the visiting order as
+    coordinates and the leg distances; a hit maps the order back onto the
+    caller's location dicts.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, Tuple[tuple, Tuple[float, ...]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def key(locations: List[Dict], fixed_end: bool = False, round_trip: bool = False,
+            distances=STRAIGHT_LINE) -> Hashable:
+        points = [_point(loc) for loc in locations]
+        end = points[-1] if fixed_end and len(points) > 1 else None
+        middle = points[1:-1] if end is not None else points[1:]
+        return distances.name, round_trip, points[0], end, tuple(sorted(middle))
+
+    def solve(self, locations: List[Dict], fixed_end: bool = False, round_trip: bool = False,
+              distances=STRAIGHT_LINE, progress=None, solver=calculate_optimal_route) -> Dict:
+        """Solve like calculate_optimal_route, reusing an earlier solution of the same stops.
+
+        Returns {'route': [...], 'legs': [km, ...], 'total_km': float}, where
+        `legs[i]` is the distance from `route[i]` to `route[i + 1]`. On a miss
+        the route comes from `solver`, called like calculate_optimal_route
+        with `progress` passed on.
+        """
+        if not locations:
+            return {'route': [], 'legs': [], 'total_km': 0.0}
+        key = self.key(locations, fixed_end, round_trip, distances)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+
+        if entry is None:
+            # Solved outside the lock; two sessions racing on one key both solve it
+            route = solver(locations, fixed_end, round_trip, distances, progress)
+            legs = tuple(distances.legs([loc['lat'] for loc in route], [loc['lon'] for loc in route]).tolist())
+            visits = route[:-1] if round_trip and len(route) > 1 else route
+            entry = (tuple(_point(loc) for loc in visits), legs)
+            with self._lock:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return {'route': route, 'legs': list(legs), 'total_km': sum(legs)}
+
+        order, legs = entry
+        # Stops sharing coordinates are handed out in the caller's order
+        by_point = defaultdict(list)
+        for loc in locations:
+            by_point[_point(loc)].append(loc)
+        route = [by_point[point].pop(0) for point in order]
+        if round_trip and len(route) > 1:
+            route.append(route[0])
+        return {'route': route, 'legs': list(legs), 'total_km': sum(legs)}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,256 @@
+import multiprocessing
+import queue
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Hashable, List, Optional
+
+from route_cache import RouteCache
+from route_planner import STRAIGHT_LINE, calculate_optimal_route
+
+# Solver processes shared by all sessions; further jobs wait in the pool's queue
+DEFAULT_WORKERS = 2
+
+# Seconds between progress reports, and cancellation checks, of a solve in a worker process
+REPORT_SECONDS = 0.1
+
+# Sessions whose latest job is kept; the least recently used are dropped
+DEFAULT_MAX_SESSIONS = 512
+
+# Held while a solver process starts with a stand-in __main__
+_spawn_lock = threading.Lock()
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback to stop its solve."""
+
+
+def _solve_in_process(locations: List[Dict], fixed_end: bool, round_trip: bool, distances,
+                      updates, cancelled) -> List[int]:
+    """calculate_optimal_route in a worker process, returning the route as positions in `locations`.
+
+    At most every REPORT_SECONDS the progress goes to the `updates` queue as
+    (fraction, positions of the best route or None), and the solve stops
+    with JobCancelled once the `cancelled` event is set.
+    """
+    position = {id(loc): i for i, loc in enumerate(locations)}
+    next_report = 0.0
+
+    def progress(fraction, best):
+        nonlocal next_report
+        now = time.monotonic()
+        if now < next_report:
+            return
+        next_report = now + REPORT_SECONDS
+        if cancelled.is_set():
+            raise JobCancelled()
+        updates.put((fraction, None if best is None else [position[id(loc)] for loc in best]))
+
+    route = calculate_optimal_route(locations, fixed_end, round_trip, distances, progress)
+    return [position[id(loc)] for loc in route]
+
+
+class _SolverProcess(multiprocessing.context.SpawnProcess):
+    """A spawned process that does not re-run the Streamlit script first.
+
+    Streamlit installs each script as the __main__ module, and a spawned
+    child runs __main__'s file before anything else; a __main__ without a
+    file is left alone. Reruns install their script from other threads, so
+    a child started while one did is stopped and started again.
+    """
+
+    @staticmethod
+    def _Popen(process_obj):
+        with _spawn_lock:
+            while True:
+                placeholder = types.ModuleType('__main__')
+                main, sys.modules['__main__'] = sys.modules['__main__'], placeholder
+                popen = multiprocessing.context.SpawnProcess._Popen(process_obj)
+                if sys.modules['__main__'] is placeholder:
+                    sys.modules['__main__'] = main
+                    return popen
+                # The child is still reading its start-up data, before anything is shared with it
+                popen.kill()
+                popen.wait()
+
+
+class _SolverContext(multiprocessing.context.SpawnContext):
+    Process = _SolverProcess
+
+
+class RouteJob:
+    """One route solve with its progress, best route so far and result.
+
+    `status` goes from 'queued' to 'running' and ends as 'done', 'cancelled'
+    or 'failed'. `fraction` is the share of the solve done, None when the
+    solver cannot tell; `best` is the best route found so far.
+    """
+
+    def __init__(self, key: Hashable, locations: List[Dict]):
+        self.key = key
+        self.locations = locations
+        self.status = 'queued'
+        self.fraction: Optional[float] = 0.0
+        self.best: Optional[List[Dict]] = None
+        self.result: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'cancelled', 'failed')
+
+    def cancel(self):
+        """Stop the job: a queued job never starts, a running one stops at its next progress report."""
+        self._cancelled.set()
+        if self.future is not None and self.future.cancel():
+            self.status = 'cancelled'
+
+    def _progress(self, fraction: Optional[float], best: Optional[List[Dict]]):
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self.fraction = fraction
+        if best is not None:
+            self.best = best
+
+    def _solve(self, launch, locations: List[Dict], fixed_end: bool, round_trip: bool, distances,
+               progress) -> List[Dict]:
+        """Solve in the process pool, relaying its progress to `progress` and cancellation back to it."""
+        future, updates, cancelled = launch(locations, fixed_end, round_trip, distances)
+        try:
+            while not future.done():
+                try:
+                    fraction, best = updates.get(timeout=REPORT_SECONDS)
+                except queue.Empty:
+                    fraction, best = self.fraction, None
+                progress(fraction, None if best is None else [locations[i] for i in best])
+        except JobCancelled:
+            cancelled.set()
+            raise
+        return [locations[i] for i in future.result()]
+
+    def _run(self, cache: RouteCache, fixed_end: bool, round_trip: bool, distances, launch):
+        if self._cancelled.is_set():
+            self.status = 'cancelled'
+            return
+        self.status = 'running'
+
+        def solver(locations, fixed_end, round_trip, distances, progress):
+            return self._solve(launch, locations, fixed_end, round_trip, distances, progress)
+
+        try:
+            result = cache.solve(self.locations, fixed_end, round_trip, distances, self._progress, solver)
+        except JobCancelled:
+            self.status = 'cancelled'
+        except Exception as e:
+            self.error = str(e)
+            self.status = 'failed'
+        else:
+            # Readers check status last, so everything else is in place first
+            self.result, self.best, self.fraction = result, result['route'], 1.0
+            self.status = 'done'
+
+
+class RouteJobs:
+    """Route solves in a bounded process pool, off the Streamlit script thread.
+
+    The solvers are pure Python, so they run in worker processes where they
+    neither share the GIL with the server nor with each other; a thread per
+    running job relays its progress and cancellation. Each session has at
+    most one current job, looked up by any key (e.g. its session token), so
+    a finished route survives reruns. Submitting other stops, or asking for
+    the current job of a changed selection, cancels the old job. Solves go
+    through `cache`, so repeated plans finish at once without a process.
+    """
+
+    def __init__(self, cache: RouteCache, workers: int = DEFAULT_WORKERS,
+                 max_sessions: int = DEFAULT_MAX_SESSIONS):
+        self.cache = cache
+        self.max_sessions = max_sessions
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='route-job')
+        # Spawned rather than forked: forking the multi-threaded server can copy
+        # a lock another thread holds into a child that then never gets it
+        self._context = _SolverContext()
+        self._processes = ProcessPoolExecutor(max_workers=workers, mp_context=self._context)
+        # Serves the progress queues and cancel events shared with the worker
+        # processes; started by the first solve that needs a process
+        self._manager = None
+        self._launch_lock = threading.Lock()
+        self._jobs: "OrderedDict[Hashable, RouteJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, session: Hashable, locations: List[Dict], fixed_end: bool = False,
+               round_trip: bool = False, distances=STRAIGHT_LINE) -> RouteJob:
+        """Start solving `locations` for `session`, unless that job is already under way or done."""
+        key = RouteCache.key(locations, fixed_end, round_trip, distances)
+        with self._lock:
+            job = self._jobs.get(session)
+            if job is not None and job.key == key and job.status in ('queued', 'running', 'done'):
+                self._jobs.move_to_end(session)
+                return job
+            if job is not None:
+                job.cancel()
+            job = RouteJob(key, list(locations))
+            self._jobs[session] = job
+            self._jobs.move_to_end(session)
+            while len(self._jobs) > self.max_sessions:
+                self._jobs.popitem(last=False)[1].cancel()
+            job.future = self._pool.submit(job._run, self.cache, fixed_end, round_trip, distances, self._launch)
+            return job
+
+    def start(self):
+        """Start the manager and a worker process ahead of the first solve."""
+        with self._launch_lock:
+            self._start_manager()
+        self._processes.submit(int).result()
+
+    def _start_manager(self):
+        if self._manager is None:
+            self._manager = self._context.Manager()
+        return self._manager
+
+    def _launch(self, locations: List[Dict], fixed_end: bool, round_trip: bool, distances):
+        """(future, progress queue, cancel event) of a solve submitted to the process pool."""
+        with self._launch_lock:
+            manager = self._start_manager()
+        updates, cancelled = manager.Queue(), manager.Event()
+        future = self._processes.submit(_solve_in_process, locations, fixed_end, round_trip, distances,
+                                        updates, cancelled)
+        return future, updates, cancelled
+
+    def current(self, session: Hashable, locations: List[Dict], fixed_end: bool = False,
+                round_trip: bool = False, distances=STRAIGHT_LINE) -> Optional[RouteJob]:
+        """The session's job if it is for these stops; otherwise cancel and forget it."""
+        with self._lock:
+            job = self._jobs.get(session)
+            if job is None:
+                return None
+            if locations and job.key == RouteCache.key(locations, fixed_end, round_trip, distances):
+                self._jobs.move_to_end(session)
+                return job
+            del self._jobs[session]
+        job.cancel()
+        return None
+
+    def cancel(self, session: Hashable):
+        with self._lock:
+            job = self._jobs.pop(session, None)
+        if job is not None:
+            job.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+            self._jobs.clear()
+        for job in jobs:
+            job.cancel()
+        self._pool.shutdown(wait=True)
+        self._processes.shutdown(wait=True)
+        with self._launch_lock:
+            manager, self._manager = self._manager, None
+        if manager is not None:
+            manager.shutdown()
@@ -1,14 +1,16 @@
 
 import streamlit as st
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
 import folium
 from streamlit_folium import folium_static
-from itertools import permutations
 from math import radians, sin, cos, sqrt, atan2
 
+EARTH_RADIUS_KM = 6371
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two points using Haversine formula."""
-    R = 6371  # Earth's radius in kilometers
+    R = EARTH_RADIUS_KM
     lat1, lon1, lat2, lon2 = map(radians, [lat1, lon1, lat2, lon2])
     dlat = lat2 - lat1
     dlon = lon2 - lon1
@@ -16,36 +18,480 @@ def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     c = 2 * atan2(sqrt(a), sqrt(1-a))
     return R * c
 
-def calculate_optimal_route(locations: List[Dict]) -> List[Dict]:
-    """Find the shortest route visiting all locations using brute force."""
+def haversine(lat1: np.ndarray, lon1: np.ndarray, lat2: np.ndarray, lon2: np.ndarray) -> np.ndarray:
+    """Broadcasting Haversine over arrays already converted to radians."""
+    a = np.sin((lat2 - lat1) / 2)**2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2)**2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def distances_from(point: Tuple[float, float], lats, lons) -> np.ndarray:
+    """Distances (km) from one (lat, lon) point to every point in `lats`/`lons`."""
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    return haversine(radians(point[0]), radians(point[1]), lats, lons)
+
+def distance_matrix(lats, lons) -> np.ndarray:
+    """Pairwise distance matrix (km) between all points in `lats`/`lons`."""
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    return haversine(lats[:, None], lons[:, None], lats[None, :], lons[None, :])
+
+def distances_between(lats1, lons1, lats2, lons2) -> np.ndarray:
+    """Distances (km) from every point of the first set (rows) to every point of the second (columns)."""
+    lats1, lons1, lats2, lons2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lats1, lons1, lats2, lons2))
+    return haversine(lats1[:, None], lons1[:, None], lats2[None, :], lons2[None, :])
+
+def leg_distances(lats, lons) -> np.ndarray:
+    """Distances (km) from each point in `lats`/`lons` to the next one."""
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lons = np.radians(np.asarray(lons, dtype=np.float64))
+    return haversine(lats[:-1], lons[:-1], lats[1:], lons[1:])
+
+class StraightLineDistances:
+    """Great-circle distances; the default distance backend.
+
+    A distance backend answers `matrix(lats, lons)` (pairwise km, rows are
+    origins), `from_point(point, lats, lons)` (km from one (lat, lon)) and
+    `legs(lats, lons)` (km from each point to the next).
+    Backends never return less than the great-circle distance, so a
+    straight-line search can bound theirs (see nearby.nearest_accounts).
+    """
+
+    name = 'Straight line'
+
+    def matrix(self, lats, lons) -> np.ndarray:
+        return distance_matrix(lats, lons)
+
+    def from_point(self, point: Tuple[float, float], lats, lons) -> np.ndarray:
+        return distances_from(point, lats, lons)
+
+    def legs(self, lats, lons) -> np.ndarray:
+        return leg_distances(lats, lons)
+
+STRAIGHT_LINE = StraightLineDistances()
+
+# Stop counts up to this size are solved exactly with Held-Karp; larger ones
+# fall back to nearest neighbour followed by 2-opt/Or-opt improvement.
+HELD_KARP_MAX_STOPS = 15
+
+def _distance_matrix(locations: List[Dict], distances=STRAIGHT_LINE) -> np.ndarray:
+    """Build the pairwise distance matrix (km) for a list of locations."""
+    return distances.matrix([loc['lat'] for loc in locations],
+                            [loc['lon'] for loc in locations])
+
+def _held_karp(dist: np.ndarray, stops: List[int], end: Optional[int],
+               report: Optional[Callable] = None) -> List[int]:
+    """Exact bitmask DP over `stops`, starting at node 0 and finishing at `end`.
+
+    When `end` is None the path may finish at any stop. `report(fraction,
+    None)` is called after each subset size.
+    """
+    m = len(stops)
+    if m == 0:
+        return []
+    full = (1 << m) - 1
+    sub = dist[np.ix_(stops, stops)]
+    dp = np.full((1 << m, m), np.inf)
+    parent = np.full((1 << m, m), -1, dtype=np.int16)
+    for j in range(m):
+        dp[1 << j, j] = dist[0, stops[j]]
+
+    masks = np.arange(1 << m)
+    popcount = np.zeros(1 << m, dtype=np.int8)
+    for j in range(m):
+        popcount += (masks >> j) & 1
+    for size in range(2, m + 1):
+        layer = masks[popcount == size]
+        for j in range(m):
+            rows = layer[(layer >> j) & 1 == 1]
+            cand = dp[rows ^ (1 << j)] + sub[:, j]
+            best = cand.argmin(axis=1)
+            dp[rows, j] = cand[np.arange(len(rows)), best]
+            parent[rows, j] = best
+        if report is not None:
+            report(size / m, None)
+
+    closing = dist[stops, end] if end is not None else np.zeros(m)
+    last = int((dp[full] + closing).argmin())
+    order = []
+    mask = full
+    while last != -1:
+        order.append(stops[last])
+        prev = int(parent[mask, last])
+        mask ^= 1 << last
+        last = prev
+    return order[::-1]
+
+def _path_length(path: List[int], dist: List[List[float]]) -> float:
+    return sum(dist[a][b] for a, b in zip(path, path[1:]))
+
+def _nearest_neighbour(dist: List[List[float]], stops: List[int]) -> List[int]:
+    """Greedy tour over `stops` starting from node 0."""
+    remaining = set(stops)
+    order = []
+    current = 0
+    while remaining:
+        current = min(remaining, key=lambda k: dist[current][k])
+        remaining.remove(current)
+        order.append(current)
+    return order
+
+def _two_opt(path: List[int], dist: List[List[float]], sweep: Optional[Callable] = None) -> bool:
+    """Reverse segments of `path` in place while that shortens it.
+
+    Both endpoints of `path` stay fixed. Returns True if anything changed.
+    `sweep(path)` is called after each improving sweep.
+    """
+    improved = False
+    n = len(path)
+    changed = True
+    while changed:
+        changed = False
+        for i in range(1, n - 2):
+            a, b = path[i - 1], path[i]
+            for j in range(i + 1, n - 1):
+                c, d = path[j], path[j + 1]
+                delta = dist[a][c] + dist[b][d] - dist[a][b] - dist[c][d]
+                if delta < -1e-9:
+                    path[i:j + 1] = path[i:j + 1][::-1]
+                    b = path[i]
+                    changed = improved = True
+        if changed and sweep is not None:
+            sweep(path)
+    return improved
+
+def _or_opt(path: List[int], dist: List[List[float]], sweep: Optional[Callable] = None) -> bool:
+    """Relocate runs of 1-3 stops (optionally reversed) while that shortens `path`.
+
+    Both endpoints of `path` stay fixed. Returns True if anything changed.
+    `sweep(path)` is called after each move.
+    """
+    improved = False
+    changed = True
+    while changed:
+        changed = False
+        for seg_len in (1, 2, 3):
+            for i in range(1, len(path) - seg_len):
+                seg = path[i:i + seg_len]
+                prev, nxt = path[i - 1], path[i + seg_len]
+                removed = dist[prev][seg[0]] + dist[seg[-1]][nxt] - dist[prev][nxt]
+                rest = path[:i] + path[i + seg_len:]
+                best_gain, best_move = 1e-9, None
+                for k in range(len(rest) - 1):
+                    p, q = rest[k], rest[k + 1]
+                    base = dist[p][q]
+                    fwd = dist[p][seg[0]] + dist[seg[-1]][q] - base
+                    rev = dist[p][seg[-1]] + dist[seg[0]][q] - base
+                    if removed - fwd > best_gain:
+                        best_gain, best_move = removed - fwd, (k, seg)
+                    if removed - rev > best_gain:
+                        best_gain, best_move = removed - rev, (k, seg[::-1])
+                if best_move is not None:
+                    k, moved = best_move
+                    path[:] = rest[:k + 1] + moved + rest[k + 1:]
+                    changed = improved = True
+                    if sweep is not None:
+                        sweep(path)
+                    break
+            if changed:
+                break
+    return improved
+
+def _local_search(dist: np.ndarray, stops: List[int], end: Optional[int],
+                  report: Optional[Callable] = None) -> List[int]:
+    """Nearest neighbour construction improved with 2-opt and Or-opt.
+
+    `report(None, order)` is called with the best order after construction
+    and after every improving sweep.
+    """
+    # An open path is handled as a path to a dummy node that is free to reach
+    # from everywhere, so both local searches can treat the endpoints as fixed.
+    n = len(dist)
+    if end is None:
+        padded = np.zeros((n + 1, n + 1))
+        padded[:n, :n] = dist
+        end = n
+    else:
+        padded = dist
+    d = padded.tolist()
+    path = [0] + _nearest_neighbour(d, stops) + [end]
+    sweep = None if report is None else (lambda p: report(None, p[1:-1]))
+    if sweep is not None:
+        sweep(path)
+    while _two_opt(path, d, sweep) | _or_opt(path, d, sweep):
+        pass
+    return path[1:-1]
+
+def calculate_optimal_route(locations: List[Dict], fixed_end: bool = False,
+                            round_trip: bool = False, distances=STRAIGHT_LINE,
+                            progress: Optional[Callable] = None) -> List[Dict]:
+    """Find the shortest route starting at the first location.
+
+    With `fixed_end` the last location is kept as the final stop; with
+    `round_trip` the route returns to the start, which is repeated at the end.
+    Up to HELD_KARP_MAX_STOPS stops are solved exactly, larger sets use a
+    nearest neighbour + 2-opt/Or-opt heuristic. `distances` is the distance
+    backend (straight line unless e.g. a road_network.RoadDistances is given).
+
+    `progress(fraction, best_route)` is called as the solve advances, with
+    the fraction done (None when unknown) and the best route found so far
+    (None while there is none); an exception it raises aborts the solve.
+    """
+    if fixed_end and round_trip:
+        raise ValueError("fixed_end and round_trip are mutually exclusive")
     if len(locations) <= 2:
-        return locations
-    
-    # First location is fixed as starting point
-    start = locations[0]
-    other_locations = locations[1:]
-    
-    # Try all possible permutations
-    min_distance = float('inf')
-    best_route = None
-    
-    for perm in permutations(other_locations):
-        route = [start] + list(perm)
-        total_distance = 0
-        
-        # Calculate total distance for this route
-        for i in range(len(route)-1):
-            dist = haversine_distance(
-                route[i]['lat'], route[i]['lon'],
-                route[i+1]['lat'], route[i+1]['lon']
-            )
-            total_distance += dist
-            
-        if total_distance < min_distance:
-            min_distance = total_distance
-            best_route = route
-            
-    return best_route
+        route = list(locations)
+        return route + [locations[0]] if round_trip and len(locations) == 2 else route
+
+    dist = _distance_matrix(locations, distances)
+    n = len(locations)
+    if round_trip:
+        end = 0
+    elif fixed_end:
+        end = n - 1
+    else:
+        end = None
+    stops = [i for i in range(1, n) if i != end]
+
+    def route_of(order: List[int]) -> List[Dict]:
+        return [locations[i] for i in [0] + order + ([end] if end is not None else [])]
+
+    report = None if progress is None else (
+        lambda fraction, order: progress(fraction, None if order is None else route_of(order)))
+
+    if len(stops) <= HELD_KARP_MAX_STOPS:
+        order = _held_karp(dist, stops, end, report)
+    else:
+        order = _local_search(dist, stops, end, report)
+    return route_of(order)
+
+# Defaults for plan_schedule: a working week with a full day of visits
+SCHEDULE_DAYS = 5
+SCHEDULE_MAX_STOPS_PER_DAY = 8
+
+def _tour_km(route: List[int], depot: int, dist: List[List[float]]) -> float:
+    """Length of a day's round trip from `depot` through `route`."""
+    return _path_length([depot] + route + [depot], dist) if route else 0.0
+
+def _cheapest_insertion(node: int, route: List[int], depot: int,
+                        dist: List[List[float]]) -> Tuple[float, int]:
+    """(added km, position) of the cheapest place to insert `node` into a round trip."""
+    best, best_pos = float('inf'), 0
+    prev = depot
+    for pos, nxt in enumerate(route + [depot]):
+        delta = dist[prev][node] + dist[node][nxt] - dist[prev][nxt]
+        if delta < best:
+            best, best_pos = delta, pos
+        prev = nxt
+    return best, best_pos
+
+class _Schedule:
+    """Day routes of several reps over one distance matrix, with their constraints."""
+
+    def __init__(self, dist: List[List[float]], depots: List[int], max_stops: int, max_km: float):
+        self.dist = dist
+        self.depots = depots
+        self.max_stops = max_stops
+        self.max_km = max_km
+        self.routes: List[List[int]] = [[] for _ in depots]
+        self.km = [0.0] * len(depots)
+
+    def insertion(self, node: int, r: int) -> Optional[Tuple[float, int]]:
+        """Cheapest feasible insertion of `node` into route `r`, or None."""
+        if len(self.routes[r]) >= self.max_stops:
+            return None
+        delta, pos = _cheapest_insertion(node, self.routes[r], self.depots[r], self.dist)
+        if self.km[r] + delta > self.max_km + 1e-9:
+            return None
+        return delta, pos
+
+    def insert(self, node: int, r: int, pos: int):
+        self.routes[r].insert(pos, node)
+        self.km[r] = _tour_km(self.routes[r], self.depots[r], self.dist)
+
+    def removal_saving(self, r: int, i: int) -> float:
+        route, d = self.routes[r], self.dist
+        prev = route[i - 1] if i > 0 else self.depots[r]
+        nxt = route[i + 1] if i + 1 < len(route) else self.depots[r]
+        return d[prev][route[i]] + d[route[i]][nxt] - d[prev][nxt]
+
+    def remove(self, r: int, i: int) -> int:
+        node = self.routes[r].pop(i)
+        self.km[r] = _tour_km(self.routes[r], self.depots[r], self.dist)
+        return node
+
+def _construct(schedule: _Schedule, stops: List[int], rng: np.random.Generator,
+               noise: float) -> List[int]:
+    """Regret insertion: repeatedly place the stop that loses most by waiting.
+
+    Regret compares the best insertion with the best one at a different rep's
+    base, since a rep's days all start from the same place. `noise` randomly
+    inflates insertion costs to diversify restarts. Returns stops that fit nowhere.
+    """
+    n_routes = len(schedule.routes)
+    factor = {s: 1 + noise * rng.random(n_routes) for s in stops}
+    options = {s: [schedule.insertion(s, r) for r in range(n_routes)] for s in stops}
+    remaining = set(stops)
+    unassigned = []
+    while remaining:
+        best_key, best = None, None
+        for s in sorted(remaining):
+            costs = [(opt[0] * factor[s][r], r, opt[1]) for r, opt in enumerate(options[s]) if opt is not None]
+            if not costs:
+                continue
+            costs.sort()
+            cost, r, pos = costs[0]
+            other = [c for c, r2, _ in costs if schedule.depots[r2] != schedule.depots[r]]
+            regret = other[0] - cost if other else float('inf')
+            key = (regret, -cost)
+            if best_key is None or key > best_key:
+                best_key, best = key, (s, r, pos)
+        if best is None:
+            unassigned.extend(sorted(remaining))
+            break
+        s, r, _ = best
+        remaining.remove(s)
+        # Positions may have shifted since the cost was cached
+        schedule.insert(s, r, _cheapest_insertion(s, schedule.routes[r], schedule.depots[r], schedule.dist)[1])
+        for other_stop in remaining:
+            options[other_stop][r] = schedule.insertion(other_stop, r)
+    return unassigned
+
+def _relocate(schedule: _Schedule) -> bool:
+    """Move one stop to another route if that shortens the total. Returns True on a move."""
+    for a, route in enumerate(schedule.routes):
+        for i in range(len(route)):
+            saving = schedule.removal_saving(a, i)
+            node = route[i]
+            for b in range(len(schedule.routes)):
+                if b == a:
+                    continue
+                opt = schedule.insertion(node, b)
+                if opt is not None and opt[0] < saving - 1e-9:
+                    schedule.remove(a, i)
+                    schedule.insert(node, b, opt[1])
+                    return True
+    return False
+
+def _swap(schedule: _Schedule) -> bool:
+    """Exchange two stops between routes if that shortens the total. Returns True on a swap."""
+    routes, depots, d = schedule.routes, schedule.depots, schedule.dist
+    for a in range(len(routes)):
+        for b in range(a + 1, len(routes)):
+            for i in range(len(routes[a])):
+                for j in range(len(routes[b])):
+                    ra, rb = routes[a][:], routes[b][:]
+                    ra[i], rb[j] = rb[j], ra[i]
+                    km_a, km_b = _tour_km(ra, depots[a], d), _tour_km(rb, depots[b], d)
+                    if (km_a + km_b < schedule.km[a] + schedule.km[b] - 1e-9
+                            and km_a <= schedule.max_km + 1e-9 and km_b <= schedule.max_km + 1e-9):
+                        routes[a], routes[b] = ra, rb
+                        schedule.km[a], schedule.km[b] = km_a, km_b
+                        return True
+    return False
+
+def _improve(schedule: _Schedule, unassigned: List[int]):
+    """Local search: relocate/swap between routes, 2-opt/Or-opt within them."""
+    while True:
+        changed = False
+        while _relocate(schedule) or _swap(schedule):
+            changed = True
+        for r, route in enumerate(schedule.routes):
+            path = [schedule.depots[r]] + route + [schedule.depots[r]]
+            if len(route) > 2 and (_two_opt(path, schedule.dist) | _or_opt(path, schedule.dist)):
+                schedule.routes[r] = path[1:-1]
+                schedule.km[r] = _tour_km(schedule.routes[r], schedule.depots[r], schedule.dist)
+                changed = True
+        # Shorter routes may now have room for stops that did not fit
+        for node in list(unassigned):
+            opts = [(opt, r) for r in range(len(schedule.routes))
+                    if (opt := schedule.insertion(node, r)) is not None]
+            if opts:
+                (_, pos), r = min(opts)
+                schedule.insert(node, r, pos)
+                unassigned.remove(node)
+                changed = True
+        if not changed:
+            return
+
+def _solve_territory(reps: List[Dict], stops: List[Dict], days: int, max_stops_per_day: int,
+                     max_day_km: float, restarts: int, seed: int, distances) -> Dict:
+    """Schedule one territory's stops over its reps; see plan_schedule."""
+    locations = reps + stops
+    dist = _distance_matrix(locations, distances).tolist()
+    depots = [rep for rep in range(len(reps)) for _ in range(days)]
+    stop_nodes = list(range(len(reps), len(locations)))
+    rng = np.random.default_rng(seed)
+
+    best = None
+    for attempt in range(max(restarts, 1)):
+        schedule = _Schedule(dist, depots, max_stops_per_day, max_day_km)
+        unassigned = _construct(schedule, stop_nodes, rng, noise=0.0 if attempt == 0 else 0.3)
+        _improve(schedule, unassigned)
+        score = (len(unassigned), sum(schedule.km))
+        if best is None or score < best[0]:
+            best = (score, schedule, unassigned)
+
+    _, schedule, unassigned = best
+    routes = []
+    for r, route in enumerate(schedule.routes):
+        rep = reps[depots[r]]
+        routes.append({
+            'rep': rep['name'],
+            'day': r % days + 1,
+            'stops': [rep] + [locations[i] for i in route] + [rep] if route else [],
+            'km': schedule.km[r],
+        })
+    return {'routes': routes, 'unassigned': [locations[i] for i in unassigned]}
+
+def plan_schedule(stops: List[Dict], reps: List[Dict], days: int = SCHEDULE_DAYS,
+                  max_stops_per_day: int = SCHEDULE_MAX_STOPS_PER_DAY,
+                  max_day_km: Optional[float] = None, restarts: int = 4, seed: int = 0,
+                  workers: Optional[int] = None, distances=STRAIGHT_LINE) -> Dict:
+    """Plan several days of visits for several reps (a capacitated, distance-limited VRP).
+
+    `stops` and `reps` are location dicts ({'name', 'lat', 'lon'}); a rep's
+    location is the home base every day's round trip starts and ends at.
+    Each day visits at most `max_stops_per_day` stops and drives at most
+    `max_day_km`. When every rep has a 'territory' key, each territory's
+    stops are scheduled separately over its own reps, in a process pool of
+    `workers` processes; stops of a territory without reps stay unassigned.
+
+    Routes are built by regret insertion and improved by relocate/swap moves
+    between routes and 2-opt/Or-opt within them, keeping the best of
+    `restarts` randomized constructions; the same `seed` gives the same plan.
+    Returns {'routes': [{'rep', 'day', 'stops', 'km'}], 'unassigned': [...],
+    'total_km': float}, where each route's stops begin and end at the rep's base.
+    Distances come from the `distances` backend, which must be picklable.
+    """
+    if days < 1 or max_stops_per_day < 1:
+        raise ValueError("days and max_stops_per_day must be at least 1")
+    max_day_km = float('inf') if max_day_km is None else max_day_km
+
+    # Split by territory only when every rep has one
+    by_territory = bool(reps) and all('territory' in rep for rep in reps)
+    territories: Dict[object, Tuple[List[Dict], List[Dict]]] = {}
+    for rep in reps:
+        territories.setdefault(rep.get('territory') if by_territory else None, ([], []))[0].append(rep)
+    unassigned = []
+    for stop in stops:
+        key = stop.get('territory') if by_territory else None
+        if key not in territories:
+            unassigned.append(stop)
+        else:
+            territories[key][1].append(stop)
+
+    jobs = [(t_reps, t_stops, days, max_stops_per_day, max_day_km, restarts, seed, distances)
+            for t_reps, t_stops in territories.values() if t_stops]
+    if len(jobs) > 1 and workers != 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_solve_territory, *zip(*jobs)))
+    else:
+        results = [_solve_territory(*job) for job in jobs]
+
+    routes = [route for result in results for route in result['routes']]
+    unassigned += [stop for result in results for stop in result['unassigned']]
+    return {'routes': routes, 'unassigned': unassigned, 'total_km': sum(route['km'] for route in routes)}
 
 def create_route_cards():
     """Create route cards for selected locations."""
@@ -70,15 +516,17 @@ def create_route_cards():
 
 def update_route_card(customer_data: Dict) -> bool:
     """Add customer data to the next available route card."""
-    for i in range(8):
-        if not st.session_state.route_cards[i]:
-            st.session_state.route_cards[i] = customer_data
+    cards = st.session_state.setdefault('route_cards', [])
+    for i, card in enumerate(cards):
+        if not card:
+            cards[i] = customer_data
             return True
-    return False
+    cards.append(customer_data)
+    return True
 
 def clear_route_cards():
     """Clear all route cards."""
-    st.session_state.route_cards = [None] * 8
+    st.session_state.route_cards = []
 
 def get_active_route() -> List[Dict]:
     """Get list of locations that are currently in route cards."""
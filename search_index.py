@@ -0,0 +1,155 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# Text fields searched by the customer search box
+SEARCH_COLUMNS = ['Name', 'Corrected_Address', 'City', 'Cust. ID']
+
+# Trigram alphabet after normalization: space, a-z, 0-9
+_ALPHABET = 37
+_SYMBOLS = np.zeros(256, dtype=np.int32)
+_SYMBOLS[np.frombuffer(b'abcdefghijklmnopqrstuvwxyz0123456789', dtype=np.uint8)] = np.arange(1, _ALPHABET)
+
+# A row needs at least this share of the query's trigrams to count as a fuzzy match
+MIN_TRIGRAM_SHARE = 0.5
+
+
+def _normalize(values: pd.Series) -> pd.Series:
+    """Lower-case ASCII words separated by single spaces, with a leading space."""
+    text = values.astype('string[pyarrow]').fillna('').str.lower()
+    return ' ' + text.str.replace(r'[^a-z0-9]+', ' ', regex=True).str.strip()
+
+
+def _trigram_codes(text: np.ndarray) -> np.ndarray:
+    symbols = _SYMBOLS[text]
+    return (symbols[:-2] * _ALPHABET + symbols[1:-1]) * _ALPHABET + symbols[2:]
+
+
+class _Postings:
+    """Row positions per trigram code for a column of normalized documents."""
+
+    def __init__(self, documents: pd.Series):
+        documents = documents.to_numpy(dtype=object)
+        lengths = np.fromiter((len(d) for d in documents), dtype=np.int64, count=len(documents))
+        text = np.frombuffer(''.join(documents).encode('ascii'), dtype=np.uint8)
+        row = np.repeat(np.arange(len(documents), dtype=np.int32), lengths)
+        same_row = row[:-2] == row[2:]
+        codes = _trigram_codes(text)[same_row].astype(np.uint16)
+        row = row[:-2][same_row]
+        # Rows are already ascending, so a stable (radix) sort on the 16-bit
+        # codes orders the pairs by (code, row); repeats are then adjacent
+        order = np.argsort(codes, kind='stable')
+        codes, row = codes[order], row[order]
+        first = np.ones(len(codes), dtype=bool)
+        first[1:] = (codes[1:] != codes[:-1]) | (row[1:] != row[:-1])
+        self.rows = row[first]
+        self.bounds = np.searchsorted(codes[first], np.arange(_ALPHABET ** 3 + 1))
+
+    def share(self, codes: np.ndarray, n_rows: int) -> np.ndarray:
+        """Per row, the fraction of `codes` its document contains."""
+        postings = [self.rows[self.bounds[c]:self.bounds[c + 1]] for c in codes]
+        return np.bincount(np.concatenate(postings), minlength=n_rows) / len(codes)
+
+
+class SearchIndex:
+    """Prefix and trigram index over the customer search fields.
+
+    Every row's search fields are joined into one normalized document whose
+    distinct trigrams are kept as posting lists of row positions. Names and
+    IDs are also kept sorted for prefix lookups, and a name -> row positions
+    map serves exact lookups.
+    """
+
+    def __init__(self, df: pd.DataFrame, columns: Iterable[str] = SEARCH_COLUMNS):
+        self.n_rows = len(df)
+        columns = [col for col in columns if col in df.columns]
+        names = df['Name'].astype(object).to_numpy()
+        self.name_rows: Dict[str, np.ndarray] = pd.Series(np.arange(self.n_rows)).groupby(names).indices
+        self._names = names
+        # Alphabetical order of the named rows, for browsing without a query
+        named = np.flatnonzero(pd.notna(names))
+        self._alphabetical = named[np.argsort(names[named].astype(str), kind='stable')]
+
+        # Sorted normalized names and IDs for prefix matches
+        normalized_name = _normalize(df['Name']).str.slice(1)
+        self._prefix_keys = []
+        for col in ('Name', 'Cust. ID'):
+            if col in df.columns:
+                keys = (normalized_name if col == 'Name' else _normalize(df[col]).str.slice(1)).to_numpy(dtype=object)
+                order = np.argsort(keys, kind='stable')
+                self._prefix_keys.append((keys[order], order))
+
+        # Trigram postings over the name alone and over all search fields
+        documents = ' ' + normalized_name
+        self._name_trigrams = _Postings(documents)
+        for col in columns:
+            if col != 'Name':
+                documents = documents + _normalize(df[col])
+        self._trigrams = _Postings(documents)
+
+    def rows_for_name(self, name: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """Sorted positions of rows named exactly `name`, optionally only among `rows`."""
+        matched = self.name_rows.get(name, np.empty(0, dtype=np.int64))
+        if rows is not None and len(rows) < self.n_rows:
+            matched = np.intersect1d(matched, rows, assume_unique=True)
+        return matched
+
+    def _allowed(self, rows: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        if rows is None or len(rows) == self.n_rows:
+            return None
+        allowed = np.zeros(self.n_rows, dtype=bool)
+        allowed[rows] = True
+        return allowed
+
+    def search(self, query: str, rows: Optional[np.ndarray] = None, limit: int = 50) -> np.ndarray:
+        """Row positions best matching `query`, best first, optionally only among `rows`.
+
+        Name or ID prefix matches rank first, then rows by the share of the
+        query's trigrams found in their name and in all their search fields.
+        """
+        allowed = self._allowed(rows)
+        normalized = _normalize(pd.Series([query])).iloc[0]
+        prefix = normalized[1:]
+        if not prefix:
+            return np.empty(0, dtype=np.int64)
+
+        score = np.zeros(self.n_rows, dtype=np.float32)
+        for keys, order in self._prefix_keys:
+            lo, hi = np.searchsorted(keys, [prefix, prefix + '~'])
+            score[order[lo:hi]] = 2.0
+
+        codes = np.unique(_trigram_codes(np.frombuffer(normalized.encode('ascii'), dtype=np.uint8)))
+        if len(codes):
+            # Matches in the name count double those elsewhere
+            share = self._trigrams.share(codes, self.n_rows)
+            name_share = self._name_trigrams.share(codes, self.n_rows)
+            score += np.where(share >= MIN_TRIGRAM_SHARE, (share + name_share) / 2, 0).astype(np.float32)
+
+        if allowed is not None:
+            score[~allowed] = 0
+        candidates = np.flatnonzero(score)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-score[candidates], limit - 1)[:limit]]
+        # Best score first; ties in name order
+        return candidates[np.lexsort((self._names[candidates].astype(str), -score[candidates]))]
+
+    def names(self, positions: np.ndarray) -> List[str]:
+        """Distinct names of the rows at `positions`, in that order; rows without a name are skipped."""
+        names = self._names[positions]
+        return list(dict.fromkeys(names[pd.notna(names)].tolist()))
+
+    def browse(self, rows: Optional[np.ndarray] = None, limit: Optional[int] = None) -> List[str]:
+        """Distinct names in alphabetical order, optionally only among `rows` and only the first `limit`."""
+        allowed = self._allowed(rows)
+        order = self._alphabetical if allowed is None else self._alphabetical[allowed[self._alphabetical]]
+        # Repeated names are adjacent; look at a growing prefix until it holds `limit` distinct ones
+        size = len(order) if limit is None else limit
+        while True:
+            names = self._names[order[:size]]
+            distinct = np.ones(len(names), dtype=bool)
+            distinct[1:] = names[1:] != names[:-1]
+            names = names[distinct]
+            if limit is None or len(names) >= limit or size >= len(order):
+                return names[:limit].tolist()
+            size *= 2
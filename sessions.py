@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from database import get_pool, init_db
+
+# How long a login stays valid without entering the password again
+SESSION_TTL_SECONDS = 12 * 60 * 60
+
+# Browser cookie holding the token, so a page reload stays logged in
+SESSION_COOKIE = 'customermap_session'
+
+# How long a validated token is trusted from memory before the database is
+# checked again, which bounds how late a revocation from another process lands
+CACHE_TTL_SECONDS = 300
+
+# Expired and revoked sessions are purged from the table and the cache at most
+# this often, from whichever create_session or uncached validate comes next
+PURGE_INTERVAL_SECONDS = 60 * 60
+
+_cache: Dict[str, Tuple[dict, float]] = {}
+_secrets: Dict[str, bytes] = {}
+_last_purge: Dict[str, float] = {}
+_lock = threading.Lock()
+
+
+def _secret(path: Optional[str] = None) -> bytes:
+    """Signing key: CUSTOMERMAP_SESSION_SECRET, else one generated once and kept in the database."""
+    env = os.environ.get('CUSTOMERMAP_SESSION_SECRET')
+    if env:
+        return env.encode()
+    key = path or ''
+    if key not in _secrets:
+        init_db(path)
+        with get_pool(path).connection() as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO settings (key, value) VALUES ('session_secret', ?)",
+                         (secrets.token_hex(32),))
+            value = conn.execute("SELECT value FROM settings WHERE key = 'session_secret'").fetchone()[0]
+        _secrets[key] = value.encode()
+    return _secrets[key]
+
+
+def _sign(token_id: str, path: Optional[str] = None) -> str:
+    digest = hmac.new(_secret(path), token_id.encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest[:18]).decode()
+
+
+def _purge_if_due(path: Optional[str] = None):
+    now = time.time()
+    key = path or ''
+    with _lock:
+        if now - _last_purge.get(key, 0.0) < PURGE_INTERVAL_SECONDS:
+            return
+        _last_purge[key] = now
+    purge_expired(path)
+
+
+def create_session(user: dict, ttl: float = SESSION_TTL_SECONDS, path: Optional[str] = None) -> str:
+    """Start a session for a verified user and return its signed token."""
+    _purge_if_due(path)
+    token_id = secrets.token_urlsafe(18)
+    now = time.time()
+    init_db(path)
+    with get_pool(path).connection() as conn, conn:
+        conn.execute('INSERT INTO sessions (token_id, user_id, created_at, expires_at) VALUES (?, ?, ?, ?)',
+                     (token_id, user['id'], now, now + ttl))
+    token = f"{token_id}.{_sign(token_id, path)}"
+    with _lock:
+        _cache[token] = (user, min(now + ttl, now + CACHE_TTL_SECONDS))
+    return token
+
+
+def validate(token: Optional[str], path: Optional[str] = None) -> Optional[dict]:
+    """The user a token belongs to, or None if it is forged, expired or revoked."""
+    if not token:
+        return None
+    entry = _cache.get(token)
+    if entry is not None and entry[1] > time.time():
+        return entry[0]
+
+    token_id, _, signature = token.partition('.')
+    if not hmac.compare_digest(signature, _sign(token_id, path)):
+        return None
+    init_db(path)
+    _purge_if_due(path)
+    with get_pool(path).connection() as conn:
+        row = conn.execute('SELECT u.id, u.username, u.is_admin, s.expires_at, s.revoked '
+                           'FROM sessions s JOIN users u ON u.id = s.user_id WHERE s.token_id = ?',
+                           (token_id,)).fetchone()
+    now = time.time()
+    with _lock:
+        if row is None or row[4] or row[3] <= now:
+            _cache.pop(token, None)
+            return None
+        user = {'id': row[0], 'username': row[1], 'is_admin': row[2]}
+        _cache[token] = (user, min(row[3], now + CACHE_TTL_SECONDS))
+    return user
+
+
+def revoke(token: str, path: Optional[str] = None):
+    """End one session, e.g. on logout."""
+    token_id = token.partition('.')[0]
+    with get_pool(path).connection() as conn, conn:
+        conn.execute('UPDATE sessions SET revoked = 1 WHERE token_id = ?', (token_id,))
+    with _lock:
+        _cache.pop(token, None)
+
+
+def revoke_user(username: str, path: Optional[str] = None) -> int:
+    """End every active session of a user; returns how many were revoked."""
+    init_db(path)
+    with get_pool(path).connection() as conn, conn:
+        revoked = conn.execute('UPDATE sessions SET revoked = 1 WHERE revoked = 0 AND expires_at > ? AND user_id IN '
+                               '(SELECT id FROM users WHERE username = ?)', (time.time(), username)).rowcount
+    with _lock:
+        for token in [t for t, (user, _) in _cache.items() if user['username'] == username]:
+            del _cache[token]
+    return revoked
+
+
+def active_sessions(path: Optional[str] = None) -> List[dict]:
+    """Unrevoked, unexpired sessions, newest first."""
+    init_db(path)
+    with get_pool(path).connection() as conn:
+        rows = conn.execute('SELECT u.username, s.created_at, s.expires_at FROM sessions s '
+                            'JOIN users u ON u.id = s.user_id WHERE s.revoked = 0 AND s.expires_at > ? '
+                            'ORDER BY s.created_at DESC', (time.time(),)).fetchall()
+    return [{'username': r[0], 'created_at': r[1], 'expires_at': r[2]} for r in rows]
+
+
+def purge_expired(path: Optional[str] = None) -> int:
+    """Delete expired and revoked sessions from the database and the cache."""
+    now = time.time()
+    init_db(path)
+    with get_pool(path).connection() as conn, conn:
+        deleted = conn.execute('DELETE FROM sessions WHERE revoked = 1 OR expires_at <= ?', (now,)).rowcount
+    with _lock:
+        for token in [t for t, (_, until) in _cache.items() if until <= now]:
+            del _cache[token]
+    return deleted
@@ -0,0 +1,163 @@
+from typing import List, Tuple
+
+import numpy as np
+
+from route_planner import EARTH_RADIUS_KM, distances_between, distances_from
+
+# Kilometres per degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = EARTH_RADIUS_KM * np.pi / 180
+HALF_CIRCUMFERENCE_KM = EARTH_RADIUS_KM * np.pi
+
+# Largest query-by-candidate distance block within_any computes at once
+MAX_BLOCK_ENTRIES = 1 << 20
+
+
+def wrap_lon(lon: float) -> float:
+    return lon if -180 <= lon <= 180 else (lon + 180) % 360 - 180
+
+
+class SpatialIndex:
+    """Fixed lat/lon grid over a set of points for box, radius and k-nearest queries.
+
+    Points are sorted by grid cell once at build time. A query only looks at
+    the cells overlapping the bounding box of its search circle (one binary
+    search per grid row) and checks those candidates with the exact Haversine
+    distance. Results are positions into the `lats`/`lons` arrays given at
+    build time, nearest first.
+    """
+
+    def __init__(self, lats, lons, cell_deg: float = 0.5):
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_deg = cell_deg
+        self.n_rows = int(np.ceil(180 / cell_deg)) + 1
+        self.n_cols = int(np.ceil(360 / cell_deg))
+        cells = self._cell_ids(self.lats, self.lons)
+        self.order = np.argsort(cells, kind='stable')
+        self.sorted_cells = cells[self.order]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def _rows(self, lats):
+        return np.floor((np.asarray(lats) + 90) / self.cell_deg).astype(np.int64)
+
+    def _cols(self, lons):
+        return np.floor((np.asarray(lons) + 180) / self.cell_deg).astype(np.int64) % self.n_cols
+
+    def _cell_ids(self, lats, lons):
+        return self._rows(lats) * self.n_cols + self._cols(lons)
+
+    def _col_ranges(self, lat: float, lon: float, radius_km: float) -> List[Tuple[int, int]]:
+        """Inclusive column ranges covering the search circle, split at the antimeridian."""
+        dlat = radius_km / KM_PER_DEGREE
+        widest = max(abs(lat - dlat), abs(lat + dlat))
+        if widest >= 89.9:
+            return [(0, self.n_cols - 1)]
+        dlon = radius_km / (KM_PER_DEGREE * np.cos(np.radians(widest)))
+        if dlon >= 180:
+            return [(0, self.n_cols - 1)]
+        first = int(np.floor((lon - dlon + 180) / self.cell_deg))
+        last = int(np.floor((lon + dlon + 180) / self.cell_deg))
+        if first < 0:
+            return [(first % self.n_cols, self.n_cols - 1), (0, last)]
+        if last >= self.n_cols:
+            return [(first, self.n_cols - 1), (0, last % self.n_cols)]
+        return [(first, last)]
+
+    def _candidates(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Positions of every point in the grid cells overlapping the search circle."""
+        dlat = radius_km / KM_PER_DEGREE
+        rows = np.arange(max(self._rows(lat - dlat), 0), min(self._rows(lat + dlat), self.n_rows - 1) + 1)
+        chunks = []
+        for first, last in self._col_ranges(lat, lon, radius_km):
+            starts = np.searchsorted(self.sorted_cells, rows * self.n_cols + first, side='left')
+            ends = np.searchsorted(self.sorted_cells, rows * self.n_cols + last, side='right')
+            chunks.extend(self.order[s:e] for s, e in zip(starts, ends) if e > s)
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def in_box(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Positions of all points inside a lat/lon box, in grid-cell order.
+
+        Longitudes may run past +-180 as Leaflet reports them after panning
+        across the antimeridian; a box `west` > `east` wraps around it.
+        """
+        rows = np.arange(max(self._rows(south), 0), min(self._rows(north), self.n_rows - 1) + 1)
+        if east - west >= 360:
+            col_ranges = [(0, self.n_cols - 1)]
+            west, east = -180.0, 180.0
+        else:
+            west, east = wrap_lon(west), wrap_lon(east)
+            first, last = int(self._cols(west)), int(self._cols(east))
+            col_ranges = [(first, last)] if first <= last else [(first, self.n_cols - 1), (0, last)]
+        chunks = []
+        for first, last in col_ranges:
+            starts = np.searchsorted(self.sorted_cells, rows * self.n_cols + first, side='left')
+            ends = np.searchsorted(self.sorted_cells, rows * self.n_cols + last, side='right')
+            chunks.extend(self.order[s:e] for s, e in zip(starts, ends) if e > s)
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        ids = np.concatenate(chunks)
+        lats, lons = self.lats[ids], self.lons[ids]
+        inside = (lats >= south) & (lats <= north)
+        inside &= ((lons >= west) & (lons <= east)) if west <= east else ((lons >= west) | (lons <= east))
+        return ids[inside]
+
+    def within(self, lat: float, lon: float, radius_km: float) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, distances in km) of all points within `radius_km`, nearest first."""
+        ids = self._candidates(lat, lon, radius_km)
+        dists = distances_from((lat, lon), self.lats[ids], self.lons[ids])
+        keep = dists <= radius_km
+        ids, dists = ids[keep], dists[keep]
+        ranked = np.argsort(dists, kind='stable')
+        return ids[ranked], dists[ranked]
+
+    def nearest(self, lat: float, lon: float, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, distances in km) of the `k` nearest points, nearest first."""
+        k = min(k, len(self))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        # Everything within r is found exactly, so once k points lie inside r
+        # the k closest of them are the global k nearest.
+        radius = self.cell_deg * KM_PER_DEGREE
+        while True:
+            ids, dists = self.within(lat, lon, radius)
+            if len(ids) >= k or radius >= HALF_CIRCUMFERENCE_KM:
+                return ids[:k], dists[:k]
+            radius *= 2
+
+    def within_any(self, lats, lons, radius_km: float) -> np.ndarray:
+        """Sorted positions of points within `radius_km` of any of the query points.
+
+        Small problems are checked as one block of distances. Otherwise query
+        points are grouped by grid cell, and each group looks up candidates
+        once, around its centre, and checks the candidates not already found
+        against all of its points in one distance block.
+        """
+        lats = np.asarray(lats, dtype=np.float64)
+        lons = np.asarray(lons, dtype=np.float64)
+        if len(self) * len(lats) <= MAX_BLOCK_ENTRIES:
+            # Small enough to check every pair at once
+            near = (distances_between(self.lats, self.lons, lats, lons) <= radius_km).any(axis=1)
+            return np.flatnonzero(near)
+        hits = np.zeros(len(self), dtype=bool)
+        cells = self._cell_ids(lats, lons)
+        order = np.argsort(cells, kind='stable')
+        cells = cells[order]
+        for group in np.split(order, np.flatnonzero(cells[1:] != cells[:-1]) + 1):
+            group_lats, group_lons = lats[group], lons[group]
+            lat = (group_lats.min() + group_lats.max()) / 2
+            lon = (group_lons.min() + group_lons.max()) / 2
+            spread = distances_from((lat, lon), group_lats, group_lons).max()
+            ids = self._candidates(lat, lon, radius_km + spread)
+            ids = ids[~hits[ids]]
+            step = max(1, MAX_BLOCK_ENTRIES // max(len(ids), 1))
+            for start in range(0, len(group), step):
+                if not len(ids):
+                    break
+                dists = distances_between(group_lats[start:start + step], group_lons[start:start + step],
+                                          self.lats[ids], self.lons[ids])
+                near = (dists <= radius_km).any(axis=0)
+                hits[ids[near]] = True
+                ids = ids[~near]
+        return np.flatnonzero(hits)
@@ -0,0 +1,168 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import wrap_lon
+from utils import SPEND_COLUMNS
+
+# Grid levels are Web Mercator tiles: level L splits the world into 2**L x 2**L cells
+MAX_LEVEL = 12
+
+# Map zoom z uses level z + 2, i.e. cells about 64 screen pixels wide
+ZOOM_LEVEL_OFFSET = 2
+
+# Web Mercator stops short of the poles
+MAX_LATITUDE = 85.0511287798
+
+
+def tile_xy(lats: np.ndarray, lons: np.ndarray, level: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Tile column and row of each point at `level`."""
+    n = 1 << level
+    lat = np.radians(np.clip(lats, -MAX_LATITUDE, MAX_LATITUDE))
+    x = np.floor((np.asarray(lons) + 180) / 360 * n).astype(np.int64)
+    y = np.floor((1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * n).astype(np.int64)
+    return np.clip(x, 0, n - 1), np.clip(y, 0, n - 1)
+
+
+def _tile_lat(y: np.ndarray, level: int) -> np.ndarray:
+    return np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * y / (1 << level)))))
+
+
+def _aggregate(keys: np.ndarray, values: np.ndarray, counts: np.ndarray):
+    """(distinct keys, summed values, summed counts) of rows grouped by `keys`."""
+    uniq, inverse = np.unique(keys, return_inverse=True)
+    sums = np.column_stack([np.bincount(inverse, values[:, j], minlength=len(uniq))
+                            for j in range(values.shape[1])])
+    return uniq, sums, np.bincount(inverse, counts, minlength=len(uniq)).astype(np.int64)
+
+
+class SpendGrid:
+    """Spend summed per grid cell at every level, overall and per territory.
+
+    Built once per data source: rows are aggregated into level MAX_LEVEL
+    cells, and each coarser level is aggregated from the one below it, so
+    only the finest level touches every row. A cell holds its customer
+    count, the SPEND_COLUMNS sums and the sum of coordinates (for the mean
+    position). Cell codes are x * 2**level + y; territory-cell codes put
+    the territory above that, as territory * 4**level + cell.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.n_rows = len(df)
+        lats = df['Latitude'].to_numpy(dtype=np.float64)
+        lons = df['Longitude'].to_numpy(dtype=np.float64)
+        located = ~(np.isnan(lats) | np.isnan(lons))
+        self.located = np.flatnonzero(located)
+        codes, self.territories = pd.factorize(df['Territory'])
+        # Territory 0 stands for a missing territory
+        self._row_territory = (codes + 1)[located].astype(np.int64)
+        self._row_values = np.column_stack(
+            [np.nan_to_num(df[col].to_numpy(dtype=np.float64)[located]) for col in SPEND_COLUMNS]
+            + [lats[located], lons[located]])
+        x, y = tile_xy(lats[located], lons[located], MAX_LEVEL)
+        self._row_cells = x * (1 << MAX_LEVEL) + y
+
+        ones = np.ones(len(self._row_cells), dtype=np.int64)
+        cells = _aggregate(self._row_cells, self._row_values, ones)
+        by_territory = _aggregate(self._row_territory * (1 << 2 * MAX_LEVEL) + self._row_cells,
+                                  self._row_values, ones)
+        self.levels = [None] * (MAX_LEVEL + 1)
+        self.territory_levels = [None] * (MAX_LEVEL + 1)
+        for level in range(MAX_LEVEL, -1, -1):
+            if level < MAX_LEVEL:
+                cells = _aggregate(self._parent(cells[0], level + 1), cells[1], cells[2])
+                territory, cell = np.divmod(by_territory[0], 1 << 2 * (level + 1))
+                by_territory = _aggregate(territory * (1 << 2 * level) + self._parent(cell, level + 1),
+                                          by_territory[1], by_territory[2])
+            self.levels[level] = cells
+            self.territory_levels[level] = by_territory
+
+    @staticmethod
+    def _parent(codes: np.ndarray, level: int) -> np.ndarray:
+        x, y = np.divmod(codes, 1 << level)
+        return (x >> 1) * (1 << (level - 1)) + (y >> 1)
+
+    @staticmethod
+    def level_for_zoom(zoom: int) -> int:
+        return int(np.clip(zoom + ZOOM_LEVEL_OFFSET, 0, MAX_LEVEL))
+
+    def rollup(self, level: int, bounds: Optional[Tuple[float, float, float, float]] = None,
+               territories: Optional[List[str]] = None, rows: Optional[np.ndarray] = None,
+               by_territory: bool = False) -> pd.DataFrame:
+        """Customer count and spend per cell at `level`, one row per occupied cell.
+
+        `bounds` (south, west, north, east) keeps the cells overlapping that
+        box; `territories` keeps those territories' customers. `rows`
+        (positions into the frame the grid was built from, e.g. the filtered
+        rows) aggregates just those rows on the fly instead of reading the
+        precomputed cells. With `by_territory` there is one row per
+        territory and cell, with a 'Territory' column.
+
+        Columns: south, west, north, east (cell bounds), lat, lon (mean
+        customer position), count and the SPEND_COLUMNS.
+        """
+        keyed = by_territory or territories is not None
+        shift = 1 << 2 * level
+        if rows is not None:
+            picked = np.zeros(self.n_rows, dtype=bool)
+            picked[rows] = True
+            picked = picked[self.located]
+            cells = self._coarsen(self._row_cells[picked], level)
+            keys = self._row_territory[picked] * shift + cells if keyed else cells
+            codes, sums, counts = _aggregate(keys, self._row_values[picked], np.ones(len(keys), dtype=np.int64))
+        else:
+            codes, sums, counts = (self.territory_levels if keyed else self.levels)[level]
+
+        territory, cells = np.divmod(codes, shift) if keyed else (None, codes)
+        mask = np.ones(len(codes), dtype=bool)
+        if territories is not None:
+            mask &= np.isin(territory, self.territories.get_indexer(list(territories)) + 1)
+        x, y = np.divmod(cells, 1 << level)
+        if bounds is not None:
+            mask &= self._in_bounds(x, y, level, bounds)
+
+        if keyed and not by_territory:
+            # Territories were only needed for filtering; merge them per cell
+            cells, sums, counts = _aggregate(cells[mask], sums[mask], counts[mask])
+            x, y = np.divmod(cells, 1 << level)
+            return self._frame(x, y, level, sums, counts)
+        frame = self._frame(x[mask], y[mask], level, sums[mask], counts[mask])
+        if by_territory:
+            names = np.array([None] + list(self.territories), dtype=object)
+            frame.insert(0, 'Territory', names[territory[mask]])
+        return frame
+
+    @staticmethod
+    def _coarsen(codes: np.ndarray, level: int) -> np.ndarray:
+        """MAX_LEVEL cell codes turned into the codes of their cells at `level`."""
+        x, y = np.divmod(codes, 1 << MAX_LEVEL)
+        up = MAX_LEVEL - level
+        return (x >> up) * (1 << level) + (y >> up)
+
+    @staticmethod
+    def _in_bounds(x: np.ndarray, y: np.ndarray, level: int, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        """Which cells overlap the (south, west, north, east) box."""
+        south, west, north, east = bounds
+        _, (top, bottom) = tile_xy(np.array([north, south]), np.zeros(2), level)
+        inside = (y >= top) & (y <= bottom)
+        if east - west >= 360:
+            return inside
+        (first, last), _ = tile_xy(np.zeros(2), np.array([wrap_lon(west), wrap_lon(east)]), level)
+        return inside & (((x >= first) & (x <= last)) if first <= last else ((x >= first) | (x <= last)))
+
+    @staticmethod
+    def _frame(x: np.ndarray, y: np.ndarray, level: int, sums: np.ndarray, counts: np.ndarray) -> pd.DataFrame:
+        n = 1 << level
+        frame = pd.DataFrame({
+            'south': _tile_lat(y + 1, level),
+            'west': x / n * 360 - 180,
+            'north': _tile_lat(y, level),
+            'east': (x + 1) / n * 360 - 180,
+            'lat': sums[:, len(SPEND_COLUMNS)] / np.maximum(counts, 1),
+            'lon': sums[:, len(SPEND_COLUMNS) + 1] / np.maximum(counts, 1),
+            'count': counts,
+        })
+        for j, col in enumerate(SPEND_COLUMNS):
+            frame[col] = sums[:, j]
+        return frame
@@ -0,0 +1,38 @@
+"""The sidebar's filter cascade, through pandas masks and through FilterIndex.
+
+Used by tests/test_filter_index.py and timed by benchmarks/filter_index.py.
+"""
+import itertools
+
+
+def mask_cascade(df, states, territory, rep):
+    """The sidebar's previous copy-and-mask filtering, returning (frame, options)."""
+    filtered = df.copy()
+    if states:
+        filtered = filtered[filtered['State/Prov'].isin(states)]
+    territories = sorted(filtered['Territory'].dropna().unique().tolist())
+    if territory != "All":
+        filtered = filtered[filtered['Territory'] == territory]
+    reps = sorted(filtered['Sales Rep'].dropna().unique().tolist())
+    if rep != "All":
+        filtered = filtered[filtered['Sales Rep'] == rep]
+    return filtered, territories, reps
+
+
+def index_cascade(index, df, states, territory, rep):
+    selections = {'State/Prov': states}
+    territories = index.options('Territory', selections)
+    selections['Territory'] = territory
+    reps = index.options('Sales Rep', selections)
+    selections['Sales Rep'] = rep
+    return df.iloc[index.rows(selections)], territories, reps
+
+
+def combinations(df, index):
+    states = index.options('State/Prov')
+    for state_set in itertools.chain([[]], ([s] for s in states), itertools.combinations(states[:6], 2)):
+        state_set = list(state_set)
+        for territory in ["All"] + index.options('Territory', {'State/Prov': state_set}):
+            sel = {'State/Prov': state_set, 'Territory': territory}
+            for rep in ["All"] + index.options('Sales Rep', sel):
+                yield state_set, territory, rep
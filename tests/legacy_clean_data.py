@@ -0,0 +1,45 @@
+"""utils.clean_data as it was before vectorization, kept as the reference output.
+
+Used by tests/test_clean_data.py and timed against by benchmarks/clean_data.py.
+"""
+import pandas as pd
+
+from utils import SPEND_COLUMNS, clean_phone_number, spend_tier
+
+_LEGACY_MAPPING = {
+    'lat': 'Latitude', 'latitude': 'Latitude', 'lon': 'Longitude', 'longitude': 'Longitude',
+    'phone': 'Phone', 'territory': 'Territory', 'sales_rep': 'Sales Rep', 'prodcode': 'ProdCode',
+    'state': 'State/Prov', 'state/prov': 'State/Prov', 'stateprov': 'State/Prov',
+    'state/province': 'State/Prov', 'name': 'Name', 'company name': 'Name',
+    'customer name': 'Name', '3-year spend': '3-year Spend', '3 year spend': '3-year Spend',
+    'three year spend': '3-year Spend',
+}
+
+
+def _legacy_parse_currency(values):
+    cleaned = values.astype(str).str.replace(r'[^\d.-]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').astype('float64')
+
+
+def legacy_clean_data(df):
+    """clean_data as it was before vectorization, kept as the reference output."""
+    for col in df.columns:
+        lower_col = col.lower()
+        for old_col, new_col in _LEGACY_MAPPING.items():
+            if lower_col == old_col:
+                df = df.rename(columns={col: new_col})
+    df = df[df['Latitude'].notna() & df['Longitude'].notna()].copy()
+    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
+    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
+    df = df.dropna(subset=['Latitude', 'Longitude'])
+    if 'Phone' in df.columns:
+        df['Phone'] = df['Phone'].astype(str).apply(clean_phone_number)
+    for col in ['Territory', 'Sales Rep', 'State/Prov', 'ProdCode']:
+        if col not in df.columns:
+            df[col] = ''
+    for col in SPEND_COLUMNS:
+        if col in df.columns:
+            df[col] = _legacy_parse_currency(df[col])
+    if '3-year Spend' in df.columns:
+        df['Spend Tier'] = spend_tier(df['3-year Spend'])
+    return df
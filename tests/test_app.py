@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import numpy as np
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import database
+import profiling
+import search_index
+import sessions
+
+MAIN = str(Path(__file__).parent.parent / 'main.py')
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """main.py logged in, on a scratch user database."""
+    path = str(tmp_path / 'users.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(profiling, 'LOG_PATH', tmp_path / 'profile.jsonl')
+    database.register_user('rep@buntingmagnetics.com', 'pw')
+    app = AppTest.from_file(MAIN, default_timeout=300)
+    app.session_state['session_token'] = sessions.create_session(database.verify_user('rep@buntingmagnetics.com', 'pw'))
+    yield app
+    database.get_pool(path).close()
+
+
+def test_searched_name_matching_no_filtered_customer_shows_the_filtered_map(app, monkeypatch):
+    app.run()
+    search = next(s for s in app.selectbox if s.label == "Select customer:")
+    name = search.options[1]
+    # The name stays selected but no longer matches, as after a filter change
+    monkeypatch.setattr(search_index.SearchIndex, 'rows_for_name', lambda self, name, rows=None: np.empty(0, int))
+    search.select(name).run()
+    assert not app.exception and not app.error, [e.value for e in app.error]
+    # Again from the cached map
+    app.run()
+    assert not app.exception and not app.error, [e.value for e in app.error]
+    assert not any(e.label == name for e in app.expander)
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from tests.legacy_clean_data import legacy_clean_data
+from utils import clean_data
+
+REPO = Path(__file__).parent.parent
+
+SOURCES = ['attached_assets/BMC.csv', 'attached_assets/MAI.csv', 'attached_assets/prospectlist.csv']
+
+
+@pytest.mark.parametrize('path', SOURCES)
+def test_matches_row_by_row_implementation(path):
+    raw = pd.read_csv(REPO / path)
+    pd.testing.assert_frame_equal(clean_data(raw.copy()), legacy_clean_data(raw.copy()))
+
+
+def test_messy_phone_numbers():
+    # Values that do not occur in the bundled files
+    phones = pd.Series(['0', 'nan', None, '555-1234', '+1 (704) 391-9404 x12', 7043919404.0, ''])
+    messy = pd.DataFrame({'lat': 1.0, 'lon': 2.0, 'Phone': phones})
+    pd.testing.assert_frame_equal(clean_data(messy.copy()), legacy_clean_data(messy.copy()))
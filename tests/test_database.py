@@ -0,0 +1,40 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import database
+
+USERS = 50
+
+
+def _email(i):
+    return f"rep{i}@buntingmagnetics.com"
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / 'users.db')
+    for i in range(USERS):
+        assert database.register_user(_email(i), 'pw', path=path)
+    yield path
+    database.get_pool(path).close()
+
+
+def test_register_and_verify(path):
+    user = database.verify_user(_email(0), 'pw', path=path)
+    assert user is not None and user['username'] == _email(0) and not user['is_admin']
+    assert database.verify_user(_email(0), 'wrong', path=path) is None
+    assert database.verify_user('nobody@buntingmagnetics.com', 'pw', path=path) is None
+    assert not database.register_user(_email(0), 'pw', path=path)
+
+
+def test_concurrent_logins_and_registrations_all_succeed(path):
+    # A whole team logging in at once, with one registration per 20 logins
+    def task(i):
+        if i % 20 == 19:
+            return database.register_user(_email(USERS + i), 'pw', path=path)
+        return database.verify_user(_email(i % USERS), 'pw', path=path) is not None
+
+    with ThreadPoolExecutor(50) as pool:
+        assert all(pool.map(task, range(300)))
+    assert database.verify_user(_email(USERS + 19), 'pw', path=path) is not None
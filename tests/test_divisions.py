@@ -0,0 +1,100 @@
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from divisions import BLOCK_DECIMALS, NAME_SIMILARITY, duplicate_groups, merge_divisions, normalize_name
+from utils import clean_data
+
+REPO = Path(__file__).parent.parent
+
+
+def _frame(rows):
+    return pd.DataFrame(rows, columns=['Cust. ID', 'Name', 'Latitude', 'Longitude', '3-year Spend'])
+
+
+def test_same_division_rows_sharing_an_id_stay_separate():
+    # Two ship-to rows of one division with the same ID and name are two rows, not a duplicate
+    bmc = _frame([['C1', 'Acme Inc.', 40.0, -90.0, 100.0],
+                  ['C1', 'Acme Inc', 41.0, -91.0, 50.0]])
+    mai = _frame([['M9', 'Other Co', 30.0, -80.0, 10.0]])
+    merged = merge_divisions({'BMC': bmc, 'MAI': mai})
+    assert len(merged) == 3
+    assert merged['3-year Spend'].sum() == 160.0
+
+
+def test_rows_sharing_an_id_across_divisions_merge_with_the_nearest():
+    bmc = _frame([['C1', 'Acme Inc.', 40.0, -90.0, 100.0],
+                  ['C1', 'Acme Inc', 41.0, -91.0, 50.0]])
+    mai = _frame([['C1', 'ACME INC', 35.0, -85.0, 10.0]])
+    merged = merge_divisions({'BMC': bmc, 'MAI': mai})
+    # The MAI row joins the nearer BMC location; the other stays on its own
+    assert merged[['Division', 'Latitude', '3-year Spend']].values.tolist() == [
+        ['BMC/MAI', 40.0, 110.0], ['BMC', 41.0, 50.0]]
+
+
+def test_each_division_row_pairs_with_one_counterpart():
+    bmc = _frame([['C1', 'Acme', 40.0, -90.0, 1.0], ['C1', 'Acme', 45.0, -80.0, 2.0]])
+    mai = _frame([['C1', 'Acme', 45.1, -80.1, 4.0], ['C1', 'Acme', 40.1, -90.1, 8.0]])
+    bme = _frame([['C1', 'Acme', 44.9, -79.9, 16.0]])
+    merged = merge_divisions({'BMC': bmc, 'MAI': mai, 'BME': bme})
+    assert sorted(merged[['Division', '3-year Spend']].values.tolist()) == [
+        ['BMC/MAI', 9.0], ['BMC/MAI/BME', 22.0]]
+
+
+def test_similar_names_never_join_two_rows_of_one_division():
+    # Both BMC rows are near the MAI row and similarly named
+    bmc = _frame([['B1', 'Acme Tool', 40.0, -90.0, 1.0], ['B2', 'Acme Tools', 40.0001, -90.0001, 2.0]])
+    mai = _frame([['M1', 'ACME TOOL', 40.00005, -90.00005, 4.0]])
+    merged = merge_divisions({'BMC': bmc, 'MAI': mai})
+    assert len(merged) == 2
+    assert merged['3-year Spend'].sum() == 7.0
+
+
+def _divisions(shared_fraction=0.1):
+    """BMC as division A, and as B the MAI customers plus perturbed copies of some BMC ones."""
+    first = clean_data(pd.read_csv(REPO / 'attached_assets/BMC.csv'))
+    rng = np.random.default_rng(3)
+    copies = first.iloc[rng.choice(len(first), int(len(first) * shared_fraction), replace=False)].copy()
+    # Same customer as exported by another division: new ID, upper-cased name, re-geocoded
+    copies['Cust. ID'] = ['X' + str(c) for c in copies['Cust. ID']]
+    copies['Name'] = copies['Name'].str.upper().str.replace(' Inc.', ' INC', regex=False)
+    copies['Latitude'] += rng.normal(0, 0.0005, len(copies))
+    copies['Longitude'] += rng.normal(0, 0.0005, len(copies))
+    second = clean_data(pd.read_csv(REPO / 'attached_assets/MAI.csv'))
+    return {'A': first, 'B': pd.concat([copies, second], ignore_index=True)}, len(copies)
+
+
+def _all_pairs(df, max_deg=10.0 ** -BLOCK_DECIMALS):
+    """Duplicate pairs found by comparing every cross-division pair less than one block apart."""
+    names = [normalize_name(n) for n in df['Name']]
+    a = np.flatnonzero(df['Division'].to_numpy() == 'A')
+    b = np.flatnonzero(df['Division'].to_numpy() == 'B')
+    lat, lon = df['Latitude'].to_numpy(), df['Longitude'].to_numpy()
+    pairs = set()
+    for i in a:
+        near = b[(np.abs(lat[b] - lat[i]) < max_deg) & (np.abs(lon[b] - lon[i]) < max_deg)]
+        for j in near:
+            if SequenceMatcher(None, names[i], names[j]).ratio() >= NAME_SIMILARITY:
+                pairs.add((i, j))
+    return pairs
+
+
+def test_blocked_matching_finds_every_nearby_duplicate():
+    frames, planted = _divisions()
+    combined = pd.concat([frame.assign(Division=name) for name, frame in frames.items()], ignore_index=True)
+    groups = duplicate_groups(combined)
+    pairs = _all_pairs(combined)
+    assert len(pairs) >= planted
+
+    # Each merged group is one nearby pair, and no pair is left with both rows
+    # unmatched; a row similar to two of the other division's rows joins one
+    members = pd.Series(np.arange(len(combined))).groupby(groups).agg(tuple)
+    matched = [rows for rows in members if len(rows) > 1]
+    assert all(rows in pairs for rows in matched)
+    in_group = {i for rows in matched for i in rows}
+    assert all(i in in_group or j in in_group for i, j in pairs)
+    merged = merge_divisions(frames)
+    assert len(merged) == len(combined) - len(matched)
+    assert (merged['Division'] == 'A/B').sum() == len(matched)
@@ -0,0 +1,48 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import filter_index
+from filter_index import FilterIndex
+from tests.filter_cascade import combinations, index_cascade, mask_cascade
+from utils import clean_data
+
+REPO = Path(__file__).parent.parent
+
+SOURCES = ['attached_assets/BMC.csv', 'attached_assets/MAI.csv']
+
+
+@pytest.fixture(scope='module', params=SOURCES)
+def customers(request):
+    return clean_data(pd.read_csv(REPO / request.param))
+
+
+def test_cascade_matches_pandas_masks(customers):
+    index = FilterIndex(customers)
+    assert index.options('State/Prov') == sorted(customers['State/Prov'].dropna().unique().tolist())
+    for states, territory, rep in combinations(customers, index):
+        expected = mask_cascade(customers, states, territory, rep)
+        actual = index_cascade(index, customers, states, territory, rep)
+        pd.testing.assert_frame_equal(actual[0], expected[0])
+        assert actual[1:] == expected[1:], (states, territory, rep)
+
+
+def test_options_memo_ignores_selection_order(customers):
+    index = FilterIndex(customers)
+    states = index.options('State/Prov')[:3]
+    first = index.options('Territory', {'State/Prov': states})
+    entries = len(index._options)
+    assert index.options('Territory', {'State/Prov': states[::-1]}) is first
+    assert index.options('Territory', {'State/Prov': states, 'Sales Rep': 'All'}) is first
+    assert len(index._options) == entries
+
+
+def test_options_memo_is_bounded(customers, monkeypatch):
+    monkeypatch.setattr(filter_index, 'OPTIONS_CACHE_SIZE', 5)
+    index = FilterIndex(customers)
+    states = index.options('State/Prov')
+    for state in states[:20]:
+        assert index.options('Territory', {'State/Prov': [state]}) == sorted(
+            customers.loc[customers['State/Prov'] == state, 'Territory'].dropna().unique().tolist())
+    assert len(index._options) == 5
@@ -0,0 +1,85 @@
+import re
+from http.cookies import SimpleCookie
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+import database
+import profiling
+import sessions
+
+MAIN = str(Path(__file__).parent.parent / 'main.py')
+USERNAME, PASSWORD = 'rep@buntingmagnetics.com', 'pw'
+
+
+@pytest.fixture
+def cookies(tmp_path, monkeypatch):
+    """The cookies the browser sends, on a scratch user database."""
+    path = str(tmp_path / 'users.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(profiling, 'LOG_PATH', tmp_path / 'profile.jsonl')
+    database.register_user(USERNAME, PASSWORD)
+    jar = SimpleCookie()
+    monkeypatch.setattr('streamlit.runtime.context._get_request', lambda: SimpleNamespace(cookies=jar))
+    yield jar
+    database.get_pool(path).close()
+
+
+def _cookies_written(app):
+    """(value, max_age) of each session cookie the page writes."""
+    scripts = [str(e.proto) for e in app.get('iframe') if sessions.SESSION_COOKIE in str(e.proto)]
+    return [re.search(sessions.SESSION_COOKIE + r'=([^;]*); Max-Age=(\d+)', s).groups() for s in scripts]
+
+
+def _app():
+    app = AppTest.from_file(MAIN, default_timeout=300)
+    app.run()
+    return app
+
+
+def test_login_survives_a_reload_through_the_cookie(cookies):
+    app = _app()
+    assert _cookies_written(app) == []
+    app.text_input(key='login_username').input(USERNAME)
+    app.text_input(key='login_password').input(PASSWORD)
+    app.button[0].click().run()
+    token = app.session_state['session_token']
+    assert app.session_state['user']['username'] == USERNAME
+    assert _cookies_written(app) == [(token, str(sessions.SESSION_TTL_SECONDS))]
+    app.run()
+    assert _cookies_written(app) == []
+
+    # A reload starts a new session; the browser now sends the cookie
+    cookies[sessions.SESSION_COOKIE] = token
+    reloaded = _app()
+    assert reloaded.session_state['user']['username'] == USERNAME
+    assert _cookies_written(reloaded) == []
+
+    # Logging out revokes the token and clears the cookie
+    next(b for b in reloaded.button if b.label == 'Log out').click().run()
+    assert reloaded.session_state['user'] is None
+    assert _cookies_written(reloaded) == [('', '0')]
+    assert sessions.validate(token) is None
+
+
+def test_login_page_then_the_app_once_logged_in(cookies):
+    app = _app()
+    assert [b.label for b in app.button] == ['Login', 'Register']
+    assert not app.radio
+
+    token = sessions.create_session(database.verify_user(USERNAME, PASSWORD))
+    cookies[sessions.SESSION_COOKIE] = token
+    app = _app()
+    assert not app.exception and not app.error, [e.value for e in app.error]
+    assert [r.label for r in app.radio][:1] == ['Select Data Source']
+
+
+def test_token_in_the_url_is_ignored_and_dropped(cookies):
+    token = sessions.create_session(database.verify_user(USERNAME, PASSWORD))
+    app = AppTest.from_file(MAIN, default_timeout=300)
+    app.query_params['session'] = token
+    app.run()
+    assert app.session_state['user'] is None
+    assert 'session' not in app.query_params
@@ -0,0 +1,57 @@
+import json
+from pathlib import Path
+
+import folium
+import numpy as np
+import pandas as pd
+import pytest
+
+from map_cache import render_map
+from map_layers import CustomerLayer
+from utils import clean_data, compact_customers
+
+REPO = Path(__file__).parent.parent
+
+
+@pytest.fixture(scope='module')
+def located():
+    df = compact_customers(clean_data(pd.read_csv(REPO / 'attached_assets/BMC.csv')))
+    return df[df['Latitude'].notna() & df['Longitude'].notna()]
+
+
+def _payload(df, selected=None):
+    return json.loads(CustomerLayer(df, selected).payload.replace('<\\/', '</'))
+
+
+def test_selected_customers_and_their_details(located):
+    names = located['Name'].iloc[:3].tolist()
+    d = _payload(located, names)
+    # A name can belong to several customers; every one of them is selected
+    expected = np.flatnonzero(located['Name'].isin(names)).tolist()
+    assert len(d['lat']) == len(located) and d['selected'] == expected
+    for i in expected:
+        row = located.iloc[i]
+        assert d['name'][i] in names
+        assert d['address'][i] == ('' if pd.isna(row['Corrected_Address']) else str(row['Corrected_Address']))
+        assert d['phone'][i] == ('N/A' if pd.isna(row['Phone']) else str(row['Phone']))
+
+
+@pytest.mark.parametrize('key, col', [('territory', 'Territory'), ('rep', 'Sales Rep')])
+def test_coded_columns_decode_to_every_customer(located, key, col):
+    d = _payload(located)
+    decoded = np.array(d[key]['values'], dtype=object)[d[key]['codes']]
+    np.testing.assert_array_equal(decoded, located[col].astype(object).fillna('').astype(str).to_numpy())
+
+
+@pytest.mark.parametrize('key, col', [('spend', '3-year Spend'), ('y2024', '$2,024 ')])
+def test_spend_survives_to_the_cent(located, key, col):
+    d = _payload(located)
+    sent = np.array([np.nan if v is None else v for v in d[key]], dtype=float)
+    np.testing.assert_allclose(sent, located[col].to_numpy(dtype=float), rtol=0, atol=0.005, equal_nan=True)
+
+
+def test_template_syntax_in_a_value_reaches_the_page_verbatim(located):
+    odd = located.iloc[:1].assign(Name='{{ name }} & {% raw %}')
+    m = folium.Map(location=[float(odd['Latitude'].iloc[0]), float(odd['Longitude'].iloc[0])], zoom_start=4)
+    CustomerLayer(odd).add_to(m)
+    assert '{{ name }} & {% raw %}' in render_map(m)[0]
@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from nearby import nearest_accounts
+from route_planner import distances_from
+from spatial_index import SpatialIndex
+from utils import clean_data, clean_prospects, compact_customers
+
+REPO = Path(__file__).parent.parent
+
+K = 20
+
+
+@pytest.fixture(scope='module')
+def accounts():
+    customers = compact_customers(clean_data(pd.read_csv(REPO / 'attached_assets/BMC.csv')))
+    prospects = clean_prospects(pd.read_csv(REPO / 'attached_assets/prospectlist.csv'))
+    return (customers, SpatialIndex(customers['Latitude'], customers['Longitude']),
+            prospects, SpatialIndex(prospects['latitude'], prospects['longitude']))
+
+
+def _origins(customers):
+    # Positions near real customers, as a rep in the field would be
+    origins = customers.sample(10, random_state=0)[['Latitude', 'Longitude']].to_numpy(dtype=float)
+    return origins + np.random.default_rng(0).normal(0, 0.05, origins.shape)
+
+
+def test_nearest_match_a_brute_force_scan(accounts):
+    customers, _, prospects, _ = accounts
+    for lat, lon in _origins(customers):
+        found = nearest_accounts(lat, lon, K, *accounts)
+        every = np.sort(np.concatenate([
+            distances_from((lat, lon), customers['Latitude'].to_numpy(float), customers['Longitude'].to_numpy(float)),
+            distances_from((lat, lon), prospects['latitude'].to_numpy(float), prospects['longitude'].to_numpy(float)),
+        ]))[:K]
+        np.testing.assert_allclose(found['Distance (km)'], every.round(1), rtol=0, atol=0.051)
+
+
+def test_ranking_by_spend_keeps_the_same_accounts(accounts):
+    customers = accounts[0]
+    for lat, lon in _origins(customers):
+        nearest = nearest_accounts(lat, lon, K, *accounts)
+        by_spend = nearest_accounts(lat, lon, K, *accounts, by='spend')
+        assert sorted(by_spend['Name']) == sorted(nearest['Name'])
+        spend = by_spend['3-year Spend']
+        assert spend.isna().sum() == (by_spend['Type'] == 'Prospect').sum()
+        assert spend.dropna().is_monotonic_decreasing and spend.isna().iloc[spend.notna().sum():].all()
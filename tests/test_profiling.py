@@ -0,0 +1,21 @@
+import json
+
+import profiling
+
+
+def test_log_rotates_at_the_size_cap(tmp_path, monkeypatch):
+    log = tmp_path / 'profile.jsonl'
+    monkeypatch.setattr(profiling, 'LOG_PATH', log)
+    monkeypatch.setattr(profiling, 'LOG_MAX_BYTES', 1000)
+    for i in range(100):
+        profiling.begin_run(run=i)
+        with profiling.stage('work'):
+            pass
+        profiling.end_run()
+    rotated = tmp_path / 'profile.jsonl.1'
+    assert log.stat().st_size < 1000 + 200 and rotated.stat().st_size < 1000 + 200
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['profile.jsonl', 'profile.jsonl.1']
+    # The newest runs are in the current log, right after those in the rotated one
+    current = [json.loads(line)['run'] for line in log.read_text().splitlines()]
+    previous = [json.loads(line)['run'] for line in rotated.read_text().splitlines()]
+    assert current[-1] == 99 and previous[-1] == current[0] - 1
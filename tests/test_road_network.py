@@ -0,0 +1,118 @@
+import heapq
+import pickle
+
+import numpy as np
+import pytest
+
+import road_network
+from road_network import RoadDistances, open_road_distances, save_graph
+from route_planner import distance_matrix, distances_from, haversine
+
+NODES = 80
+
+# Extra junctions after the random ones: a dead end only a one-way road
+# leads into, and an island of two junctions joined only to each other
+TRAP, ISLAND = NODES, NODES + 1
+
+
+def _graph(seed=0):
+    """A random road graph: each junction joined to its nearest few, some one-way, plus TRAP and ISLAND."""
+    rng = np.random.default_rng(seed)
+    # Junctions sit on rounded coordinates, so stops placed on them snap exactly
+    lat = np.round(rng.uniform(40.0, 40.5, NODES), 4)
+    lon = np.round(rng.uniform(-95.5, -95.0, NODES), 4)
+    nearest = np.argsort(distance_matrix(lat, lon), axis=1)[:, 1:4]
+    edges = {tuple(sorted((a, int(b)))) for a in range(NODES) for b in nearest[a]}
+    edges |= {tuple(sorted(rng.choice(NODES, 2, replace=False).tolist())) for _ in range(10)}
+    lat, lon = np.append(lat, [40.25, 41.0, 41.01]), np.append(lon, [-95.25, -95.0, -95.0])
+    edges.add((ISLAND, ISLAND + 1))
+    src, dst = (np.array(side) for side in zip(*sorted(edges)))
+    oneway = rng.random(len(src)) < 0.1
+    src, dst, oneway = np.append(src, 0), np.append(dst, TRAP), np.append(oneway, True)
+    rlat, rlon = np.radians(lat), np.radians(lon)
+    km = haversine(rlat[src], rlon[src], rlat[dst], rlon[dst]) * rng.uniform(1.0, 1.5, len(src))
+    return lat, lon, src, dst, km, oneway
+
+
+def _dijkstra(n, src, dst, km, oneway, source):
+    adj = [[] for _ in range(n)]
+    for a, b, d, one in zip(src.tolist(), dst.tolist(), km.tolist(), oneway.tolist()):
+        adj[a].append((b, d))
+        if not one:
+            adj[b].append((a, d))
+    dist = np.full(n, np.inf)
+    dist[source] = 0.0
+    heap = [(0.0, source)]
+    while heap:
+        d, x = heapq.heappop(heap)
+        if d > dist[x]:
+            continue
+        for y, w in adj[x]:
+            if d + w < dist[y]:
+                dist[y] = d + w
+                heapq.heappush(heap, (d + w, y))
+    return dist
+
+
+@pytest.fixture(scope='module')
+def graph():
+    return _graph()
+
+
+@pytest.fixture(scope='module')
+def roads(graph, tmp_path_factory):
+    tmp = tmp_path_factory.mktemp('roads')
+    save_graph(tmp / 'roads.npz', *graph)
+    return RoadDistances(tmp / 'roads.npz', tmp / 'cache')
+
+
+def test_hierarchy_distances_equal_dijkstra(graph, roads):
+    lat, lon, src, dst, km, oneway = graph
+    stops = np.arange(TRAP + 1)
+    matrix = roads.matrix(lat[stops], lon[stops])
+    straight = distance_matrix(lat[stops], lon[stops])
+    for i in stops:
+        exact = _dijkstra(len(lat), src, dst, km, oneway, i)[stops]
+        # Pairs the one-way roads do not connect, such as leaving TRAP, fall back to the straight line
+        expected = np.where(np.isfinite(exact), exact, straight[i])
+        assert np.allclose(matrix[i], expected), i
+        assert np.allclose(roads.from_point((lat[i], lon[i]), lat[stops], lon[stops]), expected), i
+    assert not np.isfinite(_dijkstra(len(lat), src, dst, km, oneway, TRAP)[:NODES]).any()
+    consecutive = np.arange(len(stops) - 1)
+    assert np.allclose(roads.legs(lat[stops], lon[stops]), matrix[consecutive, consecutive + 1])
+
+
+def test_points_snap_to_the_nearest_connected_junction(graph, roads):
+    lat, lon, src, dst, km, oneway = graph
+    exact = _dijkstra(len(lat), src, dst, km, oneway, 0)[:ISLAND]
+    reachable = np.isfinite(exact)
+
+    # Off the road: the walk to the nearest junction is added
+    point = (lat[0] + 0.001, lon[0])
+    offset = distances_from(point, lat[:1], lon[:1])[0]
+    assert offset < distances_from(point, lat[1:ISLAND], lon[1:ISLAND]).min()
+    row = roads.from_point(point, lat[:ISLAND], lon[:ISLAND])
+    assert np.allclose(row[reachable], offset + exact[reachable])
+
+    # ISLAND is not in the largest component, so it snaps to the mainland
+    island = (lat[ISLAND], lon[ISLAND])
+    mainland = distances_from(island, lat[:ISLAND], lon[:ISLAND])
+    nearest = int(np.argmin(mainland))
+    from_nearest = _dijkstra(len(lat), src, dst, km, oneway, nearest)[:ISLAND]
+    row = roads.from_point(island, lat[:ISLAND], lon[:ISLAND])
+    ok = np.isfinite(from_nearest)
+    assert nearest != TRAP and ok.sum() > NODES / 2
+    assert np.allclose(row[ok], mainland[nearest] + from_nearest[ok])
+
+
+def test_pickled_distances_reopen_the_cached_hierarchy(graph, roads, monkeypatch):
+    lat, lon = graph[0][:NODES], graph[1][:NODES]
+    open_road_distances.cache_clear()
+    # The hierarchy is already on disk, so reopening must not contract again
+    monkeypatch.setattr(road_network, 'contract', lambda *args: pytest.fail("contracted again"))
+    reopened = pickle.loads(pickle.dumps(roads))
+    assert reopened is not roads and isinstance(reopened, RoadDistances)
+    assert (reopened.graph_path, reopened.cache_dir) == (roads.graph_path, roads.cache_dir)
+    assert pickle.loads(pickle.dumps(roads)) is reopened
+    assert np.array_equal(reopened.matrix(lat, lon), roads.matrix(lat, lon))
+    open_road_distances.cache_clear()
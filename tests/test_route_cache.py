@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from route_cache import RouteCache
+from route_planner import calculate_optimal_route, distance_matrix
+
+
+def _stops(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{'name': f"stop {i}", 'lat': lat, 'lon': lon}
+            for i, (lat, lon) in enumerate(zip(rng.uniform(35, 45, n), rng.uniform(-100, -80, n)))]
+
+
+@pytest.mark.parametrize('round_trip', [False, True])
+def test_legs_are_the_distances_between_consecutive_stops(round_trip):
+    cache = RouteCache()
+    solved = cache.solve(_stops(15), round_trip=round_trip)
+    route = solved['route']
+    dist = distance_matrix([s['lat'] for s in route], [s['lon'] for s in route])
+    assert np.allclose(solved['legs'], [dist[i, i + 1] for i in range(len(route) - 1)])
+    assert solved['total_km'] == pytest.approx(sum(solved['legs']))
+
+
+def test_reordered_stops_hit_with_the_same_route():
+    stops = _stops(12, seed=1)
+    cache = RouteCache()
+    cold = cache.solve(stops)
+    hit = cache.solve([stops[0]] + stops[:0:-1])
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert hit['route'] == cold['route'] and hit['legs'] == cold['legs']
+
+
+def test_hits_return_the_solved_route():
+    stops = _stops(20, seed=2)
+    cache = RouteCache()
+    cold = cache.solve(stops)
+    assert cold['route'] == calculate_optimal_route(stops)
+    shuffled = [stops[0]] + [stops[i] for i in np.random.default_rng(2).permutation(np.arange(1, len(stops)))]
+    assert cache.solve(stops) == cold and cache.solve(shuffled) == cold
+    assert (cache.hits, cache.misses) == (2, 1)
@@ -0,0 +1,99 @@
+import time
+
+import numpy as np
+import pytest
+
+from route_cache import RouteCache
+from route_jobs import RouteJobs
+from route_planner import calculate_optimal_route
+
+POLL_SECONDS = 0.01
+TIMEOUT_SECONDS = 120
+
+
+def _stops(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return [{'name': f"stop {i}", 'lat': lat, 'lon': lon}
+            for i, (lat, lon) in enumerate(zip(rng.uniform(35, 45, n), rng.uniform(-100, -80, n)))]
+
+
+def _wait(job, until=lambda job: job.finished):
+    """Poll `job` the way main.py does; the fractions and best routes seen on the way."""
+    fractions, bests = [], []
+    start = time.perf_counter()
+    while not until(job):
+        assert time.perf_counter() - start < TIMEOUT_SECONDS, f"job still {job.status}"
+        if job.status == 'running':
+            fractions.append(job.fraction)
+            bests.append(job.best)
+        time.sleep(POLL_SECONDS)
+    return fractions, bests
+
+
+@pytest.fixture(scope='module')
+def jobs():
+    jobs = RouteJobs(RouteCache(), workers=1)
+    jobs.start()
+    yield jobs
+    jobs.shutdown()
+
+
+def test_progress_and_best_route_come_before_the_result(jobs):
+    stops = _stops(300)
+    job = jobs.submit('progress', stops)
+    fractions, bests = _wait(job)
+    assert job.status == 'done', job.error
+    assert job.result['route'] == calculate_optimal_route(stops)
+    assert job.best == job.result['route'] and job.fraction == 1.0
+
+    reported = [f for f in fractions if f is not None]
+    assert reported and reported == sorted(reported) and all(0 <= f <= 1 for f in reported)
+    best = next(b for b in bests if b is not None)
+    assert sorted(s['name'] for s in best) == sorted(s['name'] for s in stops)
+
+
+def test_changed_stops_cancel_the_running_solve(jobs):
+    stops = _stops(300, seed=1)
+    job = jobs.submit('cancel', stops)
+    _wait(job, until=lambda job: job.finished or job.best is not None)
+    assert not job.finished
+
+    start = time.perf_counter()
+    assert jobs.current('cancel', stops[:-1]) is None
+    _wait(job)
+    assert job.status == 'cancelled' and job.result is None
+    assert time.perf_counter() - start < 1.0
+
+    # The worker is free again for the next solve
+    other = jobs.submit('cancel', stops[:5])
+    _wait(other)
+    assert other.status == 'done', other.error
+
+
+def test_submitting_other_stops_cancels_a_queued_job(jobs):
+    running = jobs.submit('busy', _stops(300, seed=2))
+    _wait(running, until=lambda job: job.status == 'running')
+    queued = jobs.submit('queued', _stops(300, seed=3))
+    replaced = jobs.submit('queued', _stops(5, seed=3))
+    jobs.cancel('busy')
+    _wait(replaced)
+    assert queued.status == 'cancelled' and queued.best is None
+    assert replaced.status == 'done', replaced.error
+    assert running.status == 'cancelled'
+
+
+def test_same_stops_replan_from_the_cache(jobs):
+    stops = _stops(40, seed=4)
+    first = jobs.submit('cache', stops)
+    _wait(first)
+    assert jobs.submit('cache', stops) is first
+
+    # A new job for the same stops, in another order, finishes from the cache
+    jobs.cancel('cache')
+    hits = jobs.cache.hits
+    again = jobs.submit('cache', [stops[0]] + stops[:0:-1])
+    _wait(again)
+    assert again is not first and again.status == 'done'
+    assert again.result['route'] == first.result['route']
+    assert jobs.cache.hits == hits + 1
+    assert jobs.current('cache', stops) is again
@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+
+from route_planner import distance_matrix, distances_between, distances_from, haversine_distance, leg_distances
+
+# The array functions agree with the scalar formula to floating-point noise
+# (about 4e-12 km across the continental US)
+TOLERANCE_KM = 1e-9
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return rng.uniform(25, 49, 200), rng.uniform(-124, -67, 200)
+
+
+def _scalar(lats1, lons1, lats2, lons2):
+    return np.array([[haversine_distance(a, b, c, d) for c, d in zip(lats2, lons2)] for a, b in zip(lats1, lons1)])
+
+
+def test_distances_from_matches_scalar(points):
+    lats, lons = points
+    origin = (37.3043, -97.4395)
+    expected = _scalar([origin[0]], [origin[1]], lats, lons)[0]
+    np.testing.assert_allclose(distances_from(origin, lats, lons), expected, rtol=0, atol=TOLERANCE_KM)
+
+
+def test_distance_matrix_matches_scalar(points):
+    lats, lons = points
+    matrix = distance_matrix(lats, lons)
+    np.testing.assert_allclose(matrix, _scalar(lats, lons, lats, lons), rtol=0, atol=TOLERANCE_KM)
+    np.testing.assert_array_equal(np.diag(matrix), 0.0)
+    np.testing.assert_allclose(matrix, matrix.T, rtol=0, atol=TOLERANCE_KM)
+
+
+def test_between_and_legs_match_scalar(points):
+    lats, lons = points
+    np.testing.assert_allclose(distances_between(lats[:50], lons[:50], lats[50:], lons[50:]),
+                               _scalar(lats[:50], lons[:50], lats[50:], lons[50:]), rtol=0, atol=TOLERANCE_KM)
+    expected = [haversine_distance(a, b, c, d) for a, b, c, d in zip(lats[:-1], lons[:-1], lats[1:], lons[1:])]
+    np.testing.assert_allclose(leg_distances(lats, lons), expected, rtol=0, atol=TOLERANCE_KM)
+
+
+def test_empty_input():
+    assert distances_from((37.3, -97.4), [], []).shape == (0,)
+    assert distance_matrix([], []).shape == (0, 0)
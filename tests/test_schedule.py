@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from route_planner import distances_from, plan_schedule
+
+DAYS, MAX_STOPS = 3, 6
+
+# Two territories of 30 stops and two reps each, in separate boxes of (lat, lon)
+TERRITORIES = {'Central': ((38, 42), (-95, -90)), 'East': ((38, 42), (-80, -75))}
+STOPS_PER_TERRITORY, REPS_PER_TERRITORY = 30, 2
+
+# The Bunting facilities that serve as home bases when there is one territory
+FACILITIES = [
+    {'name': 'Bunting-Newton', 'lat': 37.3043, 'lon': -97.4395},
+    {'name': 'Bunting Elk Grove', 'lat': 42.0361, 'lon': -87.9303},
+    {'name': 'Bunting-Magnet Applications', 'lat': 41.1201, 'lon': -78.8391},
+]
+
+
+def assert_feasible(plan, stops, reps, max_km=float('inf')):
+    visited = [stop['name'] for route in plan['routes'] for stop in route['stops'][1:-1]]
+    visited += [stop['name'] for stop in plan['unassigned']]
+    assert sorted(visited) == sorted(stop['name'] for stop in stops), "every stop exactly once"
+    by_name = {rep['name']: rep for rep in reps}
+    for route in plan['routes']:
+        rep = by_name[route['rep']]
+        assert 1 <= route['day'] <= DAYS
+        if route['stops']:
+            assert route['stops'][0] is rep and route['stops'][-1] is rep, "round trip from the base"
+            assert len(route['stops']) - 2 <= MAX_STOPS, "day stop limit"
+            assert all(s.get('territory') == rep.get('territory') for s in route['stops']), "territory"
+            legs = sum(distances_from((a['lat'], a['lon']), [b['lat']], [b['lon']])[0]
+                       for a, b in zip(route['stops'], route['stops'][1:]))
+            assert legs == pytest.approx(route['km']) and route['km'] <= max_km + 1e-6, "day distance"
+
+
+@pytest.fixture(scope='module', params=[0, 1])
+def problem(request):
+    seed = request.param
+    rng = np.random.default_rng(seed)
+    stops, reps = [], []
+    for territory, (lats, lons) in TERRITORIES.items():
+        stops += [{'name': f"{territory} customer {i}", 'lat': lat, 'lon': lon, 'territory': territory}
+                  for i, (lat, lon) in enumerate(zip(rng.uniform(*lats, STOPS_PER_TERRITORY),
+                                                     rng.uniform(*lons, STOPS_PER_TERRITORY)))]
+        reps += [{'name': f"{territory}-rep{i + 1}", 'lat': lat, 'lon': lon, 'territory': territory}
+                 for i, (lat, lon) in enumerate(zip(rng.uniform(*lats, REPS_PER_TERRITORY),
+                                                    rng.uniform(*lons, REPS_PER_TERRITORY)))]
+    return stops, reps, seed
+
+
+@pytest.mark.parametrize('max_km', [None, 600, 150])
+def test_plans_are_feasible(problem, max_km):
+    stops, reps, seed = problem
+    plan = plan_schedule(stops, reps, days=DAYS, max_stops_per_day=MAX_STOPS, max_day_km=max_km,
+                         seed=seed, workers=1)
+    assert_feasible(plan, stops, reps, max_km or float('inf'))
+    if max_km is None:
+        assert not plan['unassigned']
+
+
+def test_same_seed_same_plan(problem):
+    stops, reps, seed = problem
+    options = dict(days=DAYS, max_stops_per_day=MAX_STOPS, max_day_km=600, seed=seed)
+    serial = plan_schedule(stops, reps, workers=1, **options)
+    assert plan_schedule(stops, reps, workers=1, **options) == serial
+    assert plan_schedule(stops, reps, workers=2, **options) == serial, "same plan in the process pool"
+
+
+def test_single_territory_from_facilities(problem):
+    stops, _, seed = problem
+    single = [dict(stop, territory=None) for stop in stops[:STOPS_PER_TERRITORY]]
+    plan = plan_schedule(single, FACILITIES, days=DAYS, max_stops_per_day=MAX_STOPS, seed=seed, workers=1)
+    assert_feasible(plan, single, FACILITIES)
+    assert not plan['unassigned']
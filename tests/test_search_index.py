@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from search_index import SearchIndex
+from utils import clean_data, compact_customers
+
+REPO = Path(__file__).parent.parent
+
+QUERIES = ['magnetics', 'Weima', 'stolle machinery', 'plastics houston', 'machinry', 'wichita']
+
+
+@pytest.fixture(scope='module')
+def customers():
+    df = compact_customers(clean_data(pd.read_csv(REPO / 'attached_assets/BMC.csv')))
+    return df, SearchIndex(df)
+
+
+def _index(names):
+    return SearchIndex(pd.DataFrame({'Name': names, 'City': 'Newton'}))
+
+
+def test_browse_lists_every_distinct_name_and_skips_missing():
+    names = ['Cedar', np.nan, 'Acme', 'Birch', 'Acme', None, 'Acme', 'Dune']
+    index = _index(names)
+    assert index.browse() == ['Acme', 'Birch', 'Cedar', 'Dune']
+    assert index.browse(np.array([0, 1, 4, 5])) == ['Acme', 'Cedar']
+    assert index.names(np.arange(len(names))) == ['Cedar', 'Acme', 'Birch', 'Dune']
+
+
+def test_browse_limit_counts_distinct_names():
+    # Many repeats of the first name must not crowd out the ones after it
+    index = _index(['Acme'] * 50 + ['Birch', 'Cedar', 'Dune'])
+    assert index.browse(limit=3) == ['Acme', 'Birch', 'Cedar']
+    assert index.browse(limit=10) == ['Acme', 'Birch', 'Cedar', 'Dune']
+
+
+def test_exact_names_match_a_frame_scan(customers):
+    df, index = customers
+    names = df['Name'].to_numpy()
+    for name in np.random.default_rng(0).choice(names, 20):
+        np.testing.assert_array_equal(index.rows_for_name(name), np.flatnonzero(names == name))
+
+
+def test_names_with_the_prefix_rank_first(customers):
+    df, index = customers
+    for name in df['Name'].iloc[:5]:
+        prefix = name[:4]
+        expected = {n for n in df['Name'] if n.lower().startswith(prefix.lower())}
+        ranked = index.names(index.search(prefix, limit=len(expected) + 10))
+        assert set(ranked[:len(expected)]) == expected, prefix
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_restricted_search_returns_only_allowed_rows(customers, query):
+    df, index = customers
+    rows = np.flatnonzero(df['State/Prov'].to_numpy() == 'TX')
+    found = index.search(query, rows)
+    assert np.isin(found, rows).all()
+    assert set(found) <= set(index.search(query, limit=len(df)))
@@ -0,0 +1,74 @@
+import time
+
+import pytest
+
+import database
+import sessions
+
+
+@pytest.fixture
+def db(tmp_path):
+    path = str(tmp_path / 'users.db')
+    database.register_user('rep@buntingmagnetics.com', 'pw', path=path)
+    yield path, database.verify_user('rep@buntingmagnetics.com', 'pw', path=path)
+    database.get_pool(path).close()
+
+
+def test_valid_token_names_its_user(db):
+    path, user = db
+    token = sessions.create_session(user, path=path)
+    assert sessions.validate(token, path=path) == user
+    # Not cached: checked against the sessions table
+    sessions._cache.clear()
+    assert sessions.validate(token, path=path) == user
+
+
+def test_forged_tokens_are_rejected(db):
+    path, user = db
+    token = sessions.create_session(user, path=path)
+    assert sessions.validate(token[:-1] + ('A' if token[-1] != 'A' else 'B'), path=path) is None
+    assert sessions.validate('not-a-token', path=path) is None
+    assert sessions.validate('', path=path) is None
+
+
+def test_expired_tokens_are_rejected(db):
+    path, user = db
+    token = sessions.create_session(user, ttl=0.05, path=path)
+    time.sleep(0.1)
+    assert sessions.validate(token, path=path) is None
+
+
+def test_revoked_tokens_are_rejected(db):
+    path, user = db
+    first, second = sessions.create_session(user, path=path), sessions.create_session(user, path=path)
+    sessions.revoke(first, path=path)
+    assert sessions.validate(first, path=path) is None
+    assert sessions.validate(second, path=path) == user
+    assert sessions.revoke_user(user['username'], path=path) == 1
+    assert sessions.validate(second, path=path) is None
+    assert sessions.active_sessions(path=path) == []
+    assert sessions.purge_expired(path=path) == 2
+
+
+def _session_count(path):
+    with database.get_pool(path).connection() as conn:
+        return conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+
+
+def test_expired_sessions_are_purged_once_the_interval_passes(db, monkeypatch):
+    path, user = db
+    monkeypatch.setattr(sessions, 'PURGE_INTERVAL_SECONDS', 0.2)
+    short = [sessions.create_session(user, ttl=0.05, path=path) for _ in range(3)]
+    time.sleep(0.1)
+    # Tokens nobody presents again stay in the table and cache until a purge;
+    # within the interval nothing is deleted
+    sessions.create_session(user, path=path)
+    assert _session_count(path) == 4
+    assert all(token in sessions._cache for token in short)
+
+    time.sleep(0.2)
+    kept = sessions.create_session(user, path=path)
+    assert _session_count(path) == 2
+    assert not any(token in sessions._cache for token in short)
+    assert sessions.validate(kept, path=path) == user
+    assert all(sessions.validate(token, path=path) is None for token in short)
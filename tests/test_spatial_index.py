@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from spatial_index import SpatialIndex
+
+
+def _points(rng, n, lat=(-60, 70), lon=(-180, 180)):
+    return rng.uniform(*lat, n), rng.uniform(*lon, n)
+
+
+def _within_any_by_point(index, lats, lons, radius_km):
+    hits = np.zeros(len(index), dtype=bool)
+    for lat, lon in zip(lats, lons):
+        hits[index.within(lat, lon, radius_km)[0]] = True
+    return np.flatnonzero(hits)
+
+
+# Small indexes are checked in one block, large ones cell by cell
+@pytest.mark.parametrize('size', [500, 20_000])
+@pytest.mark.parametrize('radius_km', [5, 50, 400])
+def test_within_any_matches_a_query_per_point(size, radius_km):
+    rng = np.random.default_rng(radius_km)
+    index = SpatialIndex(*_points(rng, size))
+    # Clustered queries share cells; a few sit on the antimeridian
+    lats, lons = _points(rng, 300, lat=(30, 45), lon=(-100, -80))
+    lats = np.concatenate([lats, [10.0, -10.0, 0.0]])
+    lons = np.concatenate([lons, [179.99, -179.99, 180.0]])
+    expected = _within_any_by_point(index, lats, lons, radius_km)
+    assert np.array_equal(index.within_any(lats, lons, radius_km), expected)
+
+
+def test_within_any_without_queries():
+    index = SpatialIndex([1.0, 2.0], [3.0, 4.0])
+    assert len(index.within_any([], [], 50)) == 0
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spend_grid import MAX_LEVEL, SpendGrid, tile_xy
+from utils import SPEND_COLUMNS, clean_data, compact_customers
+
+REPO = Path(__file__).parent.parent
+
+
+@pytest.fixture(scope='module')
+def customers():
+    frames = [clean_data(pd.read_csv(REPO / path)) for path in ('attached_assets/BMC.csv', 'attached_assets/MAI.csv')]
+    df = compact_customers(pd.concat(frames, ignore_index=True))
+    return df, SpendGrid(df)
+
+
+@pytest.mark.parametrize('level', [4, 8, MAX_LEVEL])
+def test_rollup_matches_a_groupby_over_tiles(customers, level):
+    df, grid = customers
+    located = df[df['Latitude'].notna() & df['Longitude'].notna()]
+    x, y = tile_xy(located['Latitude'].to_numpy(float), located['Longitude'].to_numpy(float), level)
+    expected = located[SPEND_COLUMNS].fillna(0).groupby([x, y]).sum()
+
+    cells = grid.rollup(level)
+    assert len(cells) == len(expected) and cells['count'].sum() == len(located)
+    np.testing.assert_allclose(cells[SPEND_COLUMNS].sum(), expected.sum())
+    by_territory = grid.rollup(level, by_territory=True)
+    assert by_territory['count'].sum() == len(located)
+    assert by_territory['3-year Spend'].sum() == pytest.approx(expected['3-year Spend'].sum())
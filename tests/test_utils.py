@@ -0,0 +1,47 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from filter_index import FILTER_COLUMNS, FilterIndex
+from map_layers import CustomerLayer
+from utils import clean_data, compact_customers
+
+REPO = Path(__file__).parent.parent
+
+
+@pytest.fixture(scope='module', params=['attached_assets/BMC.csv', 'attached_assets/MAI.csv'])
+def frames(request):
+    full = clean_data(pd.read_csv(REPO / request.param))
+    return full, compact_customers(full)
+
+
+def test_compact_frame_gives_the_same_filters(frames):
+    full, compact = frames
+    full_index, compact_index = FilterIndex(full), FilterIndex(compact)
+    for col in FILTER_COLUMNS:
+        assert full_index.options(col) == compact_index.options(col), col
+    for state in full_index.options('State/Prov')[:10]:
+        selections = {'State/Prov': [state]}
+        np.testing.assert_array_equal(full_index.rows(selections), compact_index.rows(selections))
+
+
+def test_compact_frame_gives_the_same_markers(frames):
+    full, compact = frames
+    full_data = json.loads(CustomerLayer(full[:500]).payload.replace('<\\/', '</'))
+    compact_data = json.loads(CustomerLayer(compact[:500]).payload.replace('<\\/', '</'))
+    assert full_data.keys() == compact_data.keys()
+    for key in full_data:
+        if key in ('lat', 'lon'):
+            # The payload rounds to 5 decimals, so float32 coordinates may differ by one unit
+            np.testing.assert_allclose(full_data[key], compact_data[key], rtol=0, atol=1.5e-5)
+        else:
+            assert full_data[key] == compact_data[key], key
+
+
+def test_compact_frame_is_smaller(frames):
+    full, compact = frames
+    assert compact.memory_usage(deep=True).sum() < full.memory_usage(deep=True).sum()
+    assert compact['Latitude'].dtype == np.float32
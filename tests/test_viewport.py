@@ -0,0 +1,38 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spatial_index import SpatialIndex
+from utils import clean_data, compact_customers
+from viewport import bounds_around, point_cap, viewport_markers
+
+REPO = Path(__file__).parent.parent
+
+WIDTH, HEIGHT = 1200, 610
+
+
+@pytest.fixture(scope='module')
+def customers():
+    frames = [clean_data(pd.read_csv(REPO / path)) for path in ('attached_assets/BMC.csv', 'attached_assets/MAI.csv')]
+    df = compact_customers(pd.concat(frames, ignore_index=True))
+    return df, SpatialIndex(df['Latitude'], df['Longitude'])
+
+
+@pytest.mark.parametrize('zoom, clustered', [(4, True), (6, False), (10, False)])
+def test_markers_account_for_every_customer_in_view(customers, zoom, clustered):
+    df, index = customers
+    spend = df['3-year Spend'].to_numpy()
+    # Views centred on real customers, as a rep panning around a territory would see
+    centres = df[['Latitude', 'Longitude']].to_numpy(dtype=float)[np.random.default_rng(0).choice(len(df), 10)]
+    for lat, lon in centres:
+        bounds = bounds_around(lat, lon, zoom, WIDTH, HEIGHT)
+        ids, clusters = viewport_markers(index, bounds, zoom, weights=spend)
+        in_view = np.sort(index.in_box(*bounds))
+        assert (clusters is not None) == clustered
+        if clusters is None:
+            np.testing.assert_array_equal(ids, in_view)
+            assert len(ids) <= point_cap(zoom)
+        else:
+            assert clusters['count'].sum() == len(in_view)
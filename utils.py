@@ -1,59 +1,134 @@
+import sys
+
+import numpy as np
 import pandas as pd
 import re
 
+# Spend columns as they appear in the exports; clean_data parses them to float64
+SPEND_COLUMNS = ['3-year Spend', '$2,024 ', '$2,023 ', '$2,022 ']
+
+# 3-year spend above each threshold moves a customer up one 'Spend Tier' (0-3)
+SPEND_TIER_THRESHOLDS = [50000, 100000, 500000]
+
+# Columns the app reads from a cleaned customer frame; compact_customers keeps only these
+UI_COLUMNS = ['Cust. ID', 'Name', 'Latitude', 'Longitude', 'City', 'State/Prov', 'Territory', 'Sales Rep',
+              'ProdCode', 'Phone', 'Corrected_Address'] + SPEND_COLUMNS + ['Spend Tier', 'Division']
+
+# Low-cardinality string columns stored as categoricals
+CATEGORICAL_COLUMNS = ['City', 'State/Prov', 'Territory', 'Sales Rep', 'ProdCode', 'Division']
+
+# Lower-cased source column name -> standard column name
+COLUMN_MAPPING = {
+    'lat': 'Latitude',
+    'latitude': 'Latitude',
+    'lon': 'Longitude',
+    'longitude': 'Longitude',
+    'phone': 'Phone',
+    'territory': 'Territory',
+    'sales_rep': 'Sales Rep',
+    'prodcode': 'ProdCode',
+    'state': 'State/Prov',
+    'state/prov': 'State/Prov',
+    'stateprov': 'State/Prov',
+    'state/province': 'State/Prov',
+    'name': 'Name',
+    'company name': 'Name',
+    'customer name': 'Name',
+    '3-year spend': '3-year Spend',
+    '3 year spend': '3-year Spend',
+    'three year spend': '3-year Spend'
+}
+
 def clean_data(df):
     """Clean and prepare the customer data."""
-    # Standardize column names
-    column_mapping = {
-        'lat': 'Latitude',
-        'latitude': 'Latitude',
-        'lon': 'Longitude',
-        'longitude': 'Longitude',
-        'phone': 'Phone',
-        'territory': 'Territory',
-        'sales_rep': 'Sales Rep',
-        'prodcode': 'ProdCode',
-        'state': 'State/Prov',
-        'state/prov': 'State/Prov',
-        'stateprov': 'State/Prov',
-        'state/province': 'State/Prov',
-        'name': 'Name',
-        'company name': 'Name',
-        'customer name': 'Name',
-        '3-year spend': '3-year Spend',
-        '3 year spend': '3-year Spend',
-        'three year spend': '3-year Spend'
-    }
-    
-    # Rename columns if they exist (case-insensitive)
-    for col in df.columns:
-        lower_col = col.lower()
-        for old_col, new_col in column_mapping.items():
-            if lower_col == old_col:
-                df = df.rename(columns={col: new_col})
-    
-    # Remove rows with invalid coordinates
-    df = df[df['Latitude'].notna() & df['Longitude'].notna()]
-    
-    # Convert coordinates to float
-    df['Latitude'] = pd.to_numeric(df['Latitude'], errors='coerce')
-    df['Longitude'] = pd.to_numeric(df['Longitude'], errors='coerce')
-    
-    # Remove any rows where conversion to float failed
-    df = df.dropna(subset=['Latitude', 'Longitude'])
-    
+    # Standardize column names (case-insensitive) in a single rename
+    renames = {col: COLUMN_MAPPING[col.lower()] for col in df.columns
+               if col.lower() in COLUMN_MAPPING}
+    df = df.rename(columns=renames)
+
+    # Convert coordinates to float and drop rows where either is missing or invalid
+    lat = pd.to_numeric(df['Latitude'], errors='coerce')
+    lon = pd.to_numeric(df['Longitude'], errors='coerce')
+    valid = (lat.notna() & lon.notna()).to_numpy()
+    # take() returns an independent frame, so the assignments below need no extra copy
+    df = df.take(np.flatnonzero(valid))
+    df['Latitude'] = lat.to_numpy()[valid]
+    df['Longitude'] = lon.to_numpy()[valid]
+
     # Clean phone numbers if Phone column exists
     if 'Phone' in df.columns:
-        df['Phone'] = df['Phone'].astype(str).apply(clean_phone_number)
+        df['Phone'] = clean_phone_numbers(df['Phone'])
     
     # Ensure required columns exist
     required_columns = ['Territory', 'Sales Rep', 'State/Prov', 'ProdCode']
     for col in required_columns:
         if col not in df.columns:
             df[col] = ''
+
+    # Parse spend strings once so rendering only formats numbers
+    for col in SPEND_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_currency(df[col])
+    if '3-year Spend' in df.columns:
+        df['Spend Tier'] = spend_tier(df['3-year Spend'])
     
     return df
 
+def _strip_chars(values: pd.Series, chars: str) -> pd.Series:
+    """Remove every occurrence of each character in `chars` (literal, no regex)."""
+    for char in chars:
+        values = values.str.replace(char, '', regex=False)
+    return values
+
+def clean_phone_numbers(phones: pd.Series) -> pd.Series:
+    """Vectorized clean_phone_number over a whole column."""
+    phones = phones.astype(str).astype('string[pyarrow]')
+    # Common separators are stripped literally; only leftovers need the regex
+    digits = _strip_chars(phones, '-() .')
+    messy = ~digits.str.isdigit().to_numpy(dtype=bool)
+    digits[messy] = digits[messy].str.replace(r'\D', '', regex=True)
+    # Slicing to the end needs an explicit stop to stay on the Arrow kernel
+    formatted = ('(' + digits.str.slice(-10, -7) + ') ' + digits.str.slice(-7, -4)
+                 + '-' + digits.str.slice(-4, sys.maxsize))
+    cleaned = formatted.where(digits.str.len() >= 10, phones)
+    return cleaned.mask(phones.isin(['0', 'nan']), '').astype(object)
+
+def parse_currency(values: pd.Series) -> pd.Series:
+    """Parse currency strings like ' $1,234.50 ' into float64 (unparseable -> NaN)."""
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    number = r'-?(?:\d+\.?\d*|\.\d+)'
+    cleaned = _strip_chars(values.astype(str).astype('string[pyarrow]'), '$,').str.strip()
+    messy = ~cleaned.str.fullmatch(number).to_numpy(dtype=bool)
+    cleaned[messy] = cleaned[messy].str.replace(r'[^\d.-]', '', regex=True)
+    # Only strings float() would accept are cast; everything else ('', '-', '1-2') is NaN
+    valid = cleaned.str.fullmatch(number).to_numpy(dtype=bool)
+    parsed = np.full(len(values), np.nan)
+    parsed[valid] = cleaned[valid].astype('float64').to_numpy()
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+def spend_tier(spend: pd.Series) -> pd.Series:
+    """Bucket parsed spend into tiers 0-3 using SPEND_TIER_THRESHOLDS."""
+    tiers = np.searchsorted(SPEND_TIER_THRESHOLDS, spend.fillna(0).to_numpy(), side='left')
+    return pd.Series(tiers.astype('int8'), index=spend.index)
+
+def compact_customers(df: pd.DataFrame) -> pd.DataFrame:
+    """Shrink a cleaned customer frame for sharing between sessions.
+
+    Keeps only UI_COLUMNS, stores CATEGORICAL_COLUMNS as categoricals and
+    coordinates as float32 (about 1 m of precision).
+    """
+    df = df[[col for col in UI_COLUMNS if col in df.columns]]
+    compact = {col: df[col].astype('category') for col in CATEGORICAL_COLUMNS if col in df.columns}
+    compact.update({col: df[col].astype(np.float32) for col in ('Latitude', 'Longitude')})
+    return df.assign(**compact).reset_index(drop=True)
+
+def clean_prospects(df):
+    """Clean and prepare the prospect list."""
+    df = df[df['latitude'].notna() & df['longitude'].notna()].copy()
+    df['Revenue Range (in USD)'] = df['Revenue Range (in USD)'].fillna('Unknown')
+    return df
+
 def clean_phone_number(phone):
     """Clean and format phone numbers."""
     if pd.isna(phone) or phone == '0' or phone == 'nan':
@@ -71,6 +146,8 @@ def format_currency(value):
     """Format currency values consistently."""
     if pd.isna(value) or value == ' $-   ' or value == '0':
         return '$0'
+    if isinstance(value, (int, float, np.number)):
+        return f"${value:,.2f}"
         
     # Remove any existing formatting
     value_str = str(value)
@@ -0,0 +1,100 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from spatial_index import SpatialIndex
+from spend_grid import SpendGrid
+
+# Markers sent per render: VIEWPORT_BASE_POINTS at zoom 4, doubling per zoom
+# level up to VIEWPORT_MAX_POINTS; a viewport holding more is clustered
+VIEWPORT_BASE_POINTS = 500
+VIEWPORT_MAX_POINTS = 4000
+
+# Width of a cluster cell in screen pixels, whatever the zoom
+CLUSTER_PIXELS = 64
+
+# Leaflet's world is 256 pixels wide at zoom 0 and doubles with every level
+TILE_PIXELS = 256
+
+
+def point_cap(zoom: int) -> int:
+    """Most individual markers drawn at `zoom`."""
+    return int(min(VIEWPORT_BASE_POINTS * 2 ** max(zoom - 4, 0), VIEWPORT_MAX_POINTS))
+
+
+def degrees_per_pixel(zoom: int) -> float:
+    """Degrees of longitude covered by one screen pixel at `zoom`."""
+    return 360 / (TILE_PIXELS * 2 ** zoom)
+
+
+def bounds_around(lat: float, lon: float, zoom: int, width_px: int, height_px: int) -> Tuple[float, float, float, float]:
+    """Approximate (south, west, north, east) seen by a map of that size, before the browser reports it."""
+    half_lon = degrees_per_pixel(zoom) * width_px / 2
+    half_lat = half_lon * height_px / width_px * np.cos(np.radians(lat))
+    return max(lat - half_lat, -90), lon - half_lon, min(lat + half_lat, 90), lon + half_lon
+
+
+def parse_bounds(state: Optional[Dict]) -> Optional[Tuple[float, float, float, float]]:
+    """(south, west, north, east) from streamlit-folium's returned 'bounds', or None."""
+    try:
+        sw, ne = state['bounds']['_southWest'], state['bounds']['_northEast']
+        return float(sw['lat']), float(sw['lng']), float(ne['lat']), float(ne['lng'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def cluster(lats: np.ndarray, lons: np.ndarray, weights: np.ndarray, cell_deg: float) -> pd.DataFrame:
+    """Aggregate points on a `cell_deg` grid: one row per occupied cell.
+
+    Each cluster sits at the mean position of its points and carries their
+    count and summed weight (NaN weights count as zero).
+    """
+    if len(lats) == 0:
+        return pd.DataFrame({'lat': [], 'lon': [], 'count': [], 'weight': []})
+    n_cols = int(np.ceil(360 / cell_deg))
+    cells = (np.floor((lats + 90) / cell_deg).astype(np.int64) * n_cols
+             + np.floor((lons + 180) / cell_deg).astype(np.int64) % n_cols)
+    _, inverse, counts = np.unique(cells, return_inverse=True, return_counts=True)
+    return pd.DataFrame({
+        'lat': np.bincount(inverse, lats) / counts,
+        'lon': np.bincount(inverse, lons) / counts,
+        'count': counts,
+        'weight': np.bincount(inverse, np.nan_to_num(weights)),
+    })
+
+
+def viewport_markers(index: SpatialIndex, bounds: Tuple[float, float, float, float], zoom: int,
+                     rows: Optional[np.ndarray] = None,
+                     weights: Optional[np.ndarray] = None,
+                     grid: Optional[SpendGrid] = None) -> Tuple[Optional[np.ndarray], Optional[pd.DataFrame]]:
+    """What to draw for the points of `index` inside `bounds` at `zoom`.
+
+    Only `rows` (positions, e.g. the filtered rows) are considered
+    when given. Returns (positions, None) when at most point_cap(zoom)
+    points are in view, else (None, clusters) from `cluster` over a grid of
+    CLUSTER_PIXELS screen pixels, with `weights` summed per cluster.
+
+    With a SpendGrid built over the same frame, a zoomed-out view is
+    clustered from its pre-aggregated cells (weighted by 3-year spend)
+    without visiting the points in view.
+    """
+    filtered = rows is not None and len(rows) < len(index)
+    if grid is not None:
+        cells = grid.rollup(grid.level_for_zoom(zoom), bounds, rows=rows if filtered else None)
+        if cells['count'].sum() > point_cap(zoom):
+            return None, cells.rename(columns={'3-year Spend': 'weight'})[['lat', 'lon', 'count', 'weight']]
+    ids = index.in_box(*bounds)
+    if filtered:
+        keep = np.zeros(len(index), dtype=bool)
+        keep[rows] = True
+        ids = ids[keep[ids]]
+    if len(ids) <= point_cap(zoom):
+        return np.sort(ids), None
+    weights = np.zeros(len(ids)) if weights is None else np.asarray(weights, dtype=np.float64)[ids]
+    return None, cluster(index.lats[ids], index.lons[ids], weights, degrees_per_pixel(zoom) * CLUSTER_PIXELS)
+
+
+def same_view(a: Dict, b: Dict, decimals: int = 4) -> bool:
+    """Whether two views ({'zoom', 'bounds'}) match up to rounding noise from the browser."""
+    return a['zoom'] == b['zoom'] and np.allclose(a['bounds'], b['bounds'], atol=10 ** -decimals, rtol=0)